@@ -0,0 +1,127 @@
+"""
+Measure login throughput and how much a login burst slows everything else.
+
+Without --url, the password checks run in this process, either on the
+bcrypt pool or inline on the event loop (--inline, the old behaviour), and a
+probe task measures how late the event loop wakes it. With --url, real logins
+are sent to a running server while an unrelated endpoint is timed.
+
+Usage:
+    python -m backend.commands.bench_login [--logins 100] [--concurrency 20] [--inline]
+    python -m backend.commands.bench_login --url http://localhost:8000 --username USER --password PASS
+        [--logins 100] [--concurrency 20] [--probe /api/auth/csrf-token]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable, List
+
+from backend.core.configs.config import settings
+from backend.core.security.passwords import password_hasher
+
+_PROBE_INTERVAL_SECONDS = 0.05
+
+
+def _summary(samples: List[float]) -> str:
+    if not samples:
+        return "no samples"
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return (
+        f"p50 {statistics.median(ordered) * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms, "
+        f"max {ordered[-1] * 1000:.1f} ms ({len(ordered)} samples)"
+    )
+
+
+async def _burst(login: Callable[[], Awaitable[None]], logins: int, concurrency: int, probe: Callable[[], Awaitable[float]]):
+    samples: List[float] = []
+    done = asyncio.Event()
+
+    async def probing():
+        while not done.is_set():
+            samples.append(await probe())
+
+    async def worker(count: int):
+        for _ in range(count):
+            await login()
+
+    probe_task = asyncio.create_task(probing())
+    per_worker = [logins // concurrency + (1 if i < logins % concurrency else 0) for i in range(concurrency)]
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(count) for count in per_worker if count))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await probe_task
+    print(f"{logins} logins in {elapsed:.2f} s: {logins / elapsed:.1f} logins/s")
+    print(f"Unrelated work during the burst: {_summary(samples)}")
+
+
+async def bench_local(logins: int, concurrency: int, inline: bool):
+    hashed = await password_hasher.hash("benchmark-password")
+    context = password_hasher.context
+
+    async def login():
+        if inline:
+            context.verify("benchmark-password", hashed)
+        else:
+            await password_hasher.verify("benchmark-password", hashed)
+
+    async def probe() -> float:
+        # How late the event loop wakes a task that asked to sleep briefly.
+        started = time.perf_counter()
+        await asyncio.sleep(_PROBE_INTERVAL_SECONDS)
+        return time.perf_counter() - started - _PROBE_INTERVAL_SECONDS
+
+    mode = "inline on the event loop" if inline else f"on {password_hasher.workers} bcrypt worker thread(s)"
+    print(f"Verifying {settings.password_bcrypt_rounds}-round bcrypt hashes {mode}")
+    await _burst(login, logins, concurrency, probe)
+    password_hasher.shutdown()
+
+
+async def bench_http(url: str, username: str, password: str, logins: int, concurrency: int, probe_path: str):
+    import httpx
+
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        failures = 0
+
+        async def login():
+            nonlocal failures
+            response = await client.post("/api/auth/login", data={"username": username, "password": password})
+            if response.status_code != 200:
+                failures += 1
+
+        async def probe() -> float:
+            started = time.perf_counter()
+            await client.get(probe_path)
+            elapsed = time.perf_counter() - started
+            await asyncio.sleep(_PROBE_INTERVAL_SECONDS)
+            return elapsed
+
+        baseline = [await probe() for _ in range(20)]
+        print(f"{probe_path} before the burst: {_summary(baseline)}")
+        await _burst(login, logins, concurrency, probe)
+        if failures:
+            print(f"{failures} login(s) failed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Login throughput and event loop latency during a login burst")
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--inline", action="store_true", help="verify on the event loop instead of the pool")
+    parser.add_argument("--url")
+    parser.add_argument("--username")
+    parser.add_argument("--password")
+    parser.add_argument("--probe", default="/api/auth/csrf-token")
+    args = parser.parse_args()
+    if args.url:
+        if not args.username or not args.password:
+            parser.error("--url needs --username and --password")
+        asyncio.run(bench_http(args.url, args.username, args.password, args.logins, args.concurrency, args.probe))
+    else:
+        asyncio.run(bench_local(args.logins, args.concurrency, args.inline))
+
+
+if __name__ == "__main__":
+    main()
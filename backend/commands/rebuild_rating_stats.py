@@ -0,0 +1,22 @@
+"""
+Rebuild fragrance_rating_stats from the reviews table.
+
+Usage:
+    python -m backend.commands.rebuild_rating_stats [fragrance_id ...]
+"""
+import asyncio
+import sys
+
+from backend.core.db.session import AsyncSessionLocal
+from backend.routes.fragrance.ratings import rebuild_rating_stats
+
+
+async def main(fragrance_ids: list[int] | None = None):
+    async with AsyncSessionLocal() as session:
+        rows = await rebuild_rating_stats(session, fragrance_ids)
+        await session.commit()
+    print(f"Rebuilt rating stats for {rows} fragrance(s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main([int(arg) for arg in sys.argv[1:]] or None))
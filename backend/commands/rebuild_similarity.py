@@ -0,0 +1,28 @@
+"""
+Recompute fragrance_content_neighbors (note pyramid similarity) for the
+whole catalog.
+
+Usage:
+    python -m backend.commands.rebuild_similarity [workers]
+
+workers defaults to the number of CPUs.
+"""
+import asyncio
+import os
+import sys
+import time
+
+from backend.core.db.session import AsyncSessionLocal
+from backend.routes.fragrance.similarity import rebuild_neighbors
+
+
+async def main(workers: int):
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as session:
+        rows = await rebuild_neighbors(session, workers)
+        await session.commit()
+    print(f"Rebuilt content neighbours for {rows} fragrance(s) in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count() or 1))
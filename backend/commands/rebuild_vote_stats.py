@@ -0,0 +1,24 @@
+"""
+Rebuild fragrance_vote_stats and the fragrance_similarity_votes graph from
+the raw vote tables.
+
+Usage:
+    python -m backend.commands.rebuild_vote_stats [fragrance_id ...]
+"""
+import asyncio
+import sys
+
+from backend.core.db.session import AsyncSessionLocal
+from backend.routes.fragrance.votes import rebuild_vote_stats, rebuild_similarity_votes
+
+
+async def main(fragrance_ids: list[int] | None = None):
+    async with AsyncSessionLocal() as session:
+        rows = await rebuild_vote_stats(session, fragrance_ids)
+        pairs = await rebuild_similarity_votes(session, fragrance_ids)
+        await session.commit()
+    print(f"Rebuilt vote stats for {rows} fragrance(s) and {pairs} similar fragrance pair(s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main([int(arg) for arg in sys.argv[1:]] or None))
@@ -0,0 +1,25 @@
+"""
+Rewrite fragrance_leaderboard from fragrance_rating_stats now instead of
+waiting for the periodic refresh.
+
+Usage:
+    python -m backend.commands.refresh_leaderboards
+"""
+import asyncio
+
+from backend.core.db.session import AsyncSessionLocal
+from backend.routes.fragrance.leaderboard import refresh_leaderboards
+
+
+async def main():
+    async with AsyncSessionLocal() as session:
+        rows = await refresh_leaderboards(session)
+        await session.commit()
+    if rows is None:
+        print("Another process is refreshing the leaderboards")
+    else:
+        print(f"Refreshed leaderboards with {rows} ranked row(s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
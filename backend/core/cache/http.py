@@ -0,0 +1,38 @@
+from fastapi import HTTPException, Request, Response, status
+
+from backend.core.cache.versions import versions
+from backend.core.configs.config import settings
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def conditional_get(*keys: str, max_age: int | None = None):
+    """
+    Dependency for public GET routes.
+
+    `keys` name the versions the response depends on and may reference path
+    parameters, e.g. "fragrance:{fragrance_id}". A matching If-None-Match is
+    answered with 304 before the route runs any query; otherwise ETag and
+    Cache-Control are added to the response. Until this worker has loaded
+    the shared versions the response is served without either.
+    """
+    async def dependency(request: Request, response: Response):
+        if not versions.ready:
+            return
+        params = {name: int(value) if value.isdigit() else value for name, value in request.path_params.items()}
+        resolved = [key.format(**params) for key in keys]
+        headers = {
+            "ETag": versions.etag(resolved, request.url.query),
+            "Cache-Control": f"public, max-age={settings.http_cache_max_age if max_age is None else max_age}",
+        }
+        if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+    return dependency
@@ -0,0 +1,57 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Tuple
+
+
+class TTLCache:
+    """
+    Small in-process LRU cache whose entries expire after `ttl` seconds.
+
+    Keys are tuples whose first element is a namespace, so related entries can be
+    dropped together with `invalidate(namespace)`. Every invalidation and
+    `pop` bumps `generation`; a value computed before an invalidation can be
+    stored with the generation it was read under and will be discarded instead
+    of resurrecting stale data.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Tuple[Hashable, ...], Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Tuple[Hashable, ...], default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Tuple[Hashable, ...], value: Any, generation: int | None = None) -> None:
+        if generation is not None and generation != self.generation:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Tuple[Hashable, ...]) -> None:
+        self.generation += 1
+        self._data.pop(key, None)
+
+    def invalidate(self, namespace: Hashable | None = None) -> None:
+        self.generation += 1
+        if namespace is None:
+            self._data.clear()
+            return
+        for key in [key for key in self._data if key[0] == namespace]:
+            del self._data[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
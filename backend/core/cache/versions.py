@@ -0,0 +1,142 @@
+import asyncio
+import hashlib
+import logging
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import event, select, text, bindparam, Text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend.core.configs.config import settings
+from backend.core.db import notify
+from backend.core.db.models.cache import CacheVersion
+from backend.core.db.session import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = "pending_version_bumps"
+_LOAD_RETRY_SECONDS = 5
+# pg_notify payloads must stay under 8000 bytes.
+_MAX_PAYLOAD_BYTES = 7000
+
+# Keys are bumped in a fixed order so concurrent writers touching several of
+# the same keys cannot deadlock on their rows.
+_TOUCH_SQL = text("""
+    INSERT INTO cache_versions (key, version)
+    SELECT key, 1 FROM unnest(:keys) AS key ORDER BY key
+    ON CONFLICT (key) DO UPDATE SET version = cache_versions.version + 1
+    RETURNING key, version
+""").bindparams(bindparam("keys", type_=ARRAY(Text)))
+
+
+class VersionRegistry:
+    """
+    Version counters for cacheable resources such as "catalog" or "fragrance:12".
+
+    The counters live in `cache_versions`, so every worker, and every worker
+    after a restart, derives the same ETag for the same data. Write paths call
+    `touch` inside their transaction, which bumps the rows; the new values are
+    applied locally once the transaction commits and a Postgres notification
+    carries them to every other worker, so a version only changes after the
+    new data is visible. ETags are derived from the local copy without
+    querying the database, and are only issued once it has been loaded.
+    """
+
+    def __init__(self, channel: str, epoch: str):
+        self.channel = channel
+        self.epoch = epoch
+        self.ready = False
+        self._versions: Dict[str, int] = {}
+        self._listeners: List[Callable[[Optional[List[str]]], None]] = []
+        self._load_task: asyncio.Task | None = None
+
+    def get(self, key: str) -> int:
+        return self._versions.get(key, 0)
+
+    def etag(self, keys: Iterable[str], variant: str = "") -> str:
+        state = ";".join(f"{key}={self.get(key)}" for key in keys)
+        digest = hashlib.sha1(f"{self.epoch}|{state}|{variant}".encode()).hexdigest()[:20]
+        return f'W/"{digest}"'
+
+    def add_listener(self, listener: Callable[[Optional[List[str]]], None]):
+        """`listener` is called with the bumped keys, or None when every key may have changed."""
+        self._listeners.append(listener)
+
+    def _notify_listeners(self, keys: List[str] | None):
+        for listener in self._listeners:
+            listener(keys)
+
+    def bump(self, versions: Dict[str, int]):
+        """Apply versions read from the table; a key only ever moves forward."""
+        changed = [key for key, version in versions.items() if version > self._versions.get(key, 0)]
+        for key in changed:
+            self._versions[key] = versions[key]
+        if changed:
+            self._notify_listeners(changed)
+
+    async def touch(self, session: AsyncSession, *keys: str):
+        rows = (await session.execute(_TOUCH_SQL, {"keys": sorted(set(keys))})).all()
+        pending = session.info.setdefault(_PENDING_KEY, {})
+        for key, version in rows:
+            pending[key] = max(version, pending.get(key, 0))
+        payload = ""
+        for key, version in rows:
+            entry = f"{key}={version}"
+            if payload and len(payload) + len(entry) >= _MAX_PAYLOAD_BYTES:
+                await notify.notify(session, self.channel, payload)
+                payload = ""
+            payload = f"{payload},{entry}" if payload else entry
+        if payload:
+            await notify.notify(session, self.channel, payload)
+
+    async def load(self):
+        async with AsyncSessionLocal() as session:
+            rows = (await session.execute(select(CacheVersion.key, CacheVersion.version))).all()
+        self.bump({key: version for key, version in rows})
+        self.ready = True
+
+    async def _load_until_ready(self):
+        while True:
+            try:
+                await self.load()
+                return
+            except Exception:
+                logger.exception("Failed to load cache versions, retrying")
+                await asyncio.sleep(_LOAD_RETRY_SECONDS)
+
+    def _reload(self):
+        if self._load_task is None or self._load_task.done():
+            self._load_task = asyncio.get_running_loop().create_task(self._load_until_ready())
+
+    def start(self):
+        notify.add_listener(self.channel, self._on_notify)
+        self._reload()
+
+    def _on_notify(self, payload: str | None):
+        if payload is None:
+            # Bumps may have been missed: stop answering 304s until reloaded.
+            self.ready = False
+            self._notify_listeners(None)
+            self._reload()
+            return
+        versions = {}
+        for entry in payload.split(","):
+            key, _, version = entry.rpartition("=")
+            versions[key] = int(version)
+        self.bump(versions)
+
+
+versions = VersionRegistry(settings.cache_notify_channel, settings.cache_etag_epoch)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending_bumps(session: Session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        versions.bump(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_bumps(session: Session):
+    session.info.pop(_PENDING_KEY, None)
@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings
+from typing import List, Literal
 import cloudinary
 import cloudinary.uploader
 from cloudinary.utils import cloudinary_url
@@ -10,7 +11,9 @@ class Settings(BaseSettings):
     jwt_secret_key: str
     jwt_algorithm: str = "HS256"  
     jwt_access_token_expire_minutes: int = 30  
+    jwt_refresh_token_expire_days: int = 14
     cookie_name: str = "access_token"
+    refresh_cookie_name: str = "refresh_token"
     cookie_secure: bool = True
     cookie_httponly: bool = True
     cookie_samesite: str = "lax"
@@ -18,6 +21,77 @@ class Settings(BaseSettings):
     api_key: str
     api_secret: str
     secure: bool = True
+    count_cache_ttl_seconds: int = 60
+    count_cache_max_entries: int = 1024
+    count_estimate_min_rows: int = 1000
+    facet_cache_ttl_seconds: int = 60
+    facet_price_buckets: List[int] = [0, 50, 100, 200, 500]
+    facet_top_notes: int = 20
+    http_cache_max_age: int = 30
+    detail_similar_limit: int = 5
+    review_page_size: int = 10
+    cache_notify_channel: str = "cache_versions"
+    # Part of every ETag; change it with a deploy that changes response bodies.
+    cache_etag_epoch: str = ""
+    vote_write_mode: Literal["sync", "buffered"] = "sync"
+    vote_buffer_flush_ms: int = 200
+    vote_buffer_max_items: int = 500
+    vote_buffer_max_pending: int = 10000
+    live_tally_interval_ms: int = 1000
+    similarity_top_k: int = 20
+    similarity_batch_size: int = 256
+    similarity_group_weight: float = 0.3
+    # Processes per web worker scoring incremental neighbour refreshes.
+    similarity_refresh_workers: int = 1
+    recommendation_top_k: int = 30
+    recommendation_min_users: int = 2
+    recommendation_refresh_max_users: int = 5000
+    leaderboard_prior_ratings: int = 10
+    leaderboard_min_ratings: int = 1
+    leaderboard_size: int = 100
+    leaderboard_season_min_share: float = 0.25
+    leaderboard_refresh_seconds: int = 300
+    rate_limit_enabled: bool = True
+    rate_limit_vote_burst: int = 20
+    rate_limit_vote_per_minute: int = 60
+    rate_limit_review_burst: int = 3
+    rate_limit_review_per_minute: int = 6
+    rate_limit_anonymous_burst: int = 10
+    rate_limit_anonymous_per_minute: int = 30
+    rate_limit_max_keys: int = 100000
+    rate_limit_trust_forwarded_for: bool = False
+    # Shares the buckets across workers; needs the `redis` package.
+    rate_limit_redis_url: str | None = None
+    principal_cache_ttl_seconds: int = 60
+    principal_cache_max_entries: int = 10000
+    principal_notify_channel: str = "principal_invalidations"
+    revocation_filter_capacity: int = 100000
+    revocation_filter_error_rate: float = 0.001
+    revocation_sync_seconds: int = 30
+    revocation_rebuild_seconds: int = 3600
+    revocation_notify_channel: str = "token_revocations"
+    # Changing the work factor rehashes each password at its next login.
+    password_bcrypt_rounds: int = 12
+    password_hash_workers: int = 4
+    password_hash_max_queue: int = 64
+    login_throttle_enabled: bool = True
+    login_throttle_window_seconds: int = 900
+    login_throttle_free_failures: int = 3
+    login_throttle_base_delay_seconds: float = 1.0
+    login_throttle_max_delay_seconds: float = 60.0
+    # Delays up to this long are slept through instead of answered with 429.
+    login_throttle_max_sleep_seconds: float = 4.0
+    login_throttle_max_sleeping: int = 1000
+    login_throttle_user_max_failures: int = 1000
+    login_throttle_ip_max_failures: int = 100
+    login_throttle_max_keys: int = 100000
+    # "local" writes avatars under avatar_local_directory instead of Cloudinary, e.g. for tests.
+    avatar_storage_backend: Literal["cloudinary", "local"] = "cloudinary"
+    avatar_max_bytes: int = 5 * 1024 * 1024
+    avatar_upload_workers: int = 4
+    avatar_cloudinary_folder: str = "avatars"
+    avatar_local_directory: str = "backend/static/avatars"
+    avatar_local_base_url: str = "/static/avatars"
 
 
 
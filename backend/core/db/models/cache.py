@@ -0,0 +1,14 @@
+from backend.core.db.session import Base
+from sqlalchemy import BigInteger, String
+from sqlalchemy.orm import mapped_column, Mapped
+
+
+class CacheVersion(Base):
+    """
+    The shared version of a cacheable resource such as "catalog" or
+    "fragrance:12", so every worker derives the same ETag from it. A
+    resource without a row is at version 0.
+    """
+    __tablename__ = "cache_versions"
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default="0")
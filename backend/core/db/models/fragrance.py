@@ -1,7 +1,9 @@
 from backend.core.db.session import Base
-from sqlalchemy import BigInteger, String, Text, ForeignKey, Integer, Float, UniqueConstraint, CheckConstraint
+from sqlalchemy import BigInteger, SmallInteger, String, Text, ForeignKey, Integer, Float, DateTime, UniqueConstraint, CheckConstraint, Index, func
 from sqlalchemy.orm import mapped_column, Mapped, relationship, validates
+from sqlalchemy.dialects.postgresql import TSVECTOR, ARRAY
 from typing import List
+from datetime import datetime
 from enum import Enum
 from sqlalchemy import Enum as SqlEnum
 metadata = Base.metadata
@@ -23,6 +25,19 @@ class NoteType(Enum):
     MIDDLE = "middle"
     BASE = "base"
 
+# Fragrance.note_keys stores every note twice: once as `note_id * 4` ("anywhere
+# in the pyramid") and once with its position code added, so a single GIN
+# indexed array answers both scoped and unscoped note filters.
+NOTE_POSITION_CODES = {
+    None: 0,
+    NoteType.TOP: 1,
+    NoteType.MIDDLE: 2,
+    NoteType.BASE: 3,
+}
+
+def note_key(note_id: int, note_type: NoteType | None = None) -> int:
+    return note_id * 4 + NOTE_POSITION_CODES[note_type]
+
 
 
 class Fragrance(Base):
@@ -40,10 +55,23 @@ class Fragrance(Base):
     fragrance_reviews: Mapped[List["Review"]] = relationship(back_populates="fragrance")
     perfumer_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("perfumer.id"), nullable=True)
 
+    # Denormalized search and note filter columns, rebuilt by crud._refresh_derived_columns.
+    search_document: Mapped[str] = mapped_column(Text, nullable=True, deferred=True)
+    search_vector: Mapped[str] = mapped_column(TSVECTOR, nullable=True, deferred=True)
+    note_keys: Mapped[List[int]] = mapped_column(ARRAY(BigInteger), nullable=False, server_default="{}", deferred=True)
 
     users: Mapped[List["Wishlist"]] = relationship(back_populates="fragrance")
     notes: Mapped[List["FragranceNote"]] = relationship(back_populates="fragrance")
     perfumer: Mapped["Perfumer"] = relationship(back_populates="fragrance_perfumer") 
+    __table_args__ = (
+            Index("ix_fragrance_price_id", "price", "id"),
+            Index("ix_fragrance_search_vector", "search_vector", postgresql_using="gin"),
+            Index("ix_fragrance_note_keys", "note_keys", postgresql_using="gin"),
+            Index(
+                "ix_fragrance_search_document_trgm", "search_document",
+                postgresql_using="gin", postgresql_ops={"search_document": "gin_trgm_ops"}
+            ),
+    )
 
 class Perfumer(Base):
     __tablename__  = "perfumer"
@@ -112,6 +140,11 @@ class Review(Base):
 
     user: Mapped["User"] = relationship(back_populates="reviews")
     fragrance: Mapped["Fragrance"] = relationship(back_populates="fragrance_reviews")
+    __table_args__ = (
+            Index("ix_reviews_fragrance_id_id", "fragrance_id", "id"),
+            Index("ix_reviews_fragrance_id_rating_id", "fragrance_id", "rating", "id"),
+            Index("ix_reviews_user_id_fragrance_id", "user_id", "fragrance_id"),
+    )
     @validates("rating")
     def validate_rating(self, key, rating):
         if not (1 <= rating <= 10):
@@ -129,6 +162,27 @@ class Review(Base):
         return content.strip()
 
 
+# Ratings run from 1.0 to 10.0 in 0.5 steps; histogram slot i (1-based, as in
+# Postgres arrays) counts ratings of i / 2 + 0.5.
+RATING_HISTOGRAM_SIZE = 19
+
+def rating_bucket(rating: float) -> int:
+    return int(rating * 2) - 1
+
+
+class FragranceRatingStats(Base):
+    """Per-fragrance rating aggregate, kept in step with `reviews` by routes/fragrance/ratings.py."""
+    __tablename__ = "fragrance_rating_stats"
+
+    fragrance_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("fragrance.id", ondelete="CASCADE"), primary_key=True)
+    rating_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    rating_sum: Mapped[float] = mapped_column(Float, nullable=False, default=0, server_default="0")
+    rating_histogram: Mapped[List[int]] = mapped_column(
+        ARRAY(Integer), nullable=False,
+        server_default="{" + ",".join(["0"] * RATING_HISTOGRAM_SIZE) + "}"
+    )
+
+
 class Wishlist(Base):
     __tablename__ = "user_fragrance"
 
@@ -142,6 +196,9 @@ class Wishlist(Base):
 
     user: Mapped["User"] = relationship(back_populates="wishlist")
     fragrance: Mapped["Fragrance"] = relationship(back_populates="users")
+    __table_args__ = (
+            Index("ix_user_fragrance_user_id_fragrance_id", "user_id", "fragrance_id"),
+    )
 
 
 class Gender(Enum):
@@ -170,14 +227,20 @@ class Season(Enum):
     summer = "summer"
     fall = "fall"
 
-class FragranceSeason(Base):
-    __tablename__ = "fragrance_season"
+# Bit of each season in FragranceSeasonVote.mask.
+SEASON_BITS = {season: 1 << position for position, season in enumerate(Season)}
 
-    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
 
-    user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id"), index=True)
-    fragrance_id: Mapped[int] = mapped_column(BigInteger,ForeignKey("fragrance.id"), index=True)
-    season: Mapped[Season] = mapped_column(SqlEnum(Season), nullable=False)
+class FragranceSeasonVote(Base):
+    """A user's season votes for one fragrance as a bitmask of SEASON_BITS; toggling flips one bit."""
+    __tablename__ = "fragrance_season_vote"
+
+    user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id"), primary_key=True)
+    fragrance_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("fragrance.id"), primary_key=True, index=True)
+    mask: Mapped[int] = mapped_column(SmallInteger, nullable=False, default=0, server_default="0")
+    __table_args__ = (
+            CheckConstraint(f"mask BETWEEN 0 AND {(1 << len(Season)) - 1}", name="fragrance_season_vote_mask_check"),
+    )
 
 
 class Sillage(Enum):
@@ -253,8 +316,94 @@ class FragranceSimilar(Base):
             name="similar_fragrances_constraint"
         ),
         UniqueConstraint(
-            "fragrance_id", "fragrance_that_similar_id",
-            name="fragrance_similar_fragrance_constraint"
+            "user_id", "fragrance_id", "fragrance_that_similar_id",
+            name="fragrance_similar_fragrance_user_constraint"
         ),
     )
 
+
+class FragranceSimilarityVotes(Base):
+    """Vote count per (fragrance, similar fragrance) pair, kept in step with `similar_fragrance` by routes/fragrance/votes.py."""
+    __tablename__ = "fragrance_similarity_votes"
+
+    fragrance_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("fragrance.id", ondelete="CASCADE"), primary_key=True)
+    similar_fragrance_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("fragrance.id", ondelete="CASCADE"), primary_key=True)
+    votes: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        Index("ix_fragrance_similarity_votes_rank", "fragrance_id", votes.desc(), "similar_fragrance_id"),
+    )
+
+
+
+class FragranceContentNeighbor(Base):
+    """Top-k fragrances by note pyramid cosine similarity, written by routes/fragrance/similarity.py."""
+    __tablename__ = "fragrance_content_neighbors"
+
+    fragrance_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("fragrance.id", ondelete="CASCADE"), primary_key=True)
+    rank: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    neighbor_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("fragrance.id", ondelete="CASCADE"), index=True)
+    score: Mapped[float] = mapped_column(Float, nullable=False)
+
+
+class FragranceCollaborativeNeighbor(Base):
+    """Top-k fragrances by co-occurrence in wishlists and ratings, written by routes/fragrance/recommendations.py."""
+    __tablename__ = "fragrance_collaborative_neighbors"
+
+    fragrance_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("fragrance.id", ondelete="CASCADE"), primary_key=True)
+    rank: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    neighbor_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("fragrance.id", ondelete="CASCADE"), index=True)
+    score: Mapped[float] = mapped_column(Float, nullable=False)
+
+
+class FragranceLeaderboard(Base):
+    """
+    Ranked Bayesian rating leaderboards, rewritten periodically by
+    routes/fragrance/leaderboard.py. `scope` is "overall", "company", "type" or
+    "season" and `scope_key` the company id, fragrance type or season name
+    ("" for overall), so a page is a primary key range.
+    """
+    __tablename__ = "fragrance_leaderboard"
+
+    scope: Mapped[str] = mapped_column(String(16), primary_key=True)
+    scope_key: Mapped[str] = mapped_column(String(32), primary_key=True)
+    rank: Mapped[int] = mapped_column(Integer, primary_key=True)
+    fragrance_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("fragrance.id", ondelete="CASCADE"), index=True)
+    score: Mapped[float] = mapped_column(Float, nullable=False)
+    rating_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    refreshed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+
+class FragranceVoteStats(Base):
+    """Per-fragrance vote counters, kept in step with the vote tables by routes/fragrance/votes.py."""
+    __tablename__ = "fragrance_vote_stats"
+
+    fragrance_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("fragrance.id", ondelete="CASCADE"), primary_key=True)
+
+    gender_male: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    gender_mostly_male: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    gender_female: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    gender_mostly_female: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    gender_unisex: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
+    season_winter: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    season_spring: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    season_summer: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    season_fall: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
+    longevity_very_weak: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    longevity_weak: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    longevity_moderate: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    longevity_long_lasting: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    longevity_eternal: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
+    sillage_intimate: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    sillage_moderate: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    sillage_strong: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    sillage_enormous: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
+    price_value_way_overpriced: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    price_value_overpriced: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    price_value_ok: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    price_value_good_value: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    price_value_great_value: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
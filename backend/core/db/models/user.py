@@ -1,7 +1,8 @@
 from backend.core.db.session import Base
-from sqlalchemy import BigInteger, String, Text, Enum
+from sqlalchemy import BigInteger, String, Text, Enum, DateTime, func
 from sqlalchemy.orm import mapped_column, Mapped, relationship
 from typing import List
+from datetime import datetime
 import enum
 from sqlalchemy import Enum as SqlEnum
 
@@ -29,3 +30,16 @@ class User(Base):
 
     reviews: Mapped[List["Review"]] = relationship(back_populates="user")
     wishlist: Mapped[List["Wishlist"]] = relationship(back_populates="user")
+
+
+class RevokedToken(Base):
+    """
+    A token id (`jti`) that must no longer be accepted. Rows are only needed
+    until the token would have expired anyway; the monotonically increasing
+    `id` lets workers pick up new revocations incrementally.
+    """
+    __tablename__ = "revoked_tokens"
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    jti: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True, nullable=False)
+    revoked_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional
+
+import asyncpg
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.core.configs.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Handlers get the notification payload, or None after the listener had to
+# reconnect and may have missed notifications in between.
+Handler = Callable[[Optional[str]], None]
+
+_handlers: Dict[str, List[Handler]] = {}
+_connection: asyncpg.Connection | None = None
+_task: asyncio.Task | None = None
+_RECONNECT_DELAY_SECONDS = 5
+
+
+def add_listener(channel: str, handler: Handler):
+    _handlers.setdefault(channel, []).append(handler)
+    if _connection is not None and not _connection.is_closed() and len(_handlers[channel]) == 1:
+        asyncio.get_running_loop().create_task(_connection.add_listener(channel, _dispatch))
+
+
+async def notify(session: AsyncSession, channel: str, payload: str):
+    """Queue a notification on the session's transaction; Postgres delivers it on commit."""
+    await session.execute(select(func.pg_notify(channel, payload)))
+
+
+def _dispatch(connection, pid, channel, payload):
+    for handler in _handlers.get(channel, []):
+        try:
+            handler(payload)
+        except Exception:
+            logger.exception("Notification handler for %s failed", channel)
+
+
+async def _listen():
+    global _connection
+    reconnecting = False
+    dsn = settings.database_url.replace("postgresql+asyncpg://", "postgresql://")
+    while True:
+        try:
+            _connection = await asyncpg.connect(dsn)
+            closed = asyncio.Event()
+            _connection.add_termination_listener(lambda connection: closed.set())
+            for channel in _handlers:
+                await _connection.add_listener(channel, _dispatch)
+            if reconnecting:
+                for channel in _handlers:
+                    _dispatch(_connection, None, channel, None)
+            await closed.wait()
+            logger.warning("Notification listener connection closed, reconnecting")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Notification listener failed to connect")
+        reconnecting = True
+        await asyncio.sleep(_RECONNECT_DELAY_SECONDS)
+
+
+async def start():
+    global _task
+    if _task is None:
+        _task = asyncio.create_task(_listen())
+
+
+async def stop():
+    global _task, _connection
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+    if _connection is not None and not _connection.is_closed():
+        await _connection.close()
+    _connection = None
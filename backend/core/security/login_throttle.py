@@ -0,0 +1,167 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Tuple
+
+from fastapi import HTTPException, status
+
+from backend.core.configs.config import settings
+
+
+class FailureWindows:
+    """
+    Timestamps of recent attempts per key within a sliding `window`. Only the
+    least recently used `maxsize` keys are kept; an evicted key starts clean.
+    """
+
+    def __init__(self, window: float, maxsize: int):
+        self.window = window
+        self.maxsize = maxsize
+        self._windows: "OrderedDict[str, Deque[float]]" = OrderedDict()
+
+    def recent(self, key: str, now: float) -> Deque[float]:
+        attempts = self._windows.get(key)
+        if attempts is None:
+            return deque()
+        while attempts and attempts[0] <= now - self.window:
+            attempts.popleft()
+        return attempts
+
+    def add(self, key: str, at: float):
+        self._windows.setdefault(key, deque()).append(at)
+        self._windows.move_to_end(key)
+        while len(self._windows) > self.maxsize:
+            self._windows.popitem(last=False)
+
+    def discard_last(self, key: str):
+        attempts = self._windows.get(key)
+        if attempts:
+            attempts.pop()
+
+    def clear(self, key: str):
+        self._windows.pop(key, None)
+
+
+class LoginThrottle:
+    """
+    Per-worker throttling of login attempts, so credential stuffing is slowed
+    down or turned away before it costs a bcrypt verify.
+
+    Every attempt counts as a failure until it succeeds. The strict limit is
+    per username and client IP: after `free_failures` failures in the window,
+    each further attempt from that client is held back by `base_delay`
+    seconds, doubling per failure up to `max_delay`. Concurrent attempts
+    queue behind each other, each waiting for its own slot. A wait up to
+    `max_sleep` is served by sleeping before the password is checked (at
+    most `max_sleeping` requests at once); a longer one is refused with 429.
+
+    Only looser ceilings apply across clients, so nobody can lock an account
+    by failing its password from elsewhere: `user_max_failures` per username,
+    which does not apply to IPs that have logged into that account before,
+    and `ip_max_failures` per IP. A successful login clears its client's
+    failures.
+    """
+
+    def __init__(
+        self,
+        window: float,
+        free_failures: int,
+        base_delay: float,
+        max_delay: float,
+        max_sleep: float,
+        max_sleeping: int,
+        user_max_failures: int,
+        ip_max_failures: int,
+        maxsize: int
+    ):
+        self.window = window
+        self.free_failures = free_failures
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_sleep = max_sleep
+        self.max_sleeping = max_sleeping
+        self.user_max_failures = user_max_failures
+        self.ip_max_failures = ip_max_failures
+        self.maxsize = maxsize
+        self._failures = FailureWindows(window, maxsize)
+        self._trusted: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+        self._sleeping = 0
+
+    def _delay(self, failures: int) -> float:
+        if failures <= self.free_failures:
+            return 0.0
+        return min(self.max_delay, self.base_delay * 2 ** (failures - self.free_failures - 1))
+
+    def _ceiling_wait(self, key: str, limit: int, now: float) -> float:
+        failures = self._failures.recent(key, now)
+        if len(failures) < limit:
+            return 0.0
+        return failures[-limit] + self.window - now
+
+    def wait(self, username: str, ip: str, now: float) -> Tuple[float, float]:
+        """(seconds until this client's next attempt slot, seconds until a ceiling lifts)."""
+        username = username.lower()
+        client = self._failures.recent(f"client:{username}:{ip}", now)
+        delay = max(0.0, client[-1] + self._delay(len(client)) - now) if client else 0.0
+        ceiling = self._ceiling_wait(f"ip:{ip}", self.ip_max_failures, now)
+        if (username, ip) not in self._trusted:
+            ceiling = max(ceiling, self._ceiling_wait(f"user:{username}", self.user_max_failures, now))
+        return delay, ceiling
+
+    def _refuse(self, retry_after: float):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed login attempts",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+    async def check(self, username: str, ip: str):
+        """
+        Hold the attempt back for its client's progressive delay, or refuse it
+        with 429, then count it as a failure until `succeeded`.
+        """
+        if not settings.login_throttle_enabled:
+            return
+        now = time.monotonic()
+        delay, ceiling = self.wait(username, ip, now)
+        if ceiling > 0:
+            self._refuse(ceiling)
+        if delay > self.max_sleep or (delay > 0 and self._sleeping >= self.max_sleeping):
+            self._refuse(delay)
+        username = username.lower()
+        # The slot is claimed before sleeping so concurrent attempts queue up.
+        self._failures.add(f"client:{username}:{ip}", now + delay)
+        self._failures.add(f"user:{username}", now)
+        self._failures.add(f"ip:{ip}", now)
+        if delay > 0:
+            self._sleeping += 1
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                self._sleeping -= 1
+
+    def succeeded(self, username: str, ip: str):
+        if not settings.login_throttle_enabled:
+            return
+        username = username.lower()
+        self._failures.clear(f"client:{username}:{ip}")
+        self._failures.discard_last(f"user:{username}")
+        self._failures.discard_last(f"ip:{ip}")
+        self._trusted[(username, ip)] = None
+        self._trusted.move_to_end((username, ip))
+        while len(self._trusted) > self.maxsize:
+            self._trusted.popitem(last=False)
+
+
+login_throttle = LoginThrottle(
+    window=settings.login_throttle_window_seconds,
+    free_failures=settings.login_throttle_free_failures,
+    base_delay=settings.login_throttle_base_delay_seconds,
+    max_delay=settings.login_throttle_max_delay_seconds,
+    max_sleep=settings.login_throttle_max_sleep_seconds,
+    max_sleeping=settings.login_throttle_max_sleeping,
+    user_max_failures=settings.login_throttle_user_max_failures,
+    ip_max_failures=settings.login_throttle_ip_max_failures,
+    maxsize=settings.login_throttle_max_keys,
+)
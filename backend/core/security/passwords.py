@@ -0,0 +1,87 @@
+import asyncio
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Tuple
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from backend.core.configs.config import settings
+
+
+class PasswordHasher:
+    """
+    bcrypt on a bounded thread pool, so a hash or verify never blocks the event
+    loop. bcrypt releases the GIL while it works, so threads run in parallel.
+
+    At most `workers` run at once and `max_queue` more wait; beyond that a
+    request is refused with 503 instead of piling up behind a login storm.
+    Hashes made with a different work factor than `rounds`, higher or lower,
+    are reported for rehashing by `verify_and_update`.
+    """
+
+    def __init__(self, rounds: int, workers: int, max_queue: int):
+        self.context = CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__rounds=rounds,
+            bcrypt__min_rounds=rounds,
+            bcrypt__max_rounds=rounds,
+        )
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: ThreadPoolExecutor | None = None
+        self._pending = 0
+        self._rejected = 0
+        self._dummy_hash: str | None = None
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.workers + self.max_queue:
+            self._rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many password checks in progress",
+                headers={"Retry-After": "1"},
+            )
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(self.context.verify, password, hashed_password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, str | None]:
+        """(matches, new hash or None); the new hash is set only when the password matches and the work factor changed."""
+        return await self._run(self.context.verify_and_update, password, hashed_password)
+
+    async def verify_dummy(self, password: str) -> bool:
+        """
+        A verify against a throwaway hash at the current work factor, so a
+        login for an unknown user takes as long as a wrong password. Always False.
+        """
+        if self._dummy_hash is None:
+            self._dummy_hash = await self.hash(secrets.token_urlsafe(16))
+        await self.verify(password, self._dummy_hash)
+        return False
+
+    def stats(self) -> Dict[str, int]:
+        return {"workers": self.workers, "max_queue": self.max_queue, "pending": self._pending, "rejected": self._rejected}
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    rounds=settings.password_bcrypt_rounds,
+    workers=settings.password_hash_workers,
+    max_queue=settings.password_hash_max_queue,
+)
@@ -0,0 +1,109 @@
+import json
+from dataclasses import dataclass
+from typing import Dict, Set
+
+from sqlalchemy import event, inspect, select, func
+from sqlalchemy.orm import Session
+
+from backend.core.cache.ttl_cache import TTLCache
+from backend.core.configs.config import settings
+from backend.core.db import notify
+from backend.core.db.models.user import User, Role
+
+_PENDING_KEY = "pending_principal_invalidations"
+_NAMESPACE = "principal"
+
+# Changing any of these makes a cached principal stale.
+_PRINCIPAL_FIELDS = ("id", "username", "email", "role", "ava")
+
+
+@dataclass(frozen=True)
+class Principal:
+    """What authenticated routes need to know about the caller, without an ORM instance."""
+    id: int
+    username: str
+    email: str
+    role: Role
+    ava: str | None = None
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(id=user.id, username=user.username, email=user.email, role=user.role, ava=user.ava)
+
+
+class PrincipalCache:
+    """
+    Per-worker TTL and LRU bounded cache of principals keyed by token subject.
+
+    Any ORM change to a user's cached fields, or deleting the user, drops the
+    old and new usernames here once the transaction commits, and a Postgres
+    notification drops them on every other worker. Entries that miss an
+    invalidation (e.g. a raw SQL update) still expire after the TTL.
+    """
+
+    def __init__(self, ttl: float, maxsize: int, channel: str):
+        self.cache = TTLCache(ttl=ttl, maxsize=maxsize)
+        self.channel = channel
+
+    @property
+    def generation(self) -> int:
+        return self.cache.generation
+
+    def get(self, subject: str) -> Principal | None:
+        return self.cache.get((_NAMESPACE, subject))
+
+    def set(self, subject: str, principal: Principal, generation: int):
+        self.cache.set((_NAMESPACE, subject), principal, generation)
+
+    def invalidate(self, subjects: Set[str] | None = None):
+        if subjects is None:
+            self.cache.invalidate(_NAMESPACE)
+            return
+        for subject in subjects:
+            self.cache.pop((_NAMESPACE, subject))
+
+    def stats(self) -> Dict[str, float]:
+        stats = self.cache.stats()
+        lookups = stats["hits"] + stats["misses"]
+        return {**stats, "hit_ratio": round(stats["hits"] / lookups, 4) if lookups else 0.0}
+
+    def start(self):
+        notify.add_listener(self.channel, self._on_notify)
+
+    def _on_notify(self, payload: str | None):
+        self.invalidate(None if payload is None else set(json.loads(payload)))
+
+
+principal_cache = PrincipalCache(
+    ttl=settings.principal_cache_ttl_seconds,
+    maxsize=settings.principal_cache_max_entries,
+    channel=settings.principal_notify_channel,
+)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session: Session, flush_context):
+    subjects = set()
+    for instance in session.dirty | session.deleted:
+        if not isinstance(instance, User):
+            continue
+        state = inspect(instance)
+        if instance in session.deleted or any(state.attrs[field].history.has_changes() for field in _PRINCIPAL_FIELDS):
+            history = state.attrs.username.history
+            subjects.update(value for value in (*history.deleted, *history.unchanged, *history.added) if value)
+    if subjects:
+        session.info.setdefault(_PENDING_KEY, set()).update(subjects)
+        # Delivered to the other workers only if the transaction commits.
+        session.connection().execute(select(func.pg_notify(principal_cache.channel, json.dumps(sorted(subjects)))))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending_invalidations(session: Session):
+    subjects = session.info.pop(_PENDING_KEY, None)
+    if subjects:
+        principal_cache.invalidate(subjects)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_invalidations(session: Session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,160 @@
+import logging
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+from fastapi import HTTPException, Request, status
+from jose import JWTError, jwt
+
+from backend.core.configs.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Limit:
+    """A token bucket: `burst` requests at once, refilled at `per_minute` requests a minute."""
+    burst: int
+    per_minute: int
+
+    @property
+    def rate(self) -> float:
+        return self.per_minute / 60
+
+
+def _limits() -> Dict[str, Limit]:
+    return {
+        "vote": Limit(settings.rate_limit_vote_burst, settings.rate_limit_vote_per_minute),
+        "review": Limit(settings.rate_limit_review_burst, settings.rate_limit_review_per_minute),
+        "anonymous": Limit(settings.rate_limit_anonymous_burst, settings.rate_limit_anonymous_per_minute),
+    }
+
+
+class LocalBuckets:
+    """
+    Per-worker token buckets. Only the least recently used `maxsize` keys are
+    kept; an evicted key simply starts again with a full bucket.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, limit: Limit) -> float:
+        """Take one token; returns 0 if allowed, otherwise the seconds until a token is available."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (limit.burst, now))
+        tokens = min(limit.burst, tokens + (now - updated) * limit.rate)
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / limit.rate
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+
+# Same algorithm as LocalBuckets, run atomically in Redis on its own clock so
+# every worker shares one bucket per key.
+_TAKE_SCRIPT = """
+local burst = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + (now - updated) * rate)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return tostring(retry_after)
+"""
+
+
+class RedisBuckets:
+    """
+    Token buckets shared by every worker through Redis. `redis` is only
+    imported when `rate_limit_redis_url` is set. If Redis cannot be reached
+    the worker falls back to its local buckets rather than failing requests.
+    """
+
+    def __init__(self, url: str, fallback: LocalBuckets):
+        from redis.asyncio import Redis
+
+        self._redis = Redis.from_url(url)
+        self._take = self._redis.register_script(_TAKE_SCRIPT)
+        self._fallback = fallback
+
+    async def take(self, key: str, limit: Limit) -> float:
+        try:
+            return float(await self._take(keys=[f"rate_limit:{key}"], args=[limit.burst, limit.rate]))
+        except Exception:
+            logger.exception("Rate limit backend unavailable, using local buckets")
+            return await self._fallback.take(key, limit)
+
+
+_local = LocalBuckets(maxsize=settings.rate_limit_max_keys)
+buckets = RedisBuckets(settings.rate_limit_redis_url, _local) if settings.rate_limit_redis_url else _local
+
+
+def client_ip(request: Request) -> str:
+    if settings.rate_limit_trust_forwarded_for:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def client_key(request: Request) -> str:
+    """
+    "user:<id>" from a valid access token (bearer header or cookie), checked
+    by signature only so no database session is needed, else "ip:<address>".
+    Tokens issued before the "uid" claim existed are keyed by "username:<sub>".
+    """
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        token = request.cookies.get(settings.cookie_name)
+    if token:
+        try:
+            payload = jwt.decode(token, key=settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
+        except JWTError:
+            payload = {}
+        if payload.get("uid") is not None:
+            return f"user:{payload['uid']}"
+        if payload.get("sub") is not None:
+            return f"username:{payload['sub']}"
+    return f"ip:{client_ip(request)}"
+
+
+def rate_limit(route_class: str):
+    """
+    Dependency limiting a class of routes ("vote", "review", "anonymous") per
+    client. List it in the route's `dependencies` so it runs before
+    `require_role` and the session dependency, and a rejected request costs
+    no database work.
+    """
+    limit = _limits()[route_class]
+
+    async def dependency(request: Request):
+        if not settings.rate_limit_enabled:
+            return
+        retry_after = await buckets.take(f"{route_class}:{client_key(request)}", limit)
+        if retry_after > 0:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+    return dependency
@@ -0,0 +1,179 @@
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import select, delete, exists, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.core.configs.config import settings
+from backend.core.db import notify
+from backend.core.db.models.user import RevokedToken
+from backend.core.db.session import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """
+    Fixed-size set membership with no false negatives and about `error_rate`
+    false positives while it holds at most `capacity` keys.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        # Double hashing: k positions from the two halves of one digest.
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationList:
+    """
+    Per-worker view of `revoked_tokens`. Every token id is tested against an
+    in-memory Bloom filter first, and only a positive is confirmed against
+    the table, so an unrevoked token never costs a query.
+
+    The filter is loaded at startup, picks up new rows by id every
+    `sync_seconds` and the revoking worker's notification immediately, and is
+    rebuilt from the unexpired rows every `rebuild_seconds`, which also drops
+    expired revocations and catches ids committed out of order. Until the
+    first load finishes every token is checked against the table.
+    """
+
+    def __init__(self, capacity: int, error_rate: float, sync_seconds: int, rebuild_seconds: int, channel: str):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_seconds = sync_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self.channel = channel
+        self._filter = BloomFilter(capacity, error_rate)
+        self._last_id = 0
+        self._ready = False
+        self._rebuild_requested = False
+        # Revocations seen while a rebuild is loading, replayed into the new filter.
+        self._during_rebuild: List[str] | None = None
+        self._task: asyncio.Task | None = None
+
+    def _add(self, jti: str):
+        self._filter.add(jti)
+        if self._during_rebuild is not None:
+            self._during_rebuild.append(jti)
+
+    def might_be_revoked(self, jti: str) -> bool:
+        return not self._ready or jti in self._filter
+
+    async def is_revoked(self, session: AsyncSession, jti: str) -> bool:
+        return bool(await session.scalar(select(exists().where(RevokedToken.jti == jti))))
+
+    async def revoke(self, session: AsyncSession, jti: str, expires_at: datetime) -> bool:
+        """
+        Revoke `jti` in the caller's transaction. Returns False when it was
+        already revoked, which lets refresh token rotation detect reuse.
+        """
+        revoked_id = await session.scalar(
+            insert(RevokedToken)
+            .values(jti=jti, expires_at=expires_at)
+            .on_conflict_do_nothing(index_elements=[RevokedToken.jti])
+            .returning(RevokedToken.id)
+        )
+        if revoked_id is None:
+            return False
+        # Added before commit: if the transaction rolls back this is only a
+        # false positive, answered by the table.
+        self._add(jti)
+        await notify.notify(session, self.channel, jti)
+        return True
+
+    async def rebuild(self):
+        self._during_rebuild = []
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.execute(delete(RevokedToken).where(RevokedToken.expires_at < func.now()))
+                last_id = await session.scalar(select(func.coalesce(func.max(RevokedToken.id), 0)))
+                jtis = (await session.scalars(select(RevokedToken.jti).where(RevokedToken.id <= last_id))).all()
+                await session.commit()
+            rebuilt = BloomFilter(max(self.capacity, 2 * len(jtis)), self.error_rate)
+            for jti in (*jtis, *self._during_rebuild):
+                rebuilt.add(jti)
+            self._filter, self._last_id, self._ready = rebuilt, last_id, True
+        finally:
+            self._during_rebuild = None
+        logger.info("Loaded %d revoked tokens", len(jtis))
+
+    async def sync(self):
+        async with AsyncSessionLocal() as session:
+            rows = (await session.execute(
+                select(RevokedToken.id, RevokedToken.jti)
+                .where(RevokedToken.id > self._last_id)
+                .order_by(RevokedToken.id)
+            )).all()
+        for row in rows:
+            self._filter.add(row.jti)
+            self._last_id = row.id
+        if self._filter.count > self._filter.capacity:
+            # Past its capacity the false positive rate climbs; resize.
+            self._rebuild_requested = True
+
+    def start(self):
+        notify.add_listener(self.channel, self._on_notify)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _on_notify(self, payload: str | None):
+        if payload is None:
+            self._rebuild_requested = True
+        else:
+            self._add(payload)
+
+    async def _run(self):
+        rebuilt_at = None
+        while True:
+            try:
+                if rebuilt_at is None or self._rebuild_requested or time.monotonic() - rebuilt_at >= self.rebuild_seconds:
+                    self._rebuild_requested = False
+                    await self.rebuild()
+                    rebuilt_at = time.monotonic()
+                else:
+                    await self.sync()
+            except Exception:
+                logger.exception("Failed to sync revoked tokens")
+            await asyncio.sleep(self.sync_seconds)
+
+
+revocation_list = RevocationList(
+    capacity=settings.revocation_filter_capacity,
+    error_rate=settings.revocation_filter_error_rate,
+    sync_seconds=settings.revocation_sync_seconds,
+    rebuild_seconds=settings.revocation_rebuild_seconds,
+    channel=settings.revocation_notify_channel,
+)
@@ -0,0 +1,364 @@
+import asyncio
+import io
+import logging
+import os
+import queue
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import BinaryIO, Dict, Iterable, List, Tuple
+
+import cloudinary.uploader
+from fastapi import HTTPException, Request, status
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from backend.core.configs.config import settings
+
+logger = logging.getLogger(__name__)
+
+_CHUNK_SIZE = 64 * 1024
+# Room for the multipart boundaries, part headers and the small text fields.
+_FORM_OVERHEAD_BYTES = 16 * 1024
+_MAX_FIELD_BYTES = 1024
+# Chunks buffered between the request and a storage thread that is behind.
+_PIPE_CHUNKS = 8
+_MAGIC_BYTES = 12
+
+# Leading bytes of each accepted format; the client's content type is not trusted.
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+)
+
+
+def image_extension(head: bytes) -> str | None:
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    for signature, extension in _SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    return None
+
+
+class UploadAborted(Exception):
+    pass
+
+
+_FINISHED = object()
+_ABORTED = object()
+
+
+class ChunkPipe(io.RawIOBase):
+    """
+    A blocking file object for a storage thread, fed chunks by the event loop.
+    At most `max_chunks` are buffered; `feed` waits for the reader beyond that.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_chunks: int = _PIPE_CHUNKS):
+        super().__init__()
+        self._loop = loop
+        self._max_chunks = max_chunks
+        self._queue: "queue.Queue" = queue.Queue()
+        self._slots = asyncio.Semaphore(max_chunks)
+        self._buffer = b""
+        self._eof = False
+        self._reader_done = False
+
+    async def feed(self, chunk: bytes):
+        await self._slots.acquire()
+        if self._reader_done:
+            raise UploadAborted("storage stopped reading")
+        self._queue.put(chunk)
+
+    def finish(self):
+        self._queue.put(_FINISHED)
+
+    def abort(self):
+        self._queue.put(_ABORTED)
+
+    def reader_done(self):
+        """Called on the loop once the storage thread returned, so `feed` never waits on it again."""
+        self._reader_done = True
+        for _ in range(self._max_chunks):
+            self._slots.release()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._buffer and not self._eof:
+            item = self._queue.get()
+            if item is _FINISHED:
+                self._eof = True
+            elif item is _ABORTED:
+                raise UploadAborted("upload aborted")
+            else:
+                self._buffer = item
+                self._loop.call_soon_threadsafe(self._slots.release)
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+class CloudinaryStorage:
+    """
+    Uploads to Cloudinary under a fresh public id, so concurrent uploads never
+    collide. The client library reads the stream into its request itself.
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+
+    def save(self, stream: BinaryIO, extension: str) -> str:
+        public_id = uuid.uuid4().hex
+        response = cloudinary.uploader.upload(
+            stream,
+            public_id=public_id,
+            folder=self.folder,
+            filename=f"{public_id}.{extension}",
+            resource_type="image",
+            overwrite=False,
+        )
+        return response.get("secure_url")
+
+    def delete(self, url: str):
+        public_id = url.rsplit("/", 1)[-1].rsplit(".", 1)[0]
+        cloudinary.uploader.destroy(f"{self.folder}/{public_id}", resource_type="image")
+
+
+class LocalStorage:
+    """
+    Writes avatars under `directory` and serves them from `base_url`; a
+    stand-in for Cloudinary. Chunks go to disk as they arrive, and the file
+    only appears under its final name once complete.
+    """
+
+    def __init__(self, directory: str, base_url: str):
+        self.directory = directory
+        self.base_url = base_url.rstrip("/")
+
+    def save(self, stream: BinaryIO, extension: str) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"{uuid.uuid4().hex}.{extension}"
+        path = os.path.join(self.directory, name)
+        try:
+            with open(f"{path}.part", "xb") as destination:
+                while chunk := stream.read(_CHUNK_SIZE):
+                    destination.write(chunk)
+            os.replace(f"{path}.part", path)
+        except BaseException:
+            if os.path.exists(f"{path}.part"):
+                os.remove(f"{path}.part")
+            raise
+        return f"{self.base_url}/{name}"
+
+    def delete(self, url: str):
+        path = os.path.join(self.directory, os.path.basename(url))
+        if os.path.exists(path):
+            os.remove(path)
+
+
+@dataclass
+class _Part:
+    headers: Dict[bytes, bytes] = field(default_factory=dict)
+    name: str = ""
+    filename: str | None = None
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Avatar must be at most {max_bytes // 1024} KiB"
+    )
+
+
+def _not_an_image() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Only JPEG, PNG, GIF and WebP images are allowed")
+
+
+class _AvatarUpload:
+    """One image part streamed to storage: checked by magic bytes first, then by size as it flows."""
+
+    def __init__(self, uploader: "AvatarUploader"):
+        self.uploader = uploader
+        self.head = b""
+        self.size = 0
+        self.pipe: ChunkPipe | None = None
+        self.future: asyncio.Future | None = None
+
+    async def _start(self):
+        extension = image_extension(self.head)
+        if extension is None:
+            raise _not_an_image()
+        loop = asyncio.get_running_loop()
+        self.pipe = ChunkPipe(loop)
+        self.future = loop.run_in_executor(self.uploader.executor(), self.uploader.storage.save, self.pipe, extension)
+        self.future.add_done_callback(lambda _: self.pipe.reader_done())
+        await self.pipe.feed(self.head)
+
+    async def write(self, data: bytes):
+        self.size += len(data)
+        if self.size > self.uploader.max_bytes:
+            raise _too_large(self.uploader.max_bytes)
+        try:
+            if self.pipe is None:
+                self.head += data
+                if len(self.head) >= _MAGIC_BYTES:
+                    await self._start()
+            else:
+                await self.pipe.feed(data)
+        except UploadAborted:
+            # The storage thread gave up before the image was complete.
+            await self._result()
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='problem with ava upload')
+
+    async def _result(self) -> str:
+        try:
+            url = await self.future
+        except Exception:
+            logger.exception("Avatar upload failed")
+            url = None
+        if url is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='problem with ava upload')
+        return url
+
+    async def finish(self) -> str | None:
+        if self.pipe is None:
+            if not self.head:
+                # A file input left empty.
+                return None
+            await self._start()
+        self.pipe.finish()
+        return await self._result()
+
+    async def abort(self):
+        if self.pipe is not None:
+            self.pipe.abort()
+            try:
+                await self.future
+            except Exception:
+                pass
+
+
+class AvatarUploader:
+    """
+    Reads a multipart form straight from the request stream, without
+    Starlette's spooled temp file, and streams its avatar part to storage on
+    a small thread pool while it arrives. The request is refused with 413 as
+    soon as its declared length or the bytes received pass the limit, and
+    with 400 as soon as the first bytes of the image do not match a
+    supported format.
+    """
+
+    def __init__(self, storage: CloudinaryStorage | LocalStorage, max_bytes: int, workers: int):
+        self.storage = storage
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self._executor: ThreadPoolExecutor | None = None
+
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="avatar-upload")
+        return self._executor
+
+    async def receive_form(self, request: Request, fields: Iterable[str], file_field: str = "file") -> Tuple[Dict[str, str], str | None]:
+        """
+        The text `fields` of a multipart request and the URL of its uploaded
+        `file_field` image, if any. Other parts are read and dropped.
+        """
+        fields = set(fields)
+        content_type, options = parse_options_header(request.headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or b"boundary" not in options:
+            return {}, None
+        body_limit = self.max_bytes + _FORM_OVERHEAD_BYTES
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > body_limit:
+            raise _too_large(self.max_bytes)
+
+        events: List[Tuple[str, bytes]] = []
+        header_field = bytearray()
+        header_value = bytearray()
+
+        def on_header_end():
+            events.append(("header", bytes(header_field) + b"\0" + bytes(header_value)))
+            header_field.clear()
+            header_value.clear()
+
+        parser = MultipartParser(options[b"boundary"], callbacks={
+            "on_part_begin": lambda: events.append(("begin", b"")),
+            "on_header_field": lambda data, start, end: header_field.extend(data[start:end]),
+            "on_header_value": lambda data, start, end: header_value.extend(data[start:end]),
+            "on_header_end": on_header_end,
+            "on_headers_finished": lambda: events.append(("headers", b"")),
+            "on_part_data": lambda data, start, end: events.append(("data", bytes(data[start:end]))),
+            "on_part_end": lambda: events.append(("end", b"")),
+        })
+
+        values: Dict[str, bytearray] = {}
+        part = _Part()
+        upload: _AvatarUpload | None = None
+        url = None
+        received = 0
+        try:
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > body_limit:
+                    raise _too_large(self.max_bytes)
+                parser.write(chunk)
+                for kind, data in events:
+                    if kind == "begin":
+                        part = _Part()
+                    elif kind == "header":
+                        name, _, value = data.partition(b"\0")
+                        part.headers[name.lower()] = value
+                    elif kind == "headers":
+                        _, disposition = parse_options_header(part.headers.get(b"content-disposition", b""))
+                        part.name = disposition.get(b"name", b"").decode("utf-8", "replace")
+                        filename = disposition.get(b"filename")
+                        part.filename = filename.decode("utf-8", "replace") if filename is not None else None
+                        if part.name == file_field and part.filename is not None and url is None:
+                            upload = _AvatarUpload(self)
+                    elif kind == "data":
+                        if upload is not None:
+                            await upload.write(data)
+                        elif part.name in fields and part.filename is None:
+                            value = values.setdefault(part.name, bytearray())
+                            value.extend(data)
+                            if len(value) > _MAX_FIELD_BYTES:
+                                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{part.name} is too long")
+                    elif kind == "end" and upload is not None:
+                        url = await upload.finish()
+                        upload = None
+                events.clear()
+            parser.finalize()
+        except BaseException:
+            if upload is not None:
+                await upload.abort()
+            if url is not None:
+                await self.discard(url)
+            raise
+        return {name: value.decode("utf-8", "replace") for name, value in values.items()}, url
+
+    async def discard(self, url: str):
+        """Best-effort removal of an avatar that ended up unused."""
+        try:
+            await asyncio.get_running_loop().run_in_executor(self.executor(), self.storage.delete, url)
+        except Exception:
+            logger.exception("Failed to delete unused avatar %s", url)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+def _storage() -> CloudinaryStorage | LocalStorage:
+    if settings.avatar_storage_backend == "local":
+        return LocalStorage(settings.avatar_local_directory, settings.avatar_local_base_url)
+    return CloudinaryStorage(settings.avatar_cloudinary_folder)
+
+
+avatar_uploader = AvatarUploader(_storage(), max_bytes=settings.avatar_max_bytes, workers=settings.avatar_upload_workers)
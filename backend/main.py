@@ -6,7 +6,40 @@ from fastapi_csrf_protect import CsrfProtect
 from pydantic_settings import BaseSettings
 from fastapi.staticfiles import StaticFiles
 from fastapi_pagination import Page, add_pagination, paginate
-app = FastAPI()
+from contextlib import asynccontextmanager
+from backend.core.db import notify
+from backend.core.cache.versions import versions
+from backend.core.security.principals import principal_cache
+from backend.core.security.revocation import revocation_list
+from backend.core.security.passwords import password_hasher
+from backend.core.storage.avatars import avatar_uploader
+from backend.routes.fragrance.vote_buffer import vote_buffer
+from backend.routes.fragrance.live import tally_hub
+from backend.routes.fragrance.leaderboard import leaderboard_refresher
+from backend.routes.fragrance.similarity import shutdown_refresh_pool
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    versions.start()
+    principal_cache.start()
+    revocation_list.start()
+    await notify.start()
+    if settings.vote_write_mode == "buffered":
+        vote_buffer.start()
+    tally_hub.start()
+    leaderboard_refresher.start()
+    yield
+    await leaderboard_refresher.stop()
+    await tally_hub.stop()
+    await vote_buffer.stop()
+    await revocation_list.stop()
+    await notify.stop()
+    password_hasher.shutdown()
+    avatar_uploader.shutdown()
+    shutdown_refresh_pool()
+
+app = FastAPI(lifespan=lifespan)
 
 app.mount("/static", StaticFiles(directory="backend/static"), name="static")
 add_pagination(app) 
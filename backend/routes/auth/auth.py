@@ -3,22 +3,53 @@ from fastapi.security import OAuth2PasswordRequestForm
 from fastapi_csrf_protect import CsrfProtect
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from ..auth.schemas import User, UserCreate, Token, UserEdit, UserResponseSchema
+from ..auth.schemas import User, UserCreate, Token, UserEdit, UserResponseSchema, RefreshRequest
 from backend.core.db.models.user import User as UserModel
 from backend.core.db.models.user import Role
 from backend.core.configs.config import settings
 from backend.core.db.session import get_async_session
-from .services import hash_password, create_access_token, authenticate_user, require_role, post_ava
-from fastapi import UploadFile
+from .services import (
+    hash_password, create_access_token, create_refresh_token, decode_token, revoke_token,
+    authenticate_user, require_role, read_profile_form, discard_ava, oauth2_scheme
+)
+from backend.core.security.rate_limit import rate_limit, client_ip
+from backend.core.security.login_throttle import login_throttle
+from backend.core.security.principals import principal_cache
 
-from fastapi import Form, File
 from pydantic import validate_email
 from pydantic_core import PydanticCustomError
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
+# The refresh token cookie is only sent to the auth routes.
+REFRESH_COOKIE_PATH = "/api/auth"
 
-@router.post("/register", response_model=User)
+
+def issue_tokens(response: Response, user: UserModel) -> Token:
+    claims = {"sub": user.username, "uid": user.id, "role": user.role.value}
+    access_token = create_access_token(data=claims)
+    refresh_token = create_refresh_token(data=claims)
+    response.set_cookie(
+        key=settings.cookie_name,
+        value=access_token,
+        httponly=settings.cookie_httponly,
+        secure=settings.cookie_secure,
+        samesite=settings.cookie_samesite,
+        max_age=settings.jwt_access_token_expire_minutes * 60  
+    )
+    response.set_cookie(
+        key=settings.refresh_cookie_name,
+        value=refresh_token,
+        path=REFRESH_COOKIE_PATH,
+        httponly=True,
+        secure=settings.cookie_secure,
+        samesite=settings.cookie_samesite,
+        max_age=settings.jwt_refresh_token_expire_days * 24 * 60 * 60
+    )
+    return Token(access_token=access_token, refresh_token=refresh_token, token_type="bearer")
+
+
+@router.post("/register", response_model=User, dependencies=[Depends(rate_limit("anonymous"))])
 async def register_user(
     user: UserCreate,
     request: Request, 
@@ -31,7 +62,7 @@ async def register_user(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Username already taken")
     if (await session.execute(select(UserModel).filter(UserModel.email == user.email))).scalars().first():
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already taken")
-    hashed_password = hash_password(user.password)
+    hashed_password = await hash_password(user.password)
     db_user = UserModel(username=user.username, email=user.email, hashed_password=hashed_password, role=Role.USER)
     session.add(db_user)
     await session.commit()
@@ -39,9 +70,11 @@ async def register_user(
     return db_user
 
 
-@router.post("/login")
+@router.post("/login", response_model=Token)
 async def login_user(request: Request,response: Response, form_data: OAuth2PasswordRequestForm = Depends(), session: AsyncSession = Depends(get_async_session), csrf_protect: CsrfProtect = Depends()):
 
+    ip = client_ip(request)
+    await login_throttle.check(form_data.username, ip)
     user = await authenticate_user(username=form_data.username, password=form_data.password, session=session)
 
     
@@ -51,19 +84,54 @@ async def login_user(request: Request,response: Response, form_data: OAuth2Passw
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = create_access_token(data={"sub": user.username, "role": user.role.value})
-    response.set_cookie(
-        key=settings.cookie_name,
-        value=access_token,
-        httponly=settings.cookie_httponly,
-        secure=settings.cookie_secure,
-        samesite=settings.cookie_samesite,
-        max_age=settings.jwt_access_token_expire_minutes * 60  
+    login_throttle.succeeded(form_data.username, ip)
+    return issue_tokens(response, user)
+
+
+@router.post("/refresh", response_model=Token, dependencies=[Depends(rate_limit("anonymous"))])
+async def refresh_tokens(
+    request: Request,
+    response: Response,
+    body: RefreshRequest | None = None,
+    session: AsyncSession = Depends(get_async_session)
+):
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    token = (body.refresh_token if body else None) or request.cookies.get(settings.refresh_cookie_name)
+    payload = decode_token(token, "refresh") if token else None
+    if payload is None:
+        raise credentials_exception
+    # Rotation: each refresh token works once. Losing the race to revoke it
+    # means it was already used, so nothing is issued.
+    if not await revoke_token(session, payload):
+        await session.rollback()
+        raise credentials_exception
+    user = (await session.execute(select(UserModel).filter_by(username=payload["sub"]))).scalar_one_or_none()
+    if user is None:
+        await session.rollback()
+        raise credentials_exception
+    await session.commit()
+    return issue_tokens(response, user)
+
 
 @router.post("/logout")
-async def logout(response: Response):
+async def logout(
+    request: Request,
+    response: Response,
+    body: RefreshRequest | None = None,
+    token: str | None = Depends(oauth2_scheme),
+    session: AsyncSession = Depends(get_async_session)
+):
+    access_payload = decode_token(token or request.cookies.get(settings.cookie_name) or "", "access")
+    refresh_token = (body.refresh_token if body else None) or request.cookies.get(settings.refresh_cookie_name)
+    refresh_payload = decode_token(refresh_token, "refresh") if refresh_token else None
+    for payload in (access_payload, refresh_payload):
+        if payload is not None:
+            await revoke_token(session, payload)
+    await session.commit()
 
     response.delete_cookie(
         key=settings.cookie_name,
@@ -71,6 +139,13 @@ async def logout(response: Response):
         secure=settings.cookie_secure,
         samesite=settings.cookie_samesite
     )
+    response.delete_cookie(
+        key=settings.refresh_cookie_name,
+        path=REFRESH_COOKIE_PATH,
+        httponly=True,
+        secure=settings.cookie_secure,
+        samesite=settings.cookie_samesite
+    )
     return {"message": "Logged out successfully"}
     
 
@@ -92,40 +167,68 @@ async def get_info_about_user(current_user: UserModel = Depends(require_role([Ro
     return UserResponseSchema.model_validate(current_user)
 
 
-@router.patch("/me")
+# The form is read from the request stream by `read_profile_form`, so the
+# avatar is checked and uploaded while it arrives; it is documented here.
+_PROFILE_FORM = {
+    "requestBody": {
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "username": {"type": "string"},
+                        "email": {"type": "string"},
+                        "file": {"type": "string", "format": "binary"},
+                    },
+                }
+            }
+        }
+    }
+}
+
+
+@router.patch("/me", openapi_extra=_PROFILE_FORM)
 async def edit_user_info(
-    username: str = Form(None),
-    email: str = Form(None),
-    file: UploadFile = File(None),
+    request: Request,
     current_user: UserModel = Depends(require_role([Role.USER, Role.ADMIN])),
     session: AsyncSession = Depends(get_async_session)
 ):
-
-    if username:
-        if (await session.execute(select(UserModel).filter_by(username=username))).scalar_one_or_none():
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Username already taken")
-    if email:
-        try:
-            vaildated_email = validate_email(email)
-        except PydanticCustomError as e:
-            return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="not correct email")
-
-        if (await session.execute(select(UserModel).filter_by(email=email))).scalar_one_or_none():
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already taken")
-
-    user_db = (await session.execute(select(UserModel).filter_by(id=current_user.id))).scalar_one_or_none()
-
-    if username: user_db.username = username
-    if email: user_db.email = email
-    if file:
-        user_db.ava = post_ava(file)
-    await session.commit()
+    form, ava = await read_profile_form(request)
+    username, email = form.get("username"), form.get("email")
+    try:
+        if username:
+            if (await session.execute(select(UserModel).filter_by(username=username))).scalar_one_or_none():
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Username already taken")
+        if email:
+            try:
+                vaildated_email = validate_email(email)
+            except PydanticCustomError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="not correct email")
+
+            if (await session.execute(select(UserModel).filter_by(email=email))).scalar_one_or_none():
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already taken")
+
+        user_db = (await session.execute(select(UserModel).filter_by(id=current_user.id))).scalar_one_or_none()
+
+        if username: user_db.username = username
+        if email: user_db.email = email
+        if ava: user_db.ava = ava
+        await session.commit()
+    except BaseException:
+        if ava:
+            await discard_ava(ava)
+        raise
     await session.refresh(user_db)
     return user_db
 
 
 
 
+@router.get("/principal-cache/stats")
+async def get_principal_cache_stats(current_user: UserModel = Depends(require_role([Role.ADMIN]))):
+    return principal_cache.stats()
+
+
 @router.get("/data")
 async def get_request_data(request: Request, response: Response):
     data =  {
@@ -23,6 +23,12 @@ class User(UserBase):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: str | None = None
+
+
+class RefreshRequest(BaseModel):
+    # Optional: browsers send the refresh token cookie instead.
+    refresh_token: str | None = None
 
 
 class UserEdit(BaseModel):
@@ -1,8 +1,8 @@
-from datetime import datetime, timedelta
-from typing import List, Optional
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from fastapi import HTTPException, status, Depends, Request, UploadFile
+from fastapi import HTTPException, status, Depends, Request
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
@@ -10,38 +10,68 @@ from backend.core.db.models.user import User as UserModel
 from backend.core.db.models.user import Role
 from backend.core.configs.config import settings
 from backend.core.db.session import get_async_session
-import os
-import shutil
-import cloudinary
-import cloudinary.uploader
-from cloudinary.utils import cloudinary_url
+from backend.core.security.principals import Principal, principal_cache
+from backend.core.security.revocation import revocation_list
+from backend.core.security.passwords import password_hasher
+from backend.core.storage.avatars import avatar_uploader
 
-UPLOAD_DIR = "backend/static/images"
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+async def hash_password(password: str) -> str:
+    return await password_hasher.hash(password)
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify(plain_password, hashed_password)
 
 
 # JWT token generation
+# Every token carries a unique "jti" so it can be revoked on its own, and a
+# "type" so a refresh token is never accepted as an access token.
 def create_access_token(data: dict, expire_time: timedelta | None = None) -> str:
     to_encode = data.copy()
     if expire_time:
         expire = datetime.utcnow() + expire_time
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.jwt_access_token_expire_minutes)
-    to_encode.update({"exp":expire})
+    to_encode.update({"exp":expire, "jti": uuid.uuid4().hex, "type": "access"})
     encoded_jwt = jwt.encode(to_encode ,key=settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
     return encoded_jwt
 
+def create_refresh_token(data: dict) -> str:
+    to_encode = data.copy()
+    expire = datetime.utcnow() + timedelta(days=settings.jwt_refresh_token_expire_days)
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex, "type": "refresh"})
+    return jwt.encode(to_encode, key=settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
+
+def decode_token(token: str, token_type: str) -> dict | None:
+    """The claims of a valid, unexpired token of `token_type`, else None. Tokens issued before "type" existed are access tokens."""
+    try:
+        payload = jwt.decode(token, key=settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
+    except JWTError:
+        return None
+    if payload.get("type", "access") != token_type or payload.get("sub") is None:
+        return None
+    return payload
+
+async def revoke_token(session: AsyncSession, payload: dict) -> bool:
+    """Revoke a decoded token until it expires. Returns False if it was already revoked or has no "jti"."""
+    if payload.get("jti") is None:
+        return False
+    expires_at = datetime.fromtimestamp(payload["exp"], tz=timezone.utc)
+    return await revocation_list.revoke(session, payload["jti"], expires_at)
+
 async def authenticate_user(username: str, password: str, session: AsyncSession) -> Optional[UserModel]:
     user = await session.execute(select(UserModel).filter(UserModel.username == username))
     user = user.scalars().first()
-    if not user or not verify_password(password, user.hashed_password):
+    if not user or not user.hashed_password:
+        # Same bcrypt cost as a wrong password, so timing does not reveal which usernames exist.
+        await password_hasher.verify_dummy(password)
+        return None
+    verified, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+    if not verified:
         return None
+    if new_hash is not None:
+        # Stored with an older work factor; upgrade it while the password is at hand.
+        user.hashed_password = new_hash
+        await session.commit()
     return user
 
 
@@ -60,25 +90,32 @@ async def get_current_user(request: Request, token: str = Depends(oauth2_scheme)
         token_source = request.cookies.get(settings.cookie_name)
         if not token_source:
             raise credentials_exception
-    try:
-        payload = jwt.decode(token_source, key=settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
-        username = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except JWTError:
+    payload = decode_token(token_source, "access")
+    if payload is None:
         raise credentials_exception
-    user = await session.execute(select(UserModel).filter(UserModel.username == username))
-    user = user.scalars().first()
-    if user is None:
+    username = payload["sub"]
+    # The filter answers almost every token from memory; only a possible
+    # revocation is looked up.
+    jti = payload.get("jti")
+    if jti is not None and revocation_list.might_be_revoked(jti) and await revocation_list.is_revoked(session, jti):
         raise credentials_exception
-    return user
+    principal = principal_cache.get(username)
+    if principal is None:
+        generation = principal_cache.generation
+        user = await session.execute(select(UserModel).filter(UserModel.username == username))
+        user = user.scalars().first()
+        if user is None:
+            raise credentials_exception
+        principal = Principal.from_user(user)
+        principal_cache.set(username, principal, generation)
+    return principal
 
 
 
 def require_role(required_roles: List[Role]):
     async def role_checker(
-        current_user: UserModel = Depends(get_current_user)
-    ) -> UserModel:
+        current_user: Principal = Depends(get_current_user)
+    ) -> Principal:
         
         if current_user.role not in required_roles:
             allowed_roles = ", ".join(role.value for role in required_roles)
@@ -90,21 +127,9 @@ def require_role(required_roles: List[Role]):
     return role_checker
 
 
-def post_ava(file: UploadFile | None = None):
-    if not file.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="Only image files are allowed")
-    file_path = os.path.join(UPLOAD_DIR, file.filename)
-
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    
-    response = cloudinary.uploader.upload(f"backend/static/images/{file.filename}")
-    url = response['secure_url']
+async def read_profile_form(request: Request) -> Tuple[Dict[str, str], str | None]:
+    """The profile form's username and email, and the URL of its uploaded avatar if one was sent."""
+    return await avatar_uploader.receive_form(request, fields=("username", "email"))
 
-    if url is None: 
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='problem with ava upload')
-    
-    if os.path.exists(file_path):
-        os.remove(file_path)
-    return url
\ No newline at end of file
+async def discard_ava(url: str):
+    await avatar_uploader.discard(url)
@@ -0,0 +1,55 @@
+from typing import List
+from backend.core.cache.ttl_cache import TTLCache
+from backend.core.cache.versions import versions
+from backend.core.configs.config import settings
+from backend.core.db.models.fragrance import FragranceType
+
+
+count_cache = TTLCache(ttl=settings.count_cache_ttl_seconds, maxsize=settings.count_cache_max_entries)
+facet_cache = TTLCache(ttl=settings.facet_cache_ttl_seconds, maxsize=settings.count_cache_max_entries)
+
+
+def fragrance_filter_signature(
+    company_name: str | None = None,
+    fragrance_type: FragranceType | None = None,
+    min_price: int | None = None,
+    max_price: int | None = None,
+    notes_all: List[int] | None = None,
+    notes_any: List[int] | None = None,
+    notes_none: List[int] | None = None,
+) -> tuple:
+    """Normalize listing filters so equivalent queries share one cache entry."""
+    company_name = company_name.strip().lower() if company_name else None
+    return (
+        company_name or None,
+        fragrance_type.value if fragrance_type else None,
+        min_price,
+        max_price,
+        tuple(sorted(notes_all or ())),
+        tuple(sorted(notes_any or ())),
+        tuple(sorted(notes_none or ())),
+    )
+
+
+# Write paths touch the "catalog" / "company" versions; the caches below follow
+# those bumps, whichever worker committed the write.
+
+def invalidate_fragrances():
+    count_cache.invalidate("fragrance")
+    facet_cache.invalidate("fragrance")
+
+
+def invalidate_companies():
+    # Fragrance listings join on company and can filter by its name.
+    count_cache.invalidate("company")
+    invalidate_fragrances()
+
+
+def _on_version_bump(keys):
+    if keys is None or "company" in keys:
+        invalidate_companies()
+    elif "catalog" in keys:
+        invalidate_fragrances()
+
+
+versions.add_listener(_on_version_bump)
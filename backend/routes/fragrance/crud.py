@@ -1,16 +1,28 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from backend.core.db.models.fragrance import Fragrance, Company, FragranceType, Note, NoteGroup, Review, Wishlist, FragranceNote, FragranceGender, Gender, NoteType, Season, FragranceSeason, Longevity, Sillage, PriceValue, FragranceLongevity, FragrancePriceValue, FragranceSillage, FragranceSimilar
+from backend.core.db.models.fragrance import Fragrance, Company, FragranceType, Note, NoteGroup, Review, Wishlist, FragranceNote, FragranceGender, Gender, NoteType, Season, Longevity, Sillage, PriceValue, FragranceLongevity, FragrancePriceValue, FragranceSillage, FragranceSimilar, FragranceSimilarityVotes, FragranceContentNeighbor, FragranceCollaborativeNeighbor, FragranceLeaderboard, FragranceVoteStats, FragranceRatingStats, note_key
 from backend.core.db.models.user import User as UserModel
 from backend.core.configs.config import settings
-from .schemas import CompanySchema, FragranceUpdate, FragranceRequestSchema, NoteRequestSchema, NoteGroupRequestSchema, NoteUpdateSchema, ReviewCreateSchema, ReviewUpdateSchema, WishlistRequestSchema, Order
-from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
+from .schemas import FragranceSchema, CompanySchema, FragranceUpdate, FragranceRequestSchema, NoteRequestSchema, NoteGroupRequestSchema, NoteUpdateSchema, ReviewCreateSchema, ReviewUpdateSchema, WishlistRequestSchema, VoteBatchSchema, Order, Pagination, CountMode, ReviewSort
+from .cache import count_cache, facet_cache, fragrance_filter_signature
+from backend.core.cache.versions import versions
+from .votes import upsert_vote, toggle_season_vote, toggle_season_votes, add_similar_vote, is_foreign_key_violation, vote_distribution
+from .ratings import apply_rating_delta, rating_summary
+from .vote_buffer import vote_buffer
+from . import similarity, recommendations
+from sqlalchemy import select, func, tuple_, and_, or_, text, cast, literal, bindparam, BigInteger, Numeric
+from sqlalchemy.dialects.postgresql import ARRAY, array, JSON, aggregate_order_by
+from sqlalchemy import distinct, literal_column
+from sqlalchemy.orm import selectinload, aliased, contains_eager
 from fastapi import HTTPException, Response, Request, status, Query
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError, DBAPIError
 from pydantic import ValidationError
 from fastapi_csrf_protect import CsrfProtect
 import logging
-from typing import Dict
+import base64
+import binascii
+import json
+from typing import Dict, List, Iterable
+from decimal import Decimal, InvalidOperation
 
 logging.basicConfig(
     level=logging.INFO,
@@ -18,6 +30,49 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+# Rebuilds the denormalized search and note filter columns on `fragrance` from
+# the fragrance itself, its company, perfumer and notes. Kept in sync with the
+# backfills in migrations c5e9a0d3b214 and d81f6b2c7e45.
+_REFRESH_DERIVED_COLUMNS_SQL = text("""
+    UPDATE fragrance AS f
+    SET search_document = d.document,
+        search_vector = d.vector,
+        note_keys = d.note_keys
+    FROM (
+        SELECT
+            fr.id,
+            concat_ws(' ', fr.name, c.name, p.name, n.names, fr.description) AS document,
+            setweight(to_tsvector('simple', coalesce(fr.name, '')), 'A')
+            || setweight(to_tsvector('simple', coalesce(c.name, '')), 'B')
+            || setweight(to_tsvector('simple', coalesce(p.name, '')), 'B')
+            || setweight(to_tsvector('simple', coalesce(n.names, '')), 'C')
+            || setweight(to_tsvector('simple', coalesce(fr.description, '')), 'D') AS vector,
+            coalesce(n.note_keys, '{}') AS note_keys
+        FROM fragrance AS fr
+        JOIN company AS c ON c.id = fr.company_id
+        LEFT JOIN perfumer AS p ON p.id = fr.perfumer_id
+        LEFT JOIN LATERAL (
+            SELECT
+                string_agg(note.name, ' ') AS names,
+                array_agg(fragrance_note.note_id * 4)
+                || array_agg(fragrance_note.note_id * 4 + CASE fragrance_note.note_type
+                    WHEN 'TOP' THEN 1 WHEN 'MIDDLE' THEN 2 ELSE 3 END) AS note_keys
+            FROM fragrance_note
+            JOIN note ON note.id = fragrance_note.note_id
+            WHERE fragrance_note.fragrance_id = fr.id
+        ) AS n ON true
+        WHERE fr.id = ANY(:fragrance_ids)
+    ) AS d
+    WHERE f.id = d.id
+""").bindparams(bindparam("fragrance_ids", type_=ARRAY(BigInteger)))
+
+
+async def _refresh_derived_columns(session: AsyncSession, fragrance_ids: Iterable[int]):
+    fragrance_ids = list(fragrance_ids)
+    if fragrance_ids:
+        await session.execute(_REFRESH_DERIVED_COLUMNS_SQL, {"fragrance_ids": fragrance_ids})
+
 async def add_new_fragrance(
     session: AsyncSession, 
     fragrance_data: FragranceRequestSchema, 
@@ -30,9 +85,14 @@ async def add_new_fragrance(
             for note in fragrance_data.notes:
                 n = FragranceNote(fragrance_id=new_fragrance.id, note_id=note.note_id, note_type=note.note_type)
                 session.add(n)
-            await session.commit()
-            await session.refresh(new_fragrance)
-            return new_fragrance
+            await session.flush()
+        await _refresh_derived_columns(session, [new_fragrance.id])
+        await versions.touch(session, "catalog")
+        await session.commit()
+        await session.refresh(new_fragrance)
+        if fragrance_data.notes:
+            similarity.schedule_refresh([new_fragrance.id])
+        return new_fragrance
     except IntegrityError as e:
             await session.rollback()
             raise HTTPException(status_code=400, detail=f"Database integrity error: {str(e)}")
@@ -51,6 +111,7 @@ async def add_new_company(
 
     new_company = Company(**company_data.model_dump())
     session.add(new_company)
+    await versions.touch(session, "catalog", "company")
     await session.commit()
     await session.refresh(new_company)
     return new_company
@@ -71,20 +132,111 @@ async def remove_company(
     if company is None:
         raise HTTPException(status_code=404, detail="Company not found")
     await session.delete(company)
+    await versions.touch(session, "catalog", "company")
     await session.commit()
     return Response(status_code=200, content="Item was deleted")
 
 
-async def get_all_fragrances(
+def _encode_cursor(*values) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(cursor: str, size: int) -> List:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return values
+
+
+def _fragrance_seek_predicate(order: Order, last_price: int | None, last_id: int):
+    # Rows are ordered by (price, id) with Postgres' default NULL placement:
+    # NULL prices come last in ascending order and first in descending order.
+    if order == Order.desc:
+        if last_price is None:
+            return or_(and_(Fragrance.price.is_(None), Fragrance.id < last_id), Fragrance.price.is_not(None))
+        return tuple_(Fragrance.price, Fragrance.id) < tuple_(last_price, last_id)
+    if last_price is None:
+        return and_(Fragrance.price.is_(None), Fragrance.id > last_id)
+    return or_(tuple_(Fragrance.price, Fragrance.id) > tuple_(last_price, last_id), Fragrance.price.is_(None))
+
+
+async def _estimate_rows(session: AsyncSession, stmt=None, table: str | None = None) -> int | None:
+    """Row estimate from planner statistics, or None when the table was never analyzed."""
+    if table is not None:
+        estimate = await session.scalar(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+            {"table": table}
+        )
+        return estimate if estimate is not None and estimate >= 0 else None
+    compiled = stmt.compile(dialect=session.bind.dialect, compile_kwargs={"literal_binds": True})
+    connection = await session.connection()
+    plan = (await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def _get_total(
     session: AsyncSession,
-    company_name: str | None = None, 
+    cache_key: tuple,
+    count_stmt,
+    count_mode: CountMode,
+    estimate_stmt=None,
+    estimate_table: str | None = None
+) -> tuple[int, bool]:
+    """
+    Total row count for a listing, served from `count_cache` when possible.
+
+    In estimate mode planner statistics are used unless they predict fewer than
+    `count_estimate_min_rows` rows, where an exact count is cheap anyway.
+
+    Returns:
+        tuple[int, bool]: The total and whether it is an estimate.
+    """
+    cache_key = (cache_key[0], count_mode.value, *cache_key[1:])
+    cached = count_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    generation = count_cache.generation
+    total, is_estimate = None, False
+    if count_mode == CountMode.estimate:
+        estimate = await _estimate_rows(session, estimate_stmt, estimate_table)
+        if estimate is not None and estimate >= settings.count_estimate_min_rows:
+            total, is_estimate = estimate, True
+    if total is None:
+        total = await session.scalar(count_stmt)
+    count_cache.set(cache_key, (total, is_estimate), generation)
+    return total, is_estimate
+
+
+def _parse_note_filter(values: List[str] | None) -> List[int]:
+    """Turn `<note_id>` / `<top|middle|base>:<note_id>` filter values into note keys."""
+    keys = []
+    for value in values or []:
+        note_type, _, note_id = value.strip().rpartition(":")
+        try:
+            keys.append(note_key(int(note_id), NoteType(note_type.lower()) if note_type else None))
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid note filter '{value}'. Use '<note_id>' or '<top|middle|base>:<note_id>'"
+            )
+    return sorted(set(keys))
+
+
+def _build_fragrance_filters(
+    company_name: str | None = None,
     fragrance_type: FragranceType | None = None,
-    page: int = Query(1, ge=1),
-    page_size: int = Query(10, ge=1, le=100),
-    min_price: int | None = Query(None, ge=0),
-    max_price: int | None = Query(None, ge=0),
-    order: Order = Order.asc
-):
+    min_price: int | None = None,
+    max_price: int | None = None,
+    notes_all: List[str] | None = None,
+    notes_any: List[str] | None = None,
+    notes_none: List[str] | None = None
+) -> List:
     filters = []
     if company_name:
         company_name = company_name.strip()
@@ -98,10 +250,51 @@ async def get_all_fragrances(
     if max_price is not None:
         filters.append(Fragrance.price <= max_price)
 
+    # Each note filter is a single probe of the GIN index on note_keys.
+    if notes_all:
+        filters.append(Fragrance.note_keys.contains(_parse_note_filter(notes_all)))
+    if notes_any:
+        filters.append(Fragrance.note_keys.overlap(_parse_note_filter(notes_any)))
+    if notes_none:
+        filters.append(~Fragrance.note_keys.overlap(_parse_note_filter(notes_none)))
+    return filters
+
+
+async def get_all_fragrances(
+    session: AsyncSession,
+    company_name: str | None = None, 
+    fragrance_type: FragranceType | None = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(10, ge=1, le=100),
+    min_price: int | None = Query(None, ge=0),
+    max_price: int | None = Query(None, ge=0),
+    order: Order = Order.asc,
+    pagination: Pagination = Pagination.offset,
+    cursor: str | None = None,
+    count_mode: CountMode = CountMode.exact,
+    notes_all: List[str] | None = None,
+    notes_any: List[str] | None = None,
+    notes_none: List[str] | None = None
+):
+    """
+    List fragrances matching the given filters, ordered by price.
+
+    Note filters take `<note_id>` or `<top|middle|base>:<note_id>` values:
+    `notes_all` requires every note, `notes_any` at least one and `notes_none`
+    excludes fragrances with any of them.
+
+    Offset pagination is the default. With `pagination=cursor` (or whenever a
+    cursor is passed) the page is located with a (price, id) seek predicate
+    instead of an OFFSET scan, and `next_cursor` points at the following page.
+    `total` is cached per filter signature and may be a planner estimate when
+    `count_mode` is `estimate`.
+    """
+    filters = _build_fragrance_filters(company_name, fragrance_type, min_price, max_price, notes_all, notes_any, notes_none)
+
     if order == Order.desc:
-        order = Fragrance.price.desc()
+        order_by = (Fragrance.price.desc(), Fragrance.id.desc())
     else:
-        order = Fragrance.price.asc()
+        order_by = (Fragrance.price.asc(), Fragrance.id.asc())
 
     total_stmt = (
         select(func.count())
@@ -109,10 +302,19 @@ async def get_all_fragrances(
         .join(Company)
         .filter(*filters)
     )
+    signature = fragrance_filter_signature(
+        company_name, fragrance_type, min_price, max_price,
+        _parse_note_filter(notes_all), _parse_note_filter(notes_any), _parse_note_filter(notes_none)
+    )
+    total, total_is_estimate = await _get_total(
+        session,
+        ("fragrance", signature),
+        total_stmt,
+        count_mode,
+        estimate_stmt=select(Fragrance.id).join(Company).filter(*filters) if filters else None,
+        estimate_table=None if filters else Fragrance.__tablename__
+    )
 
-    total = await session.scalar(total_stmt)
-
-    offset = (page - 1) * page_size
     stmt = (
             select(Fragrance)
             .join(Company)
@@ -121,29 +323,47 @@ async def get_all_fragrances(
                 selectinload(Fragrance.company),
                 selectinload(Fragrance.notes)
             )
-            .offset(offset)
-            .limit(page_size)
-            .order_by(order)
+            .order_by(*order_by)
         )
 
-    
-    result = await session.execute(stmt)
-    fragrances = result.scalars().all()
+    next_cursor = None
+    if pagination == Pagination.cursor or cursor:
+        if cursor:
+            order_value, last_price, last_id = _decode_cursor(cursor, 3)
+            if order_value != order.value or not isinstance(last_id, int) or not (last_price is None or isinstance(last_price, int)):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+            stmt = stmt.filter(_fragrance_seek_predicate(order, last_price, last_id))
+        result = await session.execute(stmt.limit(page_size + 1))
+        fragrances = result.scalars().all()
+        if len(fragrances) > page_size:
+            fragrances = fragrances[:page_size]
+            last = fragrances[-1]
+            next_cursor = _encode_cursor(order.value, last.price, last.id)
+    else:
+        offset = (page - 1) * page_size
+        result = await session.execute(stmt.offset(offset).limit(page_size))
+        fragrances = result.scalars().all()
+
     if not fragrances:
         raise HTTPException(status_code=404, detail="Not found")
     return {
     "total": total,
-    "fragrances": fragrances
+    "total_is_estimate": total_is_estimate,
+    "fragrances": fragrances,
+    "next_cursor": next_cursor
     }
 
 async def get_all_companies(
     session: AsyncSession,
     page: int = Query(1, ge=1),
-    page_size: int = Query(10, ge=1, le=100)
+    page_size: int = Query(10, ge=1, le=100),
+    count_mode: CountMode = CountMode.exact
 ):
     offset = (page - 1) * page_size
     total_stmt = select(func.count()).select_from(Company)
-    total = await session.scalar(total_stmt)
+    total, total_is_estimate = await _get_total(
+        session, ("company",), total_stmt, count_mode, estimate_table=Company.__tablename__
+    )
 
     stmt = select(Company).offset(offset).limit(page_size)
     result = await session.execute(stmt)
@@ -152,10 +372,160 @@ async def get_all_companies(
             raise HTTPException(status_code=404, detail="Not found")
     return {
     "total": total,
+    "total_is_estimate": total_is_estimate,
     "companies":companies
     }
 
 
+#                       ==== FACETS ==== 
+
+# GROUPING() bitmasks over (fragrance_type, company, price bucket, note): a 0
+# bit marks the column the row is grouped by.
+_FACET_BY_TYPE, _FACET_BY_COMPANY, _FACET_BY_PRICE, _FACET_BY_NOTE, _FACET_TOTAL = 0b0111, 0b1011, 0b1101, 0b1110, 0b1111
+
+
+async def get_fragrance_facets(
+    session: AsyncSession,
+    company_name: str | None = None,
+    fragrance_type: FragranceType | None = None,
+    min_price: int | None = None,
+    max_price: int | None = None,
+    notes_all: List[str] | None = None,
+    notes_any: List[str] | None = None,
+    notes_none: List[str] | None = None
+) -> Dict:
+    """
+    Counts per fragrance type, company, price bucket and most common notes for
+    the fragrances matching the listing filters.
+
+    All facets come from one GROUPING SETS aggregate over a single scan and are
+    cached per filter signature.
+    """
+    filters = _build_fragrance_filters(company_name, fragrance_type, min_price, max_price, notes_all, notes_any, notes_none)
+    signature = fragrance_filter_signature(
+        company_name, fragrance_type, min_price, max_price,
+        _parse_note_filter(notes_all), _parse_note_filter(notes_any), _parse_note_filter(notes_none)
+    )
+    cached = facet_cache.get(("fragrance", signature))
+    if cached is not None:
+        return cached
+    generation = facet_cache.generation
+
+    edges = settings.facet_price_buckets
+    price_bucket = func.width_bucket(Fragrance.price, array([literal_column(str(int(edge))) for edge in edges]))
+    stmt = (
+        select(
+            Fragrance.fragrance_type,
+            Company.name.label("company_name"),
+            price_bucket.label("price_bucket"),
+            Note.id.label("note_id"),
+            Note.name.label("note_name"),
+            func.grouping(Fragrance.fragrance_type, Company.name, price_bucket, Note.id).label("grouping"),
+            func.count(distinct(Fragrance.id)).label("count")
+        )
+        .select_from(Fragrance)
+        .join(Company)
+        .outerjoin(FragranceNote, FragranceNote.fragrance_id == Fragrance.id)
+        .outerjoin(Note, Note.id == FragranceNote.note_id)
+        .filter(*filters)
+        .group_by(func.grouping_sets(
+            tuple_(Fragrance.fragrance_type),
+            tuple_(Company.name),
+            tuple_(price_bucket),
+            tuple_(Note.id, Note.name),
+            tuple_()
+        ))
+    )
+    rows = (await session.execute(stmt)).all()
+
+    facets = {"total": 0, "fragrance_types": [], "companies": [], "price_buckets": [], "notes": []}
+    for row in rows:
+        if row.grouping == _FACET_TOTAL:
+            facets["total"] = row.count
+        elif row.grouping == _FACET_BY_TYPE and row.fragrance_type is not None:
+            facets["fragrance_types"].append({"value": row.fragrance_type.value, "label": row.fragrance_type.value, "count": row.count})
+        elif row.grouping == _FACET_BY_COMPANY:
+            facets["companies"].append({"value": row.company_name, "label": row.company_name, "count": row.count})
+        elif row.grouping == _FACET_BY_PRICE and row.price_bucket is not None:
+            # width_bucket returns i for edges[i-1] <= price < edges[i]
+            bucket = row.price_bucket
+            facets["price_buckets"].append({
+                "min_price": edges[bucket - 1] if bucket > 0 else None,
+                "max_price": edges[bucket] - 1 if bucket < len(edges) else None,
+                "count": row.count
+            })
+        elif row.grouping == _FACET_BY_NOTE and row.note_id is not None:
+            facets["notes"].append({"value": str(row.note_id), "label": row.note_name, "count": row.count})
+
+    for key in ("fragrance_types", "companies", "notes"):
+        facets[key].sort(key=lambda facet: (-facet["count"], facet["label"]))
+    facets["notes"] = facets["notes"][:settings.facet_top_notes]
+    facets["price_buckets"].sort(key=lambda facet: -1 if facet["min_price"] is None else facet["min_price"])
+
+    facet_cache.set(("fragrance", signature), facets, generation)
+    return facets
+
+
+#                       ==== SEARCH ==== 
+
+async def search_fragrances(
+    session: AsyncSession,
+    q: str,
+    page_size: int = Query(10, ge=1, le=100),
+    cursor: str | None = None
+):
+    """
+    Ranked, typo tolerant search over fragrance, company, perfumer and note names
+    and fragrance descriptions.
+
+    Matches come from either the weighted `search_vector` (full-text) or a
+    trigram word similarity against `search_document`, both GIN indexed. Hits
+    are ordered by relevance and paginated with a (score, id) cursor.
+    """
+    q = q.strip()
+    if len(q) < 2:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Search query is too short")
+
+    tsquery = func.websearch_to_tsquery("simple", q)
+    score = func.round(
+        cast(func.ts_rank_cd(Fragrance.search_vector, tsquery) + func.word_similarity(q, Fragrance.search_document), Numeric),
+        6
+    )
+    stmt = (
+        select(Fragrance, score.label("score"))
+        .filter(or_(
+            Fragrance.search_vector.op("@@")(tsquery),
+            literal(q).op("<%")(Fragrance.search_document)
+        ))
+        .options(selectinload(Fragrance.company))
+        .order_by(score.desc(), Fragrance.id.asc())
+        .limit(page_size + 1)
+    )
+    if cursor:
+        last_score, last_id = _decode_cursor(cursor, 2)
+        try:
+            last_score = Decimal(last_score)
+        except (InvalidOperation, TypeError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        if not isinstance(last_id, int):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        stmt = stmt.filter(or_(score < last_score, and_(score == last_score, Fragrance.id > last_id)))
+
+    rows = (await session.execute(stmt)).all()
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = _encode_cursor(str(rows[-1].score), rows[-1].Fragrance.id)
+
+    return {
+    "fragrances": [
+        {**FragranceSchema.model_validate(row.Fragrance).model_dump(), "score": float(row.score)}
+        for row in rows
+    ],
+    "next_cursor": next_cursor
+    }
+
+
 async def change_fragrance(
     fragrance_id: int,
     session: AsyncSession,
@@ -253,23 +623,133 @@ async def change_fragrance(
             )
 
 
+    await session.flush()
+    await _refresh_derived_columns(session, [fragrance_id])
+    await versions.touch(session, "catalog", f"fragrance:{fragrance_id}")
     await session.commit()
     await session.refresh(fragrance)
+    if "notes" in update_data:
+        similarity.schedule_refresh([fragrance_id])
     return fragrance
 
+def _json_list(columns: Dict, *order_by):
+    return func.coalesce(
+        func.json_agg(aggregate_order_by(func.json_build_object(*[part for item in columns.items() for part in item]), *order_by)),
+        literal_column("'[]'::json"),
+        type_=JSON
+    )
+
+
+def _json_list_subquery(columns: Dict, where, order_by):
+    return select(_json_list(columns, order_by)).where(where).scalar_subquery()
+
+
+def _similar_fragrances_subquery(limit: int):
+    # Top of the `fragrance_similarity_votes` graph: a range scan of its rank index.
+    similar_fragrance = aliased(Fragrance)
+    top_similar = (
+        select(FragranceSimilarityVotes.similar_fragrance_id.label("id"), FragranceSimilarityVotes.votes)
+        .where(FragranceSimilarityVotes.fragrance_id == Fragrance.id)
+        .order_by(FragranceSimilarityVotes.votes.desc(), FragranceSimilarityVotes.similar_fragrance_id)
+        .limit(limit)
+        .correlate(Fragrance)
+        .subquery()
+    )
+    return (
+        select(_json_list(
+            {"id": top_similar.c.id, "name": similar_fragrance.name, "votes": top_similar.c.votes},
+            top_similar.c.votes.desc(), top_similar.c.id
+        ))
+        .select_from(top_similar.join(similar_fragrance, similar_fragrance.id == top_similar.c.id))
+        .scalar_subquery()
+    )
+
+
+_REVIEW_COLUMNS = ("id", "user_id", "fragrance_id", "content", "rating")
+
+
+def _review_sort_key(sort: ReviewSort):
+    if sort == ReviewSort.rating:
+        return (Review.rating.desc(), Review.id.desc())
+    return (Review.id.desc(),)
+
+
+def _review_cursor(sort: ReviewSort, review: Dict) -> str:
+    return _encode_cursor(sort.value, review["rating"], review["id"])
+
+
+def _review_seek_predicate(sort: ReviewSort, cursor: str):
+    cursor_sort, last_rating, last_id = _decode_cursor(cursor, 3)
+    if cursor_sort != sort.value or not isinstance(last_id, int) or isinstance(last_id, bool):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    if sort == ReviewSort.rating:
+        if not isinstance(last_rating, (int, float)) or isinstance(last_rating, bool):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        return tuple_(Review.rating, Review.id) < tuple_(last_rating, last_id)
+    return Review.id < last_id
+
+
+def _first_reviews_page_subquery(limit: int):
+    # Newest reviews first; one extra row tells whether a next page exists.
+    page = (
+        select(*[getattr(Review, column) for column in _REVIEW_COLUMNS])
+        .where(Review.fragrance_id == Fragrance.id)
+        .order_by(*_review_sort_key(ReviewSort.newest))
+        .limit(limit)
+        .correlate(Fragrance)
+        .subquery()
+    )
+    return select(_json_list({column: page.c[column] for column in _REVIEW_COLUMNS}, page.c.id.desc())).scalar_subquery()
+
+
+def _split_review_page(reviews: List, page_size: int, sort: ReviewSort):
+    if len(reviews) <= page_size:
+        return reviews, None
+    reviews = reviews[:page_size]
+    return reviews, _review_cursor(sort, reviews[-1])
+
+
+def _fragrance_detail_stmt(fragrance_id: int):
+    notes = _json_list_subquery(
+        {
+            "id": FragranceNote.id,
+            "fragrance_id": FragranceNote.fragrance_id,
+            "note_id": FragranceNote.note_id,
+            "note_type": FragranceNote.note_type,
+        },
+        FragranceNote.fragrance_id == Fragrance.id,
+        FragranceNote.id
+    )
+    reviews = _first_reviews_page_subquery(settings.review_page_size + 1)
+    similar = _similar_fragrances_subquery(settings.detail_similar_limit)
+    return (
+        select(Fragrance, FragranceVoteStats, FragranceRatingStats, notes.label("notes"), reviews.label("reviews"), similar.label("similar"))
+        .outerjoin(FragranceVoteStats, FragranceVoteStats.fragrance_id == Fragrance.id)
+        .outerjoin(FragranceRatingStats, FragranceRatingStats.fragrance_id == Fragrance.id)
+        .where(Fragrance.id == fragrance_id)
+    )
+
+
 async def get_fragrance_by_id(
     fragrance_id: int,
     session: AsyncSession,
 ) -> Dict:
     """
-    Retrieve a fragrance by ID, including its reviews, notes, gender and season vote breakdown.
+    Retrieve a fragrance by ID, including its notes, rating summary, first page
+    of reviews, the gender, season, longevity, sillage and price value vote
+    breakdowns and the most voted similar fragrances.
+
+    Everything is fetched in one statement: the primary key lookup joined to the
+    `fragrance_vote_stats` and `fragrance_rating_stats` rows, with reviews and
+    notes aggregated to JSON by correlated subqueries that only run when the
+    fragrance exists. Further reviews are served by `get_fragrance_reviews`.
 
     Args:
         fragrance_id (int): The ID of the fragrance to retrieve.
         session (AsyncSession): The async database session.
 
     Returns:
-        Dict: A dictionary containing the fragrance details and gender vote counts.
+        Dict: A dictionary containing the fragrance details and vote breakdowns.
 
     Raises:
         HTTPException: If the fragrance is not found (404) or a database error occurs (500).
@@ -282,109 +762,33 @@ async def get_fragrance_by_id(
         )
 
     try:
-        gender_counts_stmt = (
-            select(
-                FragranceGender.gender,
-                func.count(FragranceGender.gender).label("vote_count")
-            )
-            .where(FragranceGender.fragrance_id == fragrance_id)
-            .group_by(FragranceGender.gender)
-        )
-        gender_counts_result = await session.execute(gender_counts_stmt)
-        gender_counts = {row.gender: row.vote_count for row in gender_counts_result}
-
-        all_genders = {
-            Gender.male: 0,
-            Gender.mostly_male: 0,
-            Gender.female: 0,
-            Gender.mostly_female: 0,
-            Gender.unisex: 0,
-        }
-        all_genders.update(gender_counts) 
-
-        total_votes = sum(all_genders.values())
-
-        season_counts_stmt =  (
-            select(
-            FragranceSeason.season,
-            func.count(FragranceSeason.season).label("vote_count")
-            )
-            .where(FragranceSeason.fragrance_id == fragrance_id)
-            .group_by(FragranceSeason.season)
-        )
-        season_count_result = await session.execute(season_counts_stmt)
-        season_counts = {row.season: row.vote_count for row in season_count_result}
-
-        all_seasons = {
-            Season.winter: 0,
-            Season.spring: 0,
-            Season.summer: 0, 
-            Season.fall: 0
-        }
-        all_seasons.update(season_counts)
-
-        total_season_vote = sum(all_seasons.values())
-        stmt = (
-            select(Fragrance)
-            .options(
-                selectinload(Fragrance.fragrance_reviews),
-                selectinload(Fragrance.notes)
-            )
-            .filter_by(id=fragrance_id)
-        )
-        result = await session.execute(stmt)
-        fragrance = result.scalar_one_or_none()
-
+        result = await session.execute(_fragrance_detail_stmt(fragrance_id))
+        row = result.one_or_none()
 
-        if fragrance is None:
+        if row is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Fragrance not found"
             )
+        fragrance = {
+            attr.key: getattr(row.Fragrance, attr.key)
+            for attr in Fragrance.__mapper__.column_attrs
+            if not attr.deferred
+        }
+        reviews, reviews_next_cursor = _split_review_page(row.reviews, settings.review_page_size, ReviewSort.newest)
+        fragrance["fragrance_reviews"] = reviews
+        fragrance["notes"] = [{**note, "note_type": NoteType[note["note_type"]].value} for note in row.notes]
+        stats = row.FragranceVoteStats
         response = {
             "fragrance": fragrance,
-            "gender_votes": {
-                "total_votes": total_votes,
-                "counts": {
-                    "male": all_genders[Gender.male],
-                    "mostly_male": all_genders[Gender.mostly_male],
-                    "female": all_genders[Gender.female],
-                    "mostly_female": all_genders[Gender.mostly_female],
-                    "unisex": all_genders[Gender.unisex],
-                },
-                "percentages": (
-                    {
-                        "male": round((all_genders[Gender.male] / total_votes * 100), 2) if total_votes else 0,
-                        "mostly_male": round((all_genders[Gender.mostly_male] / total_votes * 100), 2) if total_votes else 0,
-                        "female": round((all_genders[Gender.female] / total_votes * 100), 2) if total_votes else 0,
-                        "mostly_female": round((all_genders[Gender.mostly_female] / total_votes * 100), 2) if total_votes else 0,
-                        "unisex": round((all_genders[Gender.unisex] / total_votes * 100), 2) if total_votes else 0,
-                    }
-                    if total_votes > 0
-                    else None
-                ),
-            },
-            "season_vote": {
-                "total_votes": total_season_vote,
-                "counts": {
-                    "winter": all_seasons[Season.winter],
-                    "spring": all_seasons[Season.spring],
-                    "summer": all_seasons[Season.summer],
-                    "fall": all_seasons[Season.fall],
-                },
-                "percentages": (
-                    {
-                        "winter": round((all_seasons[Season.winter] / total_season_vote * 100), 2) if total_season_vote else 0,
-                        "spring": round((all_seasons[Season.spring] / total_season_vote * 100), 2) if total_season_vote else 0,
-                        "summer": round((all_seasons[Season.summer] / total_season_vote * 100), 2) if total_season_vote else 0,
-                        "fall": round((all_seasons[Season.fall] / total_season_vote * 100), 2) if total_season_vote else 0,
-
-                    }
-                    if total_season_vote > 0
-                    else None
-                ),
-
-            }
+            "rating_summary": rating_summary(row.FragranceRatingStats),
+            "reviews_next_cursor": reviews_next_cursor,
+            "gender_votes": vote_distribution(stats, "gender"),
+            "season_vote": vote_distribution(stats, "season"),
+            "longevity_votes": vote_distribution(stats, "longevity"),
+            "sillage_votes": vote_distribution(stats, "sillage"),
+            "price_value_votes": vote_distribution(stats, "price_value"),
+            "similar_fragrances": row.similar
         }
 
         return response
@@ -398,6 +802,151 @@ async def get_fragrance_by_id(
             detail=f"Internal server error: {str(e)}"
         )
     
+async def get_similar_fragrances(
+    session: AsyncSession,
+    fragrance_id: int,
+    limit: int = 10
+):
+    """
+    The fragrances most often voted similar to `fragrance_id`, with their
+    companies, in one query over the `fragrance_similarity_votes` rank index.
+    """
+    stmt = (
+        select(Fragrance, FragranceSimilarityVotes.votes)
+        .join(FragranceSimilarityVotes, FragranceSimilarityVotes.similar_fragrance_id == Fragrance.id)
+        .join(Fragrance.company)
+        .options(contains_eager(Fragrance.company))
+        .where(FragranceSimilarityVotes.fragrance_id == fragrance_id)
+        .order_by(FragranceSimilarityVotes.votes.desc(), FragranceSimilarityVotes.similar_fragrance_id)
+        .limit(limit)
+    )
+    rows = (await session.execute(stmt)).all()
+    if not rows:
+        exists = await session.scalar(select(Fragrance.id).where(Fragrance.id == fragrance_id))
+        if exists is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Fragrance not found")
+    return {
+    "fragrance_id": fragrance_id,
+    "fragrances": [
+        {**FragranceSchema.model_validate(row.Fragrance).model_dump(), "votes": row.votes}
+        for row in rows
+    ]
+    }
+
+
+async def get_smells_like(
+    session: AsyncSession,
+    fragrance_id: int,
+    limit: int = 10
+):
+    """
+    The fragrances with the most similar note pyramids to `fragrance_id`, read
+    in rank order from `fragrance_content_neighbors` with their companies.
+    """
+    stmt = (
+        select(Fragrance, FragranceContentNeighbor.score)
+        .join(FragranceContentNeighbor, FragranceContentNeighbor.neighbor_id == Fragrance.id)
+        .join(Fragrance.company)
+        .options(contains_eager(Fragrance.company))
+        .where(FragranceContentNeighbor.fragrance_id == fragrance_id)
+        .order_by(FragranceContentNeighbor.rank)
+        .limit(limit)
+    )
+    rows = (await session.execute(stmt)).all()
+    if not rows:
+        exists = await session.scalar(select(Fragrance.id).where(Fragrance.id == fragrance_id))
+        if exists is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Fragrance not found")
+    return {
+    "fragrance_id": fragrance_id,
+    "fragrances": [
+        {**FragranceSchema.model_validate(row.Fragrance).model_dump(), "score": round(row.score, 4)}
+        for row in rows
+    ]
+    }
+
+
+async def get_recommendations(
+    session: AsyncSession,
+    current_user: UserModel,
+    limit: int = 10
+):
+    """
+    Item-item collaborative filtering for `current_user`: every fragrance the
+    user interacted with votes for its precomputed neighbours, weighted by
+    how strong the interaction was. Fragrances already on the user's wishlist
+    or reviewed are left out. One query over the neighbour primary key.
+    """
+    mine = recommendations.interactions(user_ids=[current_user.id]).subquery()
+    neighbor = FragranceCollaborativeNeighbor
+    score = func.sum(neighbor.score * mine.c.weight)
+    scored = (
+        select(neighbor.neighbor_id, score.label("score"))
+        .join(mine, mine.c.fragrance_id == neighbor.fragrance_id)
+        .where(neighbor.neighbor_id.not_in(recommendations.owned_fragrances(current_user.id)))
+        .group_by(neighbor.neighbor_id)
+        .order_by(score.desc(), neighbor.neighbor_id)
+        .limit(limit)
+        .subquery()
+    )
+    stmt = (
+        select(Fragrance, scored.c.score)
+        .join(scored, scored.c.neighbor_id == Fragrance.id)
+        .join(Fragrance.company)
+        .options(contains_eager(Fragrance.company))
+        .order_by(scored.c.score.desc(), Fragrance.id)
+    )
+    rows = (await session.execute(stmt)).all()
+    return {
+    "fragrances": [
+        {**FragranceSchema.model_validate(row.Fragrance).model_dump(), "score": round(row.score, 4)}
+        for row in rows
+    ]
+    }
+
+
+async def get_leaderboard(
+    session: AsyncSession,
+    scope: str,
+    scope_key: str = "",
+    page: int = 1,
+    page_size: int = 10
+):
+    """
+    One page of a precomputed leaderboard: a primary key range of
+    `fragrance_leaderboard`, joined to the fragrances and their companies.
+    """
+    first_rank = (page - 1) * page_size + 1
+    stmt = (
+        select(Fragrance, FragranceLeaderboard)
+        .join(FragranceLeaderboard, FragranceLeaderboard.fragrance_id == Fragrance.id)
+        .join(Fragrance.company)
+        .options(contains_eager(Fragrance.company))
+        .where(
+            FragranceLeaderboard.scope == scope,
+            FragranceLeaderboard.scope_key == scope_key,
+            FragranceLeaderboard.rank.between(first_rank, first_rank + page_size - 1)
+        )
+        .order_by(FragranceLeaderboard.rank)
+    )
+    rows = (await session.execute(stmt)).all()
+    return {
+    "scope": scope,
+    "key": scope_key or None,
+    "page": page,
+    "refreshed_at": rows[0].FragranceLeaderboard.refreshed_at if rows else None,
+    "fragrances": [
+        {
+            **FragranceSchema.model_validate(row.Fragrance).model_dump(),
+            "rank": row.FragranceLeaderboard.rank,
+            "score": round(row.FragranceLeaderboard.score, 3),
+            "rating_count": row.FragranceLeaderboard.rating_count,
+        }
+        for row in rows
+    ]
+    }
+
+
 async def delete_fragrance_by_id(
     fragrance_id: int, 
     session: AsyncSession
@@ -413,6 +962,7 @@ async def delete_fragrance_by_id(
     if fragrance is None:
         raise HTTPException(status_code=404, detail="Item not found")
     await session.delete(fragrance)
+    await versions.touch(session, "catalog", f"fragrance:{fragrance_id}")
     await session.commit()
     return Response(status_code=200, content="Item was deleted")
 
@@ -439,6 +989,7 @@ async def add_accord(
 ):
     new_accord = Note(**note.model_dump())
     session.add(new_accord)
+    await versions.touch(session, "accords")
     await session.commit()
     await session.refresh(new_accord)
     return new_accord
@@ -459,6 +1010,13 @@ async def change_accord(
     for key, value in update_data.items():
         setattr(accord, key, value)
 
+    if "name" in update_data:
+        await session.flush()
+        fragrance_ids = (await session.execute(select(FragranceNote.fragrance_id).filter_by(note_id=accord_id))).scalars().all()
+        await _refresh_derived_columns(session, fragrance_ids)
+        await versions.touch(session, "catalog")
+
+    await versions.touch(session, "accords")
     await session.commit()
     await session.refresh(accord)
     return accord
@@ -474,6 +1032,7 @@ async def remove_note(
         raise HTTPException(code=404, detail="Item not found")
     try:
         await session.delete(note)
+        await versions.touch(session, "accords")
         await session.commit()
         return Response(status_code=200, content="Item was deleted successfully")
     except Exception as e:
@@ -494,6 +1053,35 @@ async def add_accord_group(
 
 #                       ==== REVIEWS ==== 
 
+async def get_fragrance_reviews(
+    session: AsyncSession,
+    fragrance_id: int,
+    sort: ReviewSort = ReviewSort.newest,
+    cursor: str | None = None,
+    page_size: int = 10
+):
+    """
+    Keyset-paginated reviews of one fragrance, newest first or by rating
+    (highest first, newest first among equal ratings). The cursor records the
+    sort it was issued for and is rejected under a different one.
+    """
+    stmt = (
+        select(*[getattr(Review, column) for column in _REVIEW_COLUMNS])
+        .where(Review.fragrance_id == fragrance_id)
+        .order_by(*_review_sort_key(sort))
+        .limit(page_size + 1)
+    )
+    if cursor is not None:
+        stmt = stmt.where(_review_seek_predicate(sort, cursor))
+    result = await session.execute(stmt)
+    reviews = [dict(row._mapping) for row in result]
+    if not reviews and cursor is None:
+        exists = await session.scalar(select(Fragrance.id).where(Fragrance.id == fragrance_id))
+        if exists is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Fragrance not found")
+    reviews, next_cursor = _split_review_page(reviews, page_size, sort)
+    return {"reviews": reviews, "next_cursor": next_cursor}
+
 async def get_all_review(
     request: Request, 
     current_user: UserModel, 
@@ -527,9 +1115,16 @@ async def add_review(
     try:
         db_review = Review(user_id=current_user.id, fragrance_id=review.fragrance_id, content=review.content, rating=review.rating)
         session.add(db_review)
+        await session.flush()
+        await apply_rating_delta(session, review.fragrance_id, new=review.rating)
+        await versions.touch(session, f"fragrance:{review.fragrance_id}")
         await session.commit()
+        recommendations.schedule_refresh([review.fragrance_id])
         await session.refresh(db_review)
         return db_review
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Fragrance not found")
     except ValidationError as e:
         await session.rollback()
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -551,7 +1146,10 @@ async def delete_review(
         raise HTTPException(status_code=404, detail="Item not found")
     try:
         await session.delete(review)
+        await apply_rating_delta(session, review.fragrance_id, old=review.rating)
+        await versions.touch(session, f"fragrance:{review.fragrance_id}")
         await session.commit()
+        recommendations.schedule_refresh([review.fragrance_id])
     except Exception as e:
         await session.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
@@ -574,10 +1172,15 @@ async def edit_review(
         raise HTTPException(status_code=404, detail="Item not found")
     
     update_data = review_update.model_dump(exclude_unset=True)
+    old_rating = review.rating
    
     for key, value in update_data.items():
         setattr(review, key, value)
+    await apply_rating_delta(session, review.fragrance_id, old=old_rating, new=review.rating)
+    await versions.touch(session, f"fragrance:{review.fragrance_id}")
     await session.commit()
+    if review.rating != old_rating:
+        recommendations.schedule_refresh([review.fragrance_id])
     await session.refresh(review)
     return review
 
@@ -599,12 +1202,14 @@ async def add_to_or_edit_wishlist(
     if existing:
         existing.status = wishlist.status
         await session.commit()
+        recommendations.schedule_refresh([existing.fragrance_id])
         await session.refresh(existing)
         return existing
 
     wishlist_db = Wishlist(user_id=current_user.id, fragrance_id = wishlist.fragrance_id, status=wishlist.status)
     session.add(wishlist_db)
     await session.commit()
+    recommendations.schedule_refresh([wishlist_db.fragrance_id])
     await session.refresh(wishlist_db)
     return wishlist_db
 
@@ -623,6 +1228,7 @@ async def remove_from_wishlist(
         raise HTTPException(status_code=404, detail="Wishlist item not found")
     await session.delete(wishlist)
     await session.commit()
+    recommendations.schedule_refresh([wishlist.fragrance_id])
     return Response(status_code=200, content="Item was deleted")
 
 
@@ -631,24 +1237,74 @@ async def remove_from_wishlist(
 
 
 #                       ==== GENDER ==== 
+def _vote_error(error: IntegrityError) -> HTTPException:
+    if is_foreign_key_violation(error):
+        return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Fragrance not found")
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Vote rejected: {error.orig}")
+
+
+def _validate_vote_fragrance(fragrance_id: int, similar_fragrance_id: int | None = None):
+    if fragrance_id <= 0 or (similar_fragrance_id is not None and similar_fragrance_id <= 0):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Fragrance ID must be a positive integer"
+        )
+    if fragrance_id == similar_fragrance_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Fragrance ID's can not be similar"
+        )
+
+
+async def _commit_votes(session: AsyncSession, fragrance_id: int, write):
+    """Run `write` (one or more vote upserts) and commit it; FK failures mean the fragrance is missing."""
+    try:
+        result = await write()
+        await versions.touch(session, f"fragrance:{fragrance_id}")
+        await session.commit()
+    except IntegrityError as e:
+        await session.rollback()
+        raise _vote_error(e)
+    except SQLAlchemyError as e:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Internal server error: {str(e)}"
+        )
+    return result
+
+
+def _buffered() -> bool:
+    return settings.vote_write_mode == "buffered"
+
+
+def _vote_accepted() -> Response:
+    return Response(status_code=status.HTTP_202_ACCEPTED, content="Vote accepted")
+
+
+async def _vote_for_fragrance_dimension(
+    fragrance_id: int,
+    dimension: str,
+    value,
+    session: AsyncSession,
+    current_user: UserModel,
+):
+    _validate_vote_fragrance(fragrance_id)
+    if _buffered():
+        await vote_buffer.set_vote(current_user.id, fragrance_id, dimension, value)
+        return _vote_accepted()
+    return await _commit_votes(
+        session, fragrance_id,
+        lambda: upsert_vote(session, current_user.id, fragrance_id, dimension, value)
+    )
+
 async def vote_for_gender(
     fragrance_id: int,
     gender: Gender,
     session: AsyncSession, 
     current_user: UserModel, 
 ):
-    vote = (await session.execute(select(FragranceGender).filter_by(user_id=current_user.id, fragrance_id=fragrance_id))).scalar_one_or_none()
-    if vote is not None:
-        vote.gender = gender
-        await session.commit()
-        await session.refresh(vote)
-        return vote
-    
-    new_gender_vote = FragranceGender(user_id=current_user.id, fragrance_id=fragrance_id, gender=gender)
-    session.add(new_gender_vote)
-    await session.commit()
-    await session.refresh(new_gender_vote)
-    return new_gender_vote
+    return await _vote_for_fragrance_dimension(fragrance_id, "gender", gender, session, current_user)
 
 #                       ==== SEASON ==== 
 async def vote_for_season(
@@ -657,29 +1313,16 @@ async def vote_for_season(
     session: AsyncSession, 
     current_user: UserModel, 
 ): 
-    fragrance = await session.get(Fragrance, fragrance_id)
-    if fragrance is None:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Note with ID {fragrance_id} does not exist"
-        )
-    existing = (await session.execute(select(FragranceSeason).filter_by(fragrance_id=fragrance_id, user_id=current_user.id, season=season))).scalar_one_or_none()
-    if existing:
-        await session.delete(existing)
-        await session.commit()
+    _validate_vote_fragrance(fragrance_id)
+    if _buffered():
+        await vote_buffer.toggle_season(current_user.id, fragrance_id, season)
+        return _vote_accepted()
+    new_season_vote = await _commit_votes(
+        session, fragrance_id,
+        lambda: toggle_season_vote(session, current_user.id, fragrance_id, season)
+    )
+    if new_season_vote is None:
         return Response(status_code=200, content="item has been removed")
-    
-    try:
-        new_season_vote = FragranceSeason(user_id=current_user.id, fragrance_id=fragrance_id, season=season)
-        session.add(new_season_vote)
-    except Exception as e:
-        await session.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Internal server error: {str(e)}"
-        )
-    await session.commit()
-    await session.refresh(new_season_vote)
     return new_season_vote
 
 async def vote_for_longevity(
@@ -688,22 +1331,7 @@ async def vote_for_longevity(
     session: AsyncSession, 
     current_user: UserModel, 
 ):
-    if fragrance_id <= 0:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Fragrance ID must be a positive integer"
-        )
-    fragrance = await session.get(Fragrance, fragrance_id)
-    if fragrance is None:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"fragrance with ID {fragrance_id} does not exist"
-        )
-    vote = FragranceLongevity(fragrance_id=fragrance_id, user_id=current_user.id, longevity=longevity)
-    session.add(vote)
-    await session.commit()
-    await session.refresh(vote)
-    return vote
+    return await _vote_for_fragrance_dimension(fragrance_id, "longevity", longevity, session, current_user)
 
 
 async def vote_for_sillage(
@@ -712,22 +1340,7 @@ async def vote_for_sillage(
     session: AsyncSession, 
     current_user: UserModel, 
 ):
-    if fragrance_id <= 0:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Fragrance ID must be a positive integer"
-        )
-    fragrance = await session.get(Fragrance, fragrance_id)
-    if fragrance is None:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"fragrance with ID {fragrance_id} does not exist"
-        )
-    vote = FragranceSillage(fragrance_id=fragrance_id, user_id=current_user.id, sillage=sillage)
-    session.add(vote)
-    await session.commit()
-    await session.refresh(vote)
-    return vote
+    return await _vote_for_fragrance_dimension(fragrance_id, "sillage", sillage, session, current_user)
 
 async def vote_for_price_value(
     fragrance_id: int,
@@ -735,22 +1348,7 @@ async def vote_for_price_value(
     session: AsyncSession, 
     current_user: UserModel, 
 ):
-    if fragrance_id <= 0:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Fragrance ID must be a positive integer"
-        )
-    fragrance = await session.get(Fragrance, fragrance_id)
-    if fragrance is None:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"fragrance with ID {fragrance_id} does not exist"
-        )
-    vote = FragrancePriceValue(fragrance_id=fragrance_id, user_id=current_user.id, price_value=price_value)
-    session.add(vote)
-    await session.commit()
-    await session.refresh(vote)
-    return vote
+    return await _vote_for_fragrance_dimension(fragrance_id, "price_value", price_value, session, current_user)
 
 async def vote_for_similar_fragrance(
     fragrance_id: int, 
@@ -758,30 +1356,60 @@ async def vote_for_similar_fragrance(
     session: AsyncSession, 
     current_user: UserModel, 
 ):
-    if fragrance_id <= 0 or similar_fragrance_id <= 0:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Fragrance ID must be a positive integer"
-        )
-    if fragrance_id == similar_fragrance_id:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Fragrance ID's can not be similar"
-        )
-    fragrance = await session.get(Fragrance, fragrance_id)
-    similar_fragrance = await session.get(Fragrance, similar_fragrance_id)
-    if fragrance is None or similar_fragrance is None:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"fragrance with ID {fragrance_id} does not exist"
-        )
-    
-    try:
-        vote = FragranceSimilar(fragrance_id=fragrance_id, fragrance_that_similar_id=similar_fragrance_id, user_id=current_user.id)
-    except Exception as e:
-        session.rollback()
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e)
-    session.add(vote)
-    await session.commit()
-    await session.refresh(vote)
-    return vote
\ No newline at end of file
+    _validate_vote_fragrance(fragrance_id, similar_fragrance_id)
+    if _buffered():
+        await vote_buffer.add_similar(current_user.id, fragrance_id, similar_fragrance_id)
+        return _vote_accepted()
+    return await _commit_votes(
+        session, fragrance_id,
+        lambda: add_similar_vote(session, current_user.id, fragrance_id, similar_fragrance_id)
+    )
+
+async def vote_batch(
+    fragrance_id: int,
+    votes: VoteBatchSchema,
+    session: AsyncSession,
+    current_user: UserModel,
+):
+    """
+    Apply any subset of the per-dimension votes in one transaction, with the
+    same semantics as the single-dimension endpoints: gender, longevity,
+    sillage and price value replace the user's previous vote, every listed
+    season is toggled and a similar fragrance vote is added.
+
+    Each dimension is a single upsert statement; nothing is committed unless
+    every vote applies, and a missing fragrance fails the whole batch with 404.
+    In buffered mode the votes are queued and 202 is returned.
+    """
+    _validate_vote_fragrance(fragrance_id, votes.similar_fragrance_id)
+    seasons = list(dict.fromkeys(votes.seasons))
+
+    if _buffered():
+        for dimension in ("gender", "longevity", "sillage", "price_value"):
+            value = getattr(votes, dimension)
+            if value is not None:
+                await vote_buffer.set_vote(current_user.id, fragrance_id, dimension, value)
+        for season in seasons:
+            await vote_buffer.toggle_season(current_user.id, fragrance_id, season)
+        if votes.similar_fragrance_id is not None:
+            await vote_buffer.add_similar(current_user.id, fragrance_id, votes.similar_fragrance_id)
+        return _vote_accepted()
+
+    async def write():
+        applied = {}
+        for dimension in ("gender", "longevity", "sillage", "price_value"):
+            value = getattr(votes, dimension)
+            if value is not None:
+                await upsert_vote(session, current_user.id, fragrance_id, dimension, value)
+                applied[dimension] = value
+        if seasons:
+            rows = await toggle_season_votes(session, [(current_user.id, fragrance_id, season) for season in seasons])
+            added = {row.season for row in rows if row.delta > 0}
+            applied["seasons"] = {season.value: season.name in added for season in seasons}
+        if votes.similar_fragrance_id is not None:
+            await add_similar_vote(session, current_user.id, fragrance_id, votes.similar_fragrance_id)
+            applied["similar_fragrance_id"] = votes.similar_fragrance_id
+        return applied
+
+    applied = await _commit_votes(session, fragrance_id, write)
+    return {"fragrance_id": fragrance_id, **applied}
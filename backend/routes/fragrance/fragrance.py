@@ -1,19 +1,22 @@
-from fastapi import APIRouter, Depends, Request, Query
-from .schemas import CompanySchema, FragranceUpdate, FragranceRequestSchema, NoteRequestSchema, NoteGroupRequestSchema, NoteUpdateSchema, ReviewCreateSchema, ReviewUpdateSchema, WishlistRequestSchema, FragrancePaginatesResponseSchema, Order
+from fastapi import APIRouter, Depends, Request, Query, WebSocket
+from .schemas import CompanySchema, FragranceUpdate, FragranceRequestSchema, NoteRequestSchema, NoteGroupRequestSchema, NoteUpdateSchema, ReviewCreateSchema, ReviewUpdateSchema, WishlistRequestSchema, FragrancePaginatesResponseSchema, FragranceSearchResponseSchema, FragranceFacetsResponseSchema, ReviewListResponseSchema, SimilarFragrancesResponseSchema, SmellsLikeResponseSchema, RecommendationsResponseSchema, LeaderboardResponseSchema, VoteBatchSchema, Order, Pagination, CountMode, ReviewSort
 from sqlalchemy.ext.asyncio import AsyncSession
 from backend.core.db.session import get_async_session
 from backend.core.db.models.fragrance import FragranceType, Gender, Season, Longevity, Sillage, PriceValue
 from backend.core.db.models.user import User as UserModel
 from backend.core.db.models.user import Role
 from ..auth.services import require_role
-from ..fragrance import crud
+from backend.core.cache.http import conditional_get
+from backend.core.security.rate_limit import rate_limit
+from ..fragrance import crud, live
 from fastapi_csrf_protect import CsrfProtect
+from typing import List
 
 router = APIRouter(prefix="/fragrance", tags=['Fragrance routes'])
 
 
 #                       ==== FRAGRANCE ==== 
-@router.get("/all", response_model=FragrancePaginatesResponseSchema) 
+@router.get("/all", response_model=FragrancePaginatesResponseSchema, dependencies=[Depends(conditional_get("catalog"))]) 
 async def get_fragrances(
     session: AsyncSession = Depends(get_async_session), 
     company_name: str | None = None, 
@@ -22,17 +25,114 @@ async def get_fragrances(
     page_size: int = Query(10, ge=1, le=100),
     min_price: int | None = Query(None, ge=0),
     max_price: int | None = Query(None, ge=0),
-    order: Order = Order.asc
+    order: Order = Order.asc,
+    pagination: Pagination = Pagination.offset,
+    cursor: str | None = None,
+    count: CountMode = CountMode.exact,
+    notes_all: List[str] | None = Query(None),
+    notes_any: List[str] | None = Query(None),
+    notes_none: List[str] | None = Query(None)
 ):
-    return await crud.get_all_fragrances(session, company_name, fragrance_type, page, page_size, min_price, max_price, order)
+    return await crud.get_all_fragrances(session, company_name, fragrance_type, page, page_size, min_price, max_price, order, pagination, cursor, count, notes_all, notes_any, notes_none)
 
-@router.get("/all/{fragrance_id}")
+@router.get("/facets", response_model=FragranceFacetsResponseSchema, dependencies=[Depends(conditional_get("catalog"))])
+async def get_fragrance_facets(
+    session: AsyncSession = Depends(get_async_session), 
+    company_name: str | None = None, 
+    fragrance_type: FragranceType | None = None,  
+    min_price: int | None = Query(None, ge=0),
+    max_price: int | None = Query(None, ge=0),
+    notes_all: List[str] | None = Query(None),
+    notes_any: List[str] | None = Query(None),
+    notes_none: List[str] | None = Query(None)
+):
+    return await crud.get_fragrance_facets(session, company_name, fragrance_type, min_price, max_price, notes_all, notes_any, notes_none)
+
+@router.get("/search", response_model=FragranceSearchResponseSchema, dependencies=[Depends(conditional_get("catalog"))])
+async def search_fragrances(
+    q: str = Query(..., min_length=2, max_length=100),
+    page_size: int = Query(10, ge=1, le=100),
+    cursor: str | None = None,
+    session: AsyncSession = Depends(get_async_session)
+):
+    return await crud.search_fragrances(session, q, page_size, cursor)
+
+@router.get("/all/{fragrance_id}", dependencies=[Depends(conditional_get("fragrance:{fragrance_id}", "catalog"))])
 async def get_fragrance(
     fragrance_id: int,
     session: AsyncSession = Depends(get_async_session)
 ):
     return await crud.get_fragrance_by_id(fragrance_id, session)
 
+@router.get("/all/{fragrance_id}/similar", response_model=SimilarFragrancesResponseSchema, dependencies=[Depends(conditional_get("fragrance:{fragrance_id}", "catalog"))])
+async def get_similar_fragrances(
+    fragrance_id: int,
+    limit: int = Query(10, ge=1, le=50),
+    session: AsyncSession = Depends(get_async_session)
+):
+    return await crud.get_similar_fragrances(session, fragrance_id, limit)
+
+@router.get("/all/{fragrance_id}/smells-like", response_model=SmellsLikeResponseSchema, dependencies=[Depends(conditional_get("fragrance:{fragrance_id}", "catalog"))])
+async def get_smells_like(
+    fragrance_id: int,
+    limit: int = Query(10, ge=1, le=50),
+    session: AsyncSession = Depends(get_async_session)
+):
+    return await crud.get_smells_like(session, fragrance_id, limit)
+
+@router.get("/leaderboard", response_model=LeaderboardResponseSchema, dependencies=[Depends(conditional_get("leaderboard", "catalog"))])
+async def get_leaderboard(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(10, ge=1, le=100),
+    session: AsyncSession = Depends(get_async_session)
+):
+    return await crud.get_leaderboard(session, "overall", "", page, page_size)
+
+@router.get("/leaderboard/company/{company_id}", response_model=LeaderboardResponseSchema, dependencies=[Depends(conditional_get("leaderboard", "catalog"))])
+async def get_company_leaderboard(
+    company_id: int,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(10, ge=1, le=100),
+    session: AsyncSession = Depends(get_async_session)
+):
+    return await crud.get_leaderboard(session, "company", str(company_id), page, page_size)
+
+@router.get("/leaderboard/type/{fragrance_type}", response_model=LeaderboardResponseSchema, dependencies=[Depends(conditional_get("leaderboard", "catalog"))])
+async def get_type_leaderboard(
+    fragrance_type: FragranceType,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(10, ge=1, le=100),
+    session: AsyncSession = Depends(get_async_session)
+):
+    return await crud.get_leaderboard(session, "type", fragrance_type.name, page, page_size)
+
+@router.get("/leaderboard/season/{season}", response_model=LeaderboardResponseSchema, dependencies=[Depends(conditional_get("leaderboard", "catalog"))])
+async def get_season_leaderboard(
+    season: Season,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(10, ge=1, le=100),
+    session: AsyncSession = Depends(get_async_session)
+):
+    return await crud.get_leaderboard(session, "season", season.name, page, page_size)
+
+@router.get("/recommendations/me", response_model=RecommendationsResponseSchema)
+async def get_recommendations(
+    limit: int = Query(10, ge=1, le=50),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: UserModel = Depends(require_role([Role.USER, Role.ADMIN]))
+):
+    return await crud.get_recommendations(session, current_user, limit)
+
+@router.get("/all/{fragrance_id}/reviews", response_model=ReviewListResponseSchema, dependencies=[Depends(conditional_get("fragrance:{fragrance_id}"))])
+async def get_fragrance_reviews(
+    fragrance_id: int,
+    sort: ReviewSort = ReviewSort.newest,
+    cursor: str | None = None,
+    page_size: int = Query(10, ge=1, le=100),
+    session: AsyncSession = Depends(get_async_session)
+):
+    return await crud.get_fragrance_reviews(session, fragrance_id, sort, cursor, page_size)
+
 @router.post("/new-fragrance")
 async def add_fragrance(
     fragrance_data: FragranceRequestSchema, 
@@ -60,13 +160,14 @@ async def delete_fragrance(
 
 
 #                       ==== COMPANY ==== 
-@router.get("/company/all")
+@router.get("/company/all", dependencies=[Depends(conditional_get("company"))])
 async def get_all_company(
     session: AsyncSession  = Depends(get_async_session),
     page: int = Query(1, ge=1),
-    page_size: int = Query(10, ge=1, le=100)
+    page_size: int = Query(10, ge=1, le=100),
+    count: CountMode = CountMode.exact
 ):
-    return await crud.get_all_companies(session, page, page_size)
+    return await crud.get_all_companies(session, page, page_size, count)
 
 @router.post("/new-company")
 async def add_company( 
@@ -86,7 +187,7 @@ async def remove_company(
     return await crud.remove_company(company_id, session)
 
 #                       ==== ACCCORDS ==== 
-@router.get("/accords")
+@router.get("/accords", dependencies=[Depends(conditional_get("accords"))])
 async def get_accords(
     session: AsyncSession = Depends(get_async_session),
     page: int = Query(1, ge=1),
@@ -138,7 +239,7 @@ async def get_all_review(
 ):
     return await crud.get_all_review(request, current_user, session, page, page_size)
 
-@router.post("/reviews")
+@router.post("/reviews", dependencies=[Depends(rate_limit("review"))])
 async def add_review(
     review: ReviewCreateSchema,
     request: Request, 
@@ -148,7 +249,7 @@ async def add_review(
 ):
     return await crud.add_review(review, request, current_user, session, csrf_protector)
 
-@router.patch("/reviews/{review_id}")
+@router.patch("/reviews/{review_id}", dependencies=[Depends(rate_limit("review"))])
 async def edit_review(
     review_id: int,
     review_update: ReviewUpdateSchema, 
@@ -159,7 +260,7 @@ async def edit_review(
 ):
     return await crud.edit_review(review_id, review_update, request, current_user, session, csrf_protector)
 
-@router.delete("/reviews/{review_id}")
+@router.delete("/reviews/{review_id}", dependencies=[Depends(rate_limit("review"))])
 async def delete_review(
     review_id: int, 
     request: Request, 
@@ -194,7 +295,30 @@ async def remove_review(
 
 #                       ==== VOTING ==== 
 
-@router.post('/voting/gender/{fragrance_id}')
+@router.websocket('/live/{fragrance_id}')
+async def live_votes(
+    websocket: WebSocket,
+    fragrance_id: int
+):
+    await live.stream_websocket(websocket, fragrance_id)
+
+@router.get('/live/{fragrance_id}/events')
+async def live_votes_events(
+    fragrance_id: int,
+    request: Request
+):
+    return await live.stream_events(request, fragrance_id)
+
+@router.post('/voting/{fragrance_id}/batch', dependencies=[Depends(rate_limit("vote"))])
+async def vote_batch(
+    fragrance_id: int,
+    votes: VoteBatchSchema,
+    session: AsyncSession = Depends(get_async_session), 
+    current_user: UserModel = Depends(require_role([Role.USER, Role.ADMIN])), 
+):
+    return await crud.vote_batch(fragrance_id, votes, session, current_user)
+
+@router.post('/voting/gender/{fragrance_id}', dependencies=[Depends(rate_limit("vote"))])
 async def vote_for_gender(
     fragrance_id: int, 
     gender: Gender,
@@ -203,7 +327,7 @@ async def vote_for_gender(
     ):
     return await crud.vote_for_gender(fragrance_id, gender, session, current_user)
 
-@router.post('/voting/season/{fragrance_id}')
+@router.post('/voting/season/{fragrance_id}', dependencies=[Depends(rate_limit("vote"))])
 async def vote_for_season(
     fragrance_id: int, 
     season: Season,
@@ -212,7 +336,7 @@ async def vote_for_season(
     ):
     return await crud.vote_for_season(fragrance_id, season, session, current_user)
 
-@router.post('/voting/longevity/{fragrance_id}')
+@router.post('/voting/longevity/{fragrance_id}', dependencies=[Depends(rate_limit("vote"))])
 async def vote_for_longevity(
     fragrance_id: int, 
     longevity: Longevity,
@@ -221,7 +345,7 @@ async def vote_for_longevity(
     ):
     return await crud.vote_for_longevity(fragrance_id, longevity, session, current_user)
 
-@router.post('/voting/sillage/{fragrance_id}')
+@router.post('/voting/sillage/{fragrance_id}', dependencies=[Depends(rate_limit("vote"))])
 async def vote_for_sillage(
     fragrance_id: int, 
     sillage: Sillage,
@@ -230,7 +354,7 @@ async def vote_for_sillage(
     ):
     return await crud.vote_for_sillage(fragrance_id, sillage, session, current_user)
 
-@router.post('/voting/price_value/{fragrance_id}')
+@router.post('/voting/price_value/{fragrance_id}', dependencies=[Depends(rate_limit("vote"))])
 async def vote_for_price_value(
     fragrance_id: int, 
     price_value: PriceValue,
@@ -239,7 +363,7 @@ async def vote_for_price_value(
 ):
     return await crud.vote_for_price_value(fragrance_id, price_value, session, current_user)
 
-@router.post("/voting/vote_for_similar_fragrance/{fragrance_id}")
+@router.post("/voting/vote_for_similar_fragrance/{fragrance_id}", dependencies=[Depends(rate_limit("vote"))])
 async def vote_for_similar_fragrance(
     fragrance_id: int, 
     similar_fragrance_id: int,
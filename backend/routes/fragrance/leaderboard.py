@@ -0,0 +1,145 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy import select, text, bindparam, func, Integer, Float
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.core.cache.versions import versions
+from backend.core.configs.config import settings
+from backend.core.db.models.fragrance import FragranceLeaderboard, Season
+from backend.core.db.session import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Lets one worker refresh at a time; the others skip instead of queueing.
+_REFRESH_LOCK_ID = 0x6C647262
+
+_SEASON_COLUMNS = ", ".join(f"coalesce(v.season_{season.name}, 0) AS season_{season.name}" for season in Season)
+_SEASON_VALUES = ", ".join(f"('{season.name}', scored.season_{season.name})" for season in Season)
+_SEASON_TOTAL = " + ".join(f"scored.season_{season.name}" for season in Season)
+
+# The score is the Bayesian average (C * m + sum) / (C + count): every
+# fragrance starts with C = `prior_ratings` phantom ratings at the global mean m,
+# so a single 10/10 review barely moves it while hundreds of reviews dominate.
+# A fragrance is on a season's board when that season has at least
+# `season_min_share` of its season votes.
+_REFRESH_LEADERBOARD_SQL = text(f"""
+    WITH prior AS (
+        SELECT coalesce(sum(rating_sum) / nullif(sum(rating_count), 0), 0) AS mean
+        FROM fragrance_rating_stats
+    ),
+    scored AS (
+        SELECT
+            s.fragrance_id,
+            f.company_id,
+            f.fragrance_type,
+            s.rating_count,
+            (:prior_ratings * prior.mean + s.rating_sum) / (:prior_ratings + s.rating_count) AS score,
+            {_SEASON_COLUMNS}
+        FROM fragrance_rating_stats AS s
+        JOIN fragrance AS f ON f.id = s.fragrance_id
+        CROSS JOIN prior
+        LEFT JOIN fragrance_vote_stats AS v ON v.fragrance_id = s.fragrance_id
+        WHERE s.rating_count >= :min_ratings
+    ),
+    entries AS (
+        SELECT 'overall' AS scope, '' AS scope_key, fragrance_id, score, rating_count FROM scored
+        UNION ALL
+        SELECT 'company', company_id::text, fragrance_id, score, rating_count FROM scored
+        UNION ALL
+        SELECT 'type', fragrance_type::text, fragrance_id, score, rating_count FROM scored
+        UNION ALL
+        SELECT 'season', season.name, fragrance_id, score, rating_count
+        FROM scored
+        CROSS JOIN LATERAL (VALUES {_SEASON_VALUES}) AS season(name, votes)
+        WHERE season.votes > 0 AND season.votes >= :season_min_share * ({_SEASON_TOTAL})
+    ),
+    ranked AS (
+        SELECT
+            *,
+            row_number() OVER (PARTITION BY scope, scope_key ORDER BY score DESC, rating_count DESC, fragrance_id) AS rank
+        FROM entries
+    )
+    INSERT INTO fragrance_leaderboard (scope, scope_key, rank, fragrance_id, score, rating_count, refreshed_at)
+    SELECT scope, scope_key, rank, fragrance_id, score, rating_count, now()
+    FROM ranked
+    WHERE rank <= :size
+""").bindparams(
+    bindparam("prior_ratings", type_=Integer),
+    bindparam("min_ratings", type_=Integer),
+    bindparam("season_min_share", type_=Float),
+    bindparam("size", type_=Integer),
+)
+
+
+async def refresh_leaderboards(session: AsyncSession, max_age_seconds: float | None = None) -> int | None:
+    """
+    Rewrite every leaderboard from `fragrance_rating_stats` in the caller's
+    transaction. Returns the number of ranked rows, or None when another
+    worker holds the refresh lock or the boards are younger than
+    `max_age_seconds`.
+    """
+    if not await session.scalar(select(func.pg_try_advisory_xact_lock(_REFRESH_LOCK_ID))):
+        return None
+    if max_age_seconds is not None:
+        refreshed_at = await session.scalar(
+            select(FragranceLeaderboard.refreshed_at)
+            .where(FragranceLeaderboard.scope == "overall", FragranceLeaderboard.scope_key == "", FragranceLeaderboard.rank == 1)
+        )
+        if refreshed_at is not None and (datetime.now(timezone.utc) - refreshed_at).total_seconds() < max_age_seconds:
+            return None
+    # A plain DELETE rather than TRUNCATE keeps the old boards readable until commit.
+    await session.execute(text(f"DELETE FROM {FragranceLeaderboard.__tablename__}"))
+    result = await session.execute(_REFRESH_LEADERBOARD_SQL, {
+        "prior_ratings": settings.leaderboard_prior_ratings,
+        "min_ratings": settings.leaderboard_min_ratings,
+        "season_min_share": settings.leaderboard_season_min_share,
+        "size": settings.leaderboard_size,
+    })
+    await versions.touch(session, "leaderboard")
+    return result.rowcount
+
+
+class LeaderboardRefresher:
+    """
+    Refreshes the leaderboards every `interval_seconds`, starting at startup.
+    Every worker runs one, but a refresh is skipped while another worker's is
+    in progress or the boards are fresh enough, so they are rebuilt about once
+    per interval overall.
+    """
+
+    def __init__(self, interval_seconds: int):
+        self.interval = interval_seconds
+        self._task: asyncio.Task | None = None
+
+    async def _refresh(self):
+        try:
+            async with AsyncSessionLocal() as session:
+                rows = await refresh_leaderboards(session, max_age_seconds=self.interval / 2)
+                await session.commit()
+            if rows is not None:
+                logger.info("Refreshed leaderboards with %d ranked rows", rows)
+        except Exception:
+            logger.exception("Failed to refresh leaderboards")
+
+    async def _run(self):
+        while True:
+            await self._refresh()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+leaderboard_refresher = LeaderboardRefresher(interval_seconds=settings.leaderboard_refresh_seconds)
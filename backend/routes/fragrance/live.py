@@ -0,0 +1,213 @@
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Dict, Iterable, Set
+
+from fastapi import HTTPException, Request, WebSocket, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from backend.core.cache.versions import versions
+from backend.core.configs.config import settings
+from backend.core.db.models.fragrance import Fragrance, FragranceVoteStats
+from backend.core.db.session import AsyncSessionLocal
+from .votes import VOTE_DIMENSIONS
+
+logger = logging.getLogger(__name__)
+
+STATS_COLUMNS = [column for dimension in VOTE_DIMENSIONS.values() for column in dimension.stats_columns.values()]
+_SSE_KEEPALIVE_SECONDS = 15
+
+
+def _counts(stats: FragranceVoteStats | None) -> Dict[str, int]:
+    return {column: getattr(stats, column) if stats is not None else 0 for column in STATS_COLUMNS}
+
+
+class Subscription:
+    """
+    One client's view of a fragrance. Frames are flat `{stats column: count}`
+    maps with absolute values, so frames the client has not picked up yet are
+    merged instead of queued and a slow client never holds more than one.
+    """
+
+    def __init__(self, fragrance_id: int):
+        self.fragrance_id = fragrance_id
+        self._pending: Dict[str, int] = {}
+        self._ready = asyncio.Event()
+
+    def push(self, counts: Dict[str, int]):
+        self._pending.update(counts)
+        self._ready.set()
+
+    async def next(self) -> Dict[str, int]:
+        await self._ready.wait()
+        self._ready.clear()
+        counts, self._pending = self._pending, {}
+        return counts
+
+
+class TallyHub:
+    """
+    Fans vote counter changes out to live subscribers, per worker.
+
+    Any `fragrance:{id}` version bump (local or from another worker) marks the
+    fragrance dirty. Every `live_tally_interval_ms` one query reads the
+    counters of all dirty fragrances that have subscribers and each
+    subscriber is pushed only the counters that changed, so a fragrance
+    produces at most one frame per interval however many votes land.
+    """
+
+    def __init__(self, interval_ms: int):
+        self.interval = interval_ms / 1000
+        self._subscriptions: Dict[int, Set[Subscription]] = {}
+        self._counts: Dict[int, Dict[str, int]] = {}
+        self._dirty: Set[int] = set()
+        self._task: asyncio.Task | None = None
+        versions.add_listener(self._on_version_bump)
+
+    def _on_version_bump(self, keys: Iterable[str] | None):
+        if keys is None:
+            self._dirty.update(self._subscriptions)
+            return
+        for key in keys:
+            prefix, _, fragrance_id = key.partition(":")
+            if prefix == "fragrance" and fragrance_id.isdigit() and int(fragrance_id) in self._subscriptions:
+                self._dirty.add(int(fragrance_id))
+
+    async def subscribe(self, fragrance_id: int) -> tuple[Subscription, Dict[str, int]] | None:
+        """Register a subscription and return it with the current counters, or None if the fragrance does not exist."""
+        subscription = Subscription(fragrance_id)
+        self._subscriptions.setdefault(fragrance_id, set()).add(subscription)
+        counts = self._counts.get(fragrance_id)
+        if counts is None:
+            try:
+                async with AsyncSessionLocal() as session:
+                    row = (await session.execute(
+                        select(Fragrance.id, FragranceVoteStats)
+                        .outerjoin(FragranceVoteStats, FragranceVoteStats.fragrance_id == Fragrance.id)
+                        .where(Fragrance.id == fragrance_id)
+                    )).one_or_none()
+            except Exception:
+                self.unsubscribe(subscription)
+                raise
+            if row is None:
+                self.unsubscribe(subscription)
+                return None
+            counts = self._counts.setdefault(fragrance_id, _counts(row.FragranceVoteStats))
+        return subscription, dict(counts)
+
+    def unsubscribe(self, subscription: Subscription):
+        subscriptions = self._subscriptions.get(subscription.fragrance_id)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscriptions[subscription.fragrance_id]
+            self._counts.pop(subscription.fragrance_id, None)
+            self._dirty.discard(subscription.fragrance_id)
+
+    async def _publish_dirty(self):
+        fragrance_ids, self._dirty = self._dirty & self._subscriptions.keys(), set()
+        if not fragrance_ids:
+            return
+        try:
+            async with AsyncSessionLocal() as session:
+                rows = (await session.scalars(
+                    select(FragranceVoteStats).where(FragranceVoteStats.fragrance_id.in_(fragrance_ids))
+                )).all()
+        except Exception:
+            logger.exception("Failed to read vote counters for live subscribers")
+            self._dirty |= fragrance_ids
+            return
+        for stats in rows:
+            subscriptions = self._subscriptions.get(stats.fragrance_id)
+            if not subscriptions:
+                continue
+            counts = _counts(stats)
+            previous = self._counts.get(stats.fragrance_id, {})
+            changed = {column: count for column, count in counts.items() if previous.get(column) != count}
+            self._counts[stats.fragrance_id] = counts
+            if changed:
+                for subscription in subscriptions:
+                    subscription.push(changed)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self._publish_dirty()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+tally_hub = TallyHub(interval_ms=settings.live_tally_interval_ms)
+
+
+def _frame(kind: str, fragrance_id: int, counts: Dict[str, int]) -> str:
+    return json.dumps({"type": kind, "fragrance_id": fragrance_id, "counts": counts}, separators=(",", ":"))
+
+
+async def stream_websocket(websocket: WebSocket, fragrance_id: int):
+    """Send a snapshot of the counters, then the changed counters as they move, until the client leaves."""
+    subscribed = await tally_hub.subscribe(fragrance_id)
+    if subscribed is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Fragrance not found")
+        return
+    subscription, counts = subscribed
+    await websocket.accept()
+
+    async def send():
+        await websocket.send_text(_frame("snapshot", fragrance_id, counts))
+        while True:
+            await websocket.send_text(_frame("delta", fragrance_id, await subscription.next()))
+
+    async def receive():
+        # Clients do not send anything; this only notices the disconnect.
+        while True:
+            await websocket.receive_text()
+
+    tasks = [asyncio.create_task(send()), asyncio.create_task(receive())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        tally_hub.unsubscribe(subscription)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _events(request: Request, subscription: Subscription, counts: Dict[str, int]) -> AsyncIterator[str]:
+    fragrance_id = subscription.fragrance_id
+    try:
+        yield f"event: snapshot\ndata: {_frame('snapshot', fragrance_id, counts)}\n\n"
+        while not await request.is_disconnected():
+            try:
+                changed = await asyncio.wait_for(subscription.next(), _SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: delta\ndata: {_frame('delta', fragrance_id, changed)}\n\n"
+    finally:
+        tally_hub.unsubscribe(subscription)
+
+
+async def stream_events(request: Request, fragrance_id: int) -> StreamingResponse:
+    """Server-Sent Events version of `stream_websocket`, with a keep-alive comment while idle."""
+    subscribed = await tally_hub.subscribe(fragrance_id)
+    if subscribed is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Fragrance not found")
+    return StreamingResponse(
+        _events(request, *subscribed),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,99 @@
+from typing import Dict, Iterable
+
+from sqlalchemy import text, bindparam, BigInteger, Boolean, Integer, Float
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.core.db.models.fragrance import FragranceRatingStats, RATING_HISTOGRAM_SIZE, rating_bucket
+
+
+_APPLY_RATING_DELTA_SQL = text("""
+    INSERT INTO fragrance_rating_stats AS stats (fragrance_id, rating_count, rating_sum, rating_histogram)
+    VALUES (:fragrance_id, :count_delta, :sum_delta, :histogram_delta)
+    ON CONFLICT (fragrance_id) DO UPDATE SET
+        rating_count = stats.rating_count + excluded.rating_count,
+        rating_sum = stats.rating_sum + excluded.rating_sum,
+        rating_histogram = (
+            SELECT array_agg(current + delta ORDER BY slot)
+            FROM unnest(stats.rating_histogram, excluded.rating_histogram) WITH ORDINALITY AS h(current, delta, slot)
+        )
+""").bindparams(
+    bindparam("fragrance_id", type_=BigInteger),
+    bindparam("count_delta", type_=Integer),
+    bindparam("sum_delta", type_=Float),
+    bindparam("histogram_delta", type_=ARRAY(Integer)),
+)
+
+_REBUILD_RATING_STATS_SQL = text(f"""
+    INSERT INTO fragrance_rating_stats (fragrance_id, rating_count, rating_sum, rating_histogram)
+    SELECT
+        f.id,
+        (SELECT count(*) FROM reviews AS r WHERE r.fragrance_id = f.id),
+        (SELECT coalesce(sum(r.rating), 0) FROM reviews AS r WHERE r.fragrance_id = f.id),
+        ARRAY(
+            SELECT count(r.id)
+            FROM generate_series(1, {RATING_HISTOGRAM_SIZE}) AS slot
+            LEFT JOIN reviews AS r ON r.fragrance_id = f.id AND (r.rating * 2)::int - 1 = slot
+            GROUP BY slot
+            ORDER BY slot
+        )
+    FROM fragrance AS f
+    WHERE :all_fragrances OR f.id = ANY(:fragrance_ids)
+    ON CONFLICT (fragrance_id) DO UPDATE SET
+        rating_count = excluded.rating_count,
+        rating_sum = excluded.rating_sum,
+        rating_histogram = excluded.rating_histogram
+""").bindparams(
+    bindparam("all_fragrances", type_=Boolean),
+    bindparam("fragrance_ids", type_=ARRAY(BigInteger)),
+)
+
+
+async def apply_rating_delta(
+    session: AsyncSession,
+    fragrance_id: int,
+    old: float | None = None,
+    new: float | None = None
+):
+    """
+    Update `fragrance_rating_stats` for a review that is added (`new`), removed
+    (`old`) or re-rated (both), in the caller's transaction.
+    """
+    if old == new:
+        return
+    histogram = [0] * RATING_HISTOGRAM_SIZE
+    count_delta, sum_delta = 0, 0.0
+    if new is not None:
+        histogram[rating_bucket(new) - 1] += 1
+        count_delta += 1
+        sum_delta += new
+    if old is not None:
+        histogram[rating_bucket(old) - 1] -= 1
+        count_delta -= 1
+        sum_delta -= old
+    await session.execute(_APPLY_RATING_DELTA_SQL, {
+        "fragrance_id": fragrance_id,
+        "count_delta": count_delta,
+        "sum_delta": sum_delta,
+        "histogram_delta": histogram,
+    })
+
+
+def rating_summary(stats: FragranceRatingStats | None) -> Dict:
+    count = stats.rating_count if stats is not None else 0
+    histogram = stats.rating_histogram if stats is not None else [0] * RATING_HISTOGRAM_SIZE
+    return {
+        "average": round(stats.rating_sum / count, 2) if count else None,
+        "count": count,
+        "histogram": {f"{(slot + 2) / 2:.1f}": votes for slot, votes in enumerate(histogram)},
+    }
+
+
+async def rebuild_rating_stats(session: AsyncSession, fragrance_ids: Iterable[int] | None = None) -> int:
+    """Recount `fragrance_rating_stats` from `reviews`, for every fragrance or only the given ones."""
+    await session.execute(text("LOCK TABLE fragrance_rating_stats IN SHARE ROW EXCLUSIVE MODE"))
+    result = await session.execute(_REBUILD_RATING_STATS_SQL, {
+        "all_fragrances": fragrance_ids is None,
+        "fragrance_ids": list(fragrance_ids or []),
+    })
+    return result.rowcount
@@ -0,0 +1,237 @@
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Set, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import select, func, case, union_all, distinct, any_, literal, BigInteger, Float
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.core.configs.config import settings
+from backend.core.db.models.fragrance import Wishlist, WishListType, Review, FragranceCollaborativeNeighbor
+from .similarity import (
+    FragranceVectors, RefreshScheduler, l2_normalize, neighbor_lists, merge_candidates, write_neighbor_lists, refresh_pool
+)
+
+logger = logging.getLogger(__name__)
+
+# Implicit feedback strength of a wishlist entry. A review counts with
+# (rating - 5) / 5, so only ratings above 5 say the user liked it; a user's
+# strongest signal for a fragrance wins.
+INTERACTION_WEIGHTS = {
+    WishListType.OWNED: 1.0,
+    WishListType.USED: 0.8,
+    WishListType.WANTED: 0.5,
+}
+
+_NEIGHBORS_LOCK_ID = 0x63666E62
+
+
+def interactions(user_ids: Iterable[int] | None = None, fragrance_ids: Iterable[int] | None = None):
+    """
+    (user_id, fragrance_id, weight) rows with a positive weight from
+    wishlists and reviews, optionally limited to some users or fragrances.
+    """
+    wishlist = select(
+        Wishlist.user_id,
+        Wishlist.fragrance_id,
+        case(INTERACTION_WEIGHTS, value=Wishlist.status, else_=0.0).label("weight")
+    )
+    reviews = select(
+        Review.user_id,
+        Review.fragrance_id,
+        (func.greatest(Review.rating - 5, 0, type_=Float) / 5).label("weight")
+    )
+    # Candidate sets can be large, so ids are bound as one array parameter.
+    if user_ids is not None:
+        user_ids = literal(list(user_ids), ARRAY(BigInteger))
+        wishlist = wishlist.where(Wishlist.user_id == any_(user_ids))
+        reviews = reviews.where(Review.user_id == any_(user_ids))
+    if fragrance_ids is not None:
+        fragrance_ids = literal(list(fragrance_ids), ARRAY(BigInteger))
+        wishlist = wishlist.where(Wishlist.fragrance_id == any_(fragrance_ids))
+        reviews = reviews.where(Review.fragrance_id == any_(fragrance_ids))
+    signals = union_all(wishlist, reviews).subquery()
+    weight = func.max(signals.c.weight)
+    return (
+        select(signals.c.user_id, signals.c.fragrance_id, weight.label("weight"))
+        .group_by(signals.c.user_id, signals.c.fragrance_id)
+        .having(weight > 0)
+    )
+
+
+def owned_fragrances(user_id: int):
+    """Everything the user already has on a wishlist or has reviewed, whatever the weight."""
+    return union_all(
+        select(Wishlist.fragrance_id).where(Wishlist.user_id == user_id),
+        select(Review.fragrance_id).where(Review.user_id == user_id),
+    )
+
+
+def build_item_vectors(rows: List[Tuple[int, int, float]], min_users: int) -> FragranceVectors:
+    """
+    L2-normalized fragrance x user vectors from (user_id, fragrance_id, weight)
+    rows, keeping only fragrances with at least `min_users` users so a single
+    shared owner does not make two fragrances perfect neighbours.
+    """
+    if not rows:
+        return FragranceVectors(np.empty(0, dtype=np.int64), sparse.csr_matrix((0, 0), dtype=np.float32))
+    user_ids, fragrance_ids, weights = zip(*rows)
+    _, columns = np.unique(np.array(user_ids, dtype=np.int64), return_inverse=True)
+    fragrance_ids, item_rows = np.unique(np.array(fragrance_ids, dtype=np.int64), return_inverse=True)
+    keep = np.bincount(item_rows, minlength=len(fragrance_ids)) >= min_users
+    renumber = np.cumsum(keep) - 1
+    selected = keep[item_rows]
+    matrix = sparse.csr_matrix(
+        (np.array(weights, dtype=np.float32)[selected], (renumber[item_rows[selected]], columns[selected])),
+        shape=(int(keep.sum()), int(columns.max()) + 1),
+        dtype=np.float32
+    )
+    return FragranceVectors(fragrance_ids[keep], l2_normalize(matrix))
+
+
+async def _load_interactions(session: AsyncSession, stmt) -> List[Tuple[int, int, float]]:
+    return [(row.user_id, row.fragrance_id, float(row.weight)) for row in (await session.execute(stmt)).all()]
+
+
+async def rebuild_neighbors(session: AsyncSession, workers: int = 1) -> int:
+    """Recompute every fragrance's collaborative neighbours. Returns the number of fragrances with a list."""
+    await session.execute(select(func.pg_advisory_xact_lock(_NEIGHBORS_LOCK_ID)))
+    vectors = build_item_vectors(await _load_interactions(session, interactions()), settings.recommendation_min_users)
+    loop = asyncio.get_running_loop()
+    lists = await loop.run_in_executor(
+        None, neighbor_lists, vectors, vectors.fragrance_ids.tolist(),
+        settings.recommendation_top_k, settings.similarity_batch_size, workers, True
+    )
+    await write_neighbor_lists(session, FragranceCollaborativeNeighbor, lists, replace_all=True)
+    return len(lists)
+
+
+def _refresh_lists(
+    local: List[Tuple[int, int, float]],
+    fragrance_ids: Set[int],
+    candidates: Set[int],
+    norms: Dict[int, float],
+    current: Dict[int, Dict[int, float]],
+    k: int
+) -> Tuple[Dict[int, List[Tuple[int, float]]], Set[int]]:
+    """The CPU side of `refresh_neighbors`, run in the refresh pool. Returns the new lists and the stale candidates."""
+    lists: Dict[int, List[Tuple[int, float]]] = {fragrance_id: [] for fragrance_id in fragrance_ids}
+    scores: Dict[int, Dict[int, float]] = {}
+    if local:
+        user_ids, item_ids, weights = zip(*local)
+        _, columns = np.unique(np.array(user_ids, dtype=np.int64), return_inverse=True)
+        item_ids, rows = np.unique(np.array(item_ids, dtype=np.int64), return_inverse=True)
+        matrix = sparse.csr_matrix((np.array(weights, dtype=np.float32), (rows, columns)), shape=(len(item_ids), int(columns.max()) + 1))
+        item_ids = item_ids.tolist()
+        changed_rows = [row for row, item_id in enumerate(item_ids) if item_id in fragrance_ids and item_id in norms]
+        dots = (matrix[changed_rows] @ matrix.T).tocoo()
+        for changed_row, other_row, dot in zip(dots.row.tolist(), dots.col.tolist(), dots.data.tolist()):
+            changed_id, other_id = item_ids[changed_rows[changed_row]], item_ids[other_row]
+            if changed_id != other_id and other_id in norms:
+                scores.setdefault(changed_id, {})[other_id] = dot / (norms[changed_id] * norms[other_id])
+    for changed_id, row_scores in scores.items():
+        lists[changed_id] = sorted(
+            ((other_id, score) for other_id, score in row_scores.items() if score > 0),
+            key=lambda item: (-item[1], item[0])
+        )[:k]
+
+    rescored: Dict[int, Dict[int, float]] = {}
+    for changed_id, row_scores in scores.items():
+        for other_id, score in row_scores.items():
+            if other_id in candidates:
+                rescored.setdefault(other_id, {})[changed_id] = score
+    stale = merge_candidates(lists, current, fragrance_ids, candidates, rescored, k)
+    return lists, stale
+
+
+async def _within_user_budget(session: AsyncSession, fragrance_ids: Set[int]) -> Set[int]:
+    """
+    The fragrances to refresh now, least popular first, while their users'
+    interactions stay within `recommendation_refresh_max_users`. The rest are
+    queued for the next round; a fragrance over the budget on its own is left
+    to `python -m backend.commands.rebuild_recommendations`, since one more
+    interaction barely moves its scores anyway.
+    """
+    budget = settings.recommendation_refresh_max_users
+    changed = interactions(fragrance_ids=fragrance_ids).subquery()
+    user_counts = dict((await session.execute(
+        select(changed.c.fragrance_id, func.count()).group_by(changed.c.fragrance_id)
+    )).all())
+    accepted, deferred, users = set(), set(), 0
+    for fragrance_id in sorted(fragrance_ids, key=lambda fragrance_id: user_counts.get(fragrance_id, 0)):
+        count = user_counts.get(fragrance_id, 0)
+        if count > budget:
+            logger.info("Fragrance %d has %d users, leaving its collaborative neighbours to the next rebuild", fragrance_id, count)
+        elif users + count > budget:
+            deferred.add(fragrance_id)
+        else:
+            accepted.add(fragrance_id)
+            users += count
+    if deferred:
+        schedule_refresh(deferred)
+    return accepted
+
+
+async def refresh_neighbors(session: AsyncSession, fragrance_ids: Iterable[int]) -> Set[int]:
+    """
+    Bring the collaborative neighbours up to date after interactions with
+    `fragrance_ids` changed. Only pairs involving those fragrances can move,
+    so the scores are computed exactly from the interactions of their users
+    plus every candidate's norm, without loading the whole matrix; how many
+    users one refresh may load is capped by `_within_user_budget`. Returns
+    the ids whose lists were rewritten.
+    """
+    fragrance_ids = set(fragrance_ids)
+    if not fragrance_ids:
+        return set()
+    await session.execute(select(func.pg_advisory_xact_lock(_NEIGHBORS_LOCK_ID)))
+    fragrance_ids = await _within_user_budget(session, fragrance_ids)
+    if not fragrance_ids:
+        return set()
+    min_users = settings.recommendation_min_users
+
+    changed = interactions(fragrance_ids=fragrance_ids).subquery()
+    user_ids = (await session.scalars(select(distinct(changed.c.user_id)))).all()
+    local = await _load_interactions(session, interactions(user_ids=user_ids)) if user_ids else []
+    candidates = {fragrance_id for _, fragrance_id, _ in local}
+    candidates |= set((await session.scalars(
+        select(FragranceCollaborativeNeighbor.fragrance_id)
+        .where(FragranceCollaborativeNeighbor.neighbor_id.in_(fragrance_ids))
+    )).all())
+    candidates -= fragrance_ids
+
+    everyone = interactions(fragrance_ids=fragrance_ids | candidates).subquery()
+    norms: Dict[int, float] = {
+        row.fragrance_id: float(row.norm)
+        for row in (await session.execute(
+            select(everyone.c.fragrance_id, func.sqrt(func.sum(everyone.c.weight * everyone.c.weight)).label("norm"))
+            .group_by(everyone.c.fragrance_id)
+            .having(func.count() >= min_users)
+        )).all()
+    }
+
+    current: Dict[int, Dict[int, float]] = {}
+    if candidates:
+        for row in (await session.execute(
+            select(FragranceCollaborativeNeighbor.fragrance_id, FragranceCollaborativeNeighbor.neighbor_id, FragranceCollaborativeNeighbor.score)
+            .where(FragranceCollaborativeNeighbor.fragrance_id == any_(literal(list(candidates), ARRAY(BigInteger))))
+        )).all():
+            current.setdefault(row.fragrance_id, {})[row.neighbor_id] = row.score
+
+    lists, stale = await asyncio.get_running_loop().run_in_executor(
+        refresh_pool(), _refresh_lists, local, fragrance_ids, candidates, norms, current, settings.recommendation_top_k
+    )
+    await write_neighbor_lists(session, FragranceCollaborativeNeighbor, lists)
+    if stale:
+        schedule_refresh(stale)
+    return set(lists)
+
+
+_collaborative_refresh = RefreshScheduler(refresh_neighbors, "collaborative neighbours")
+
+
+def schedule_refresh(fragrance_ids: Iterable[int]):
+    """Refresh the collaborative neighbours of `fragrance_ids` in the background after their interactions changed."""
+    _collaborative_refresh.schedule(fragrance_ids)
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 from typing import List, Dict
-from backend.core.db.models.fragrance import FragranceType, WishListType, NoteType
+from datetime import datetime
+from backend.core.db.models.fragrance import FragranceType, WishListType, NoteType, Gender, Season, Longevity, Sillage, PriceValue
 
 
 from fastapi import Query
@@ -10,6 +11,18 @@ class Order(Enum):
     asc = "asc"
     desc = "desc"
 
+class Pagination(Enum):
+    offset = "offset"
+    cursor = "cursor"
+
+class CountMode(Enum):
+    exact = "exact"
+    estimate = "estimate"
+
+class ReviewSort(Enum):
+    newest = "newest"
+    rating = "rating"
+
 class FragranceSchema(BaseModel):
     id: int
     name: str = Field(min_length=3, max_length=150)
@@ -27,7 +40,65 @@ class FragranceShemaById(FragranceSchema):
 
 class FragrancePaginatesResponseSchema(BaseModel):
     total: int
+    total_is_estimate: bool = False
     fragrances: List[FragranceSchema]
+    next_cursor: str | None = None
+
+class FragranceSearchHitSchema(FragranceSchema):
+    score: float
+
+class FragranceSearchResponseSchema(BaseModel):
+    fragrances: List[FragranceSearchHitSchema]
+    next_cursor: str | None = None
+
+class SimilarFragranceSchema(FragranceSchema):
+    votes: int
+
+class SimilarFragrancesResponseSchema(BaseModel):
+    fragrance_id: int
+    fragrances: List[SimilarFragranceSchema]
+
+class SmellsLikeFragranceSchema(FragranceSchema):
+    score: float
+
+class SmellsLikeResponseSchema(BaseModel):
+    fragrance_id: int
+    fragrances: List[SmellsLikeFragranceSchema]
+
+class RecommendedFragranceSchema(FragranceSchema):
+    score: float
+
+class RecommendationsResponseSchema(BaseModel):
+    fragrances: List[RecommendedFragranceSchema]
+
+class LeaderboardFragranceSchema(FragranceSchema):
+    rank: int
+    score: float
+    rating_count: int
+
+class LeaderboardResponseSchema(BaseModel):
+    scope: str
+    key: str | None = None
+    page: int
+    refreshed_at: datetime | None = None
+    fragrances: List[LeaderboardFragranceSchema]
+
+class FacetValueSchema(BaseModel):
+    value: str
+    label: str
+    count: int
+
+class PriceBucketFacetSchema(BaseModel):
+    min_price: int | None = None
+    max_price: int | None = None
+    count: int
+
+class FragranceFacetsResponseSchema(BaseModel):
+    total: int
+    fragrance_types: List[FacetValueSchema]
+    companies: List[FacetValueSchema]
+    price_buckets: List[PriceBucketFacetSchema]
+    notes: List[FacetValueSchema]
 
 class FragranceRequestSchema(BaseModel):
     name: str = Field(min_length=3, max_length=150)
@@ -96,15 +167,29 @@ class NoteGroupRequestSchema(BaseModel):
 
 
 class ReviewResponseSchema(BaseModel):
+    id: int
     user_id: int
-    content: int
+    fragrance_id: int
+    content: str
     rating: float
 
+class ReviewListResponseSchema(BaseModel):
+    reviews: List[ReviewResponseSchema]
+    next_cursor: str | None = None
+
 class ReviewCreateSchema(BaseModel):
     content: str
     fragrance_id: int
     rating: float
 
+    @field_validator("rating")
+    def valid_rating(cls, value: float) -> float:
+        if not (1 <= value <= 10):
+            raise ValueError("Rating must be between 1 and 10")
+        if (value * 2) % 1 != 0:  
+            raise ValueError("Rating must be a multiple of 0.5 (e.g., 1.0, 1.5, 2.0)")
+        return value
+
 class ReviewUpdateSchema(BaseModel):
     content: str | None = None
     rating: float | None = None
@@ -122,4 +207,18 @@ class WishlistRequestSchema(BaseModel):
     status: WishListType
 class FragranceNoteUpdateSchema(BaseModel):
     note_id: int
-    note_type: NoteType
\ No newline at end of file
+    note_type: NoteType
+
+class VoteBatchSchema(BaseModel):
+    gender: Gender | None = None
+    seasons: List[Season] = Field(default_factory=list, max_length=len(Season))
+    longevity: Longevity | None = None
+    sillage: Sillage | None = None
+    price_value: PriceValue | None = None
+    similar_fragrance_id: int | None = None
+
+    @model_validator(mode="after")
+    def not_empty(self) -> "VoteBatchSchema":
+        if all(getattr(self, field) in (None, []) for field in type(self).model_fields):
+            raise ValueError("At least one vote must be given")
+        return self
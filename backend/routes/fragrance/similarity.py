@@ -0,0 +1,440 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Set, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import select, text, bindparam, BigInteger, func
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.core.cache.versions import versions
+from backend.core.configs.config import settings
+from backend.core.db.models.fragrance import Fragrance, FragranceNote, Note, NoteType, FragranceContentNeighbor, note_key
+from backend.core.db.session import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Base notes define how a fragrance smells for most of its wear, top notes
+# only for the first minutes.
+NOTE_TYPE_WEIGHTS = {
+    NoteType.TOP: 0.7,
+    NoteType.MIDDLE: 1.0,
+    NoteType.BASE: 1.2,
+}
+
+# Scores recomputed from a different subset of rows may differ in the last
+# bits; a list is not treated as inexact over that.
+_SCORE_TOLERANCE = 1e-6
+
+# Serializes neighbour writers across workers so incremental refreshes and
+# rebuilds never merge into each other's half-written lists.
+_NEIGHBORS_LOCK_ID = 0x6E656967
+
+
+@dataclass
+class FragranceVectors:
+    """L2-normalized vectors, one CSR row per fragrance in `fragrance_ids` order."""
+    fragrance_ids: np.ndarray
+    matrix: sparse.csr_matrix
+
+    def rows(self, fragrance_ids: Iterable[int]) -> np.ndarray:
+        positions = {fragrance_id: row for row, fragrance_id in enumerate(self.fragrance_ids.tolist())}
+        return np.array([positions[fragrance_id] for fragrance_id in fragrance_ids if fragrance_id in positions], dtype=np.int64)
+
+
+def build_vectors(notes: List[Tuple[int, int, NoteType | None, int | None]], group_weight: float) -> FragranceVectors:
+    """
+    Vectors from (fragrance_id, note_id, note_type, group_id) rows. Each note is
+    a feature weighted by its position in the pyramid; with a non-zero
+    `group_weight` its note group is a feature too, so fragrances that share
+    accords but not exact notes still score above zero.
+    """
+    if not notes:
+        return FragranceVectors(np.empty(0, dtype=np.int64), sparse.csr_matrix((0, 0), dtype=np.float32))
+    fragrance_ids, note_ids, note_types, group_ids = zip(*notes)
+    fragrance_ids, rows = np.unique(np.array(fragrance_ids, dtype=np.int64), return_inverse=True)
+    note_ids = np.array(note_ids, dtype=np.int64)
+    weights = np.array([NOTE_TYPE_WEIGHTS.get(note_type, 1.0) for note_type in note_types], dtype=np.float32)
+
+    columns, data, row_index = [note_ids], [weights], [rows]
+    if group_weight:
+        has_group = np.array([group_id is not None for group_id in group_ids])
+        groups = np.array([group_id or 0 for group_id in group_ids], dtype=np.int64)[has_group]
+        columns.append(note_ids.max() + 1 + groups)
+        data.append(weights[has_group] * group_weight)
+        row_index.append(rows[has_group])
+    features, columns = np.unique(np.concatenate(columns), return_inverse=True)
+    # Repeated (row, column) pairs, i.e. several notes of one group, are summed.
+    matrix = sparse.csr_matrix(
+        (np.concatenate(data), (np.concatenate(row_index), columns)),
+        shape=(len(fragrance_ids), len(features)),
+        dtype=np.float32
+    )
+    return FragranceVectors(fragrance_ids, l2_normalize(matrix))
+
+
+def l2_normalize(matrix: sparse.spmatrix) -> sparse.csr_matrix:
+    """Scale every row to unit length (empty rows stay empty), so dot products are cosines."""
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return (sparse.diags(1 / norms).astype(np.float32) @ matrix).tocsr()
+
+
+_worker_corpus: sparse.csr_matrix | None = None
+
+
+def _init_worker(corpus: sparse.csr_matrix):
+    global _worker_corpus
+    _worker_corpus = corpus
+
+
+def _top_k_batch(
+    query: sparse.csr_matrix,
+    corpus: sparse.csr_matrix,
+    k: int,
+    exclude: np.ndarray,
+    sparse_product: bool = False
+) -> Tuple[np.ndarray, np.ndarray]:
+    if sparse_product:
+        scores = (query @ corpus.T).toarray()
+    else:
+        # Sparse corpus times the densified batch is far cheaper than a sparse x
+        # sparse product whose result is mostly non-zero anyway.
+        scores = (corpus @ query.toarray().T).T
+    has_self = exclude >= 0
+    scores[np.flatnonzero(has_self), exclude[has_self]] = 0
+    n = scores.shape[1]
+    k = min(k, n)
+    candidates = np.argpartition(scores, n - k, axis=1)[:, n - k:]
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    neighbors = np.take_along_axis(candidates, order, axis=1)
+    neighbor_scores = np.take_along_axis(candidate_scores, order, axis=1)
+    neighbors[neighbor_scores <= 0] = -1
+    return neighbors, neighbor_scores
+
+
+def _top_k_worker(query: sparse.csr_matrix, k: int, exclude: np.ndarray, sparse_product: bool) -> Tuple[np.ndarray, np.ndarray]:
+    return _top_k_batch(query, _worker_corpus, k, exclude, sparse_product)
+
+
+def top_k_cosine(
+    query: sparse.csr_matrix,
+    corpus: sparse.csr_matrix,
+    k: int,
+    exclude: np.ndarray | None = None,
+    batch_size: int = 256,
+    workers: int = 1,
+    sparse_product: bool = False
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k cosine neighbours in `corpus` for every row of `query` (both
+    L2-normalized rows over the same features). `exclude[i]` is a corpus row to skip for query row i (the
+    fragrance itself) or -1. Rows are scored in dense batches of `batch_size`
+    so memory stays at batch_size x len(corpus) floats; with `workers` > 1
+    batches run in a process pool. With many sparse features (e.g. one per
+    user) pass `sparse_product` so batches are multiplied without densifying
+    the query rows.
+
+    Returns (neighbors, scores), both shaped (len(query), k); neighbors are
+    corpus row numbers, -1 where fewer than k rows score above zero.
+    """
+    n = query.shape[0]
+    if n == 0 or corpus.shape[0] == 0:
+        return np.full((n, k), -1, dtype=np.int64), np.zeros((n, k), dtype=np.float32)
+    if exclude is None:
+        exclude = np.full(n, -1, dtype=np.int64)
+    batches = [(start, min(start + batch_size, n)) for start in range(0, n, batch_size)]
+    if workers > 1 and len(batches) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(corpus,)) as pool:
+            results = list(pool.map(
+                _top_k_worker,
+                [query[start:end] for start, end in batches],
+                [k] * len(batches),
+                [exclude[start:end] for start, end in batches],
+                [sparse_product] * len(batches),
+            ))
+    else:
+        results = [_top_k_batch(query[start:end], corpus, k, exclude[start:end], sparse_product) for start, end in batches]
+    neighbors = np.vstack([result[0] for result in results])
+    scores = np.vstack([result[1] for result in results])
+    if neighbors.shape[1] < k:
+        pad = k - neighbors.shape[1]
+        neighbors = np.pad(neighbors, ((0, 0), (0, pad)), constant_values=-1)
+        scores = np.pad(scores, ((0, 0), (0, pad)))
+    return neighbors, scores
+
+
+def neighbor_lists(
+    vectors: FragranceVectors,
+    query_ids: Iterable[int],
+    k: int,
+    batch_size: int,
+    workers: int = 1,
+    sparse_product: bool = False
+) -> Dict[int, List[Tuple[int, float]]]:
+    """Ranked (neighbor_id, score) lists of `query_ids` against every fragrance in `vectors`."""
+    rows = vectors.rows(query_ids)
+    neighbors, scores = top_k_cosine(
+        vectors.matrix[rows], vectors.matrix, k, exclude=rows,
+        batch_size=batch_size, workers=workers, sparse_product=sparse_product
+    )
+    lists = {}
+    for row, row_neighbors, row_scores in zip(rows.tolist(), neighbors, scores):
+        lists[int(vectors.fragrance_ids[row])] = [
+            (int(vectors.fragrance_ids[neighbor]), float(score))
+            for neighbor, score in zip(row_neighbors.tolist(), row_scores.tolist())
+            if neighbor >= 0
+        ]
+    return lists
+
+
+_refresh_pool: ProcessPoolExecutor | None = None
+
+
+def refresh_pool() -> ProcessPoolExecutor:
+    """
+    Long-lived processes for the scoring done by incremental refreshes, so it
+    never runs on (or holds the GIL of) a web worker's event loop. Started on
+    first use from a fork server rather than forking the running worker.
+    """
+    global _refresh_pool
+    if _refresh_pool is None:
+        _refresh_pool = ProcessPoolExecutor(
+            max_workers=settings.similarity_refresh_workers,
+            mp_context=multiprocessing.get_context("forkserver")
+        )
+    return _refresh_pool
+
+
+def shutdown_refresh_pool():
+    global _refresh_pool
+    if _refresh_pool is not None:
+        _refresh_pool.shutdown(wait=False, cancel_futures=True)
+        _refresh_pool = None
+
+
+async def _load_notes(session: AsyncSession, fragrance_ids: Iterable[int] | None = None) -> List[Tuple]:
+    stmt = (
+        select(FragranceNote.fragrance_id, FragranceNote.note_id, FragranceNote.note_type, Note.group_id)
+        .join(Note, Note.id == FragranceNote.note_id)
+    )
+    if fragrance_ids is not None:
+        stmt = stmt.where(FragranceNote.fragrance_id.in_(list(fragrance_ids)))
+    return [tuple(row) for row in (await session.execute(stmt)).all()]
+
+
+async def write_neighbor_lists(session: AsyncSession, model, lists: Dict[int, List[Tuple[int, float]]], replace_all: bool = False):
+    """
+    Replace the ranked lists of `lists`' keys (or, with `replace_all`, of every
+    fragrance) in a (fragrance_id, rank, neighbor_id, score) table.
+    """
+    table = model.__tablename__
+    # A plain DELETE rather than TRUNCATE keeps the old lists readable until commit.
+    if replace_all:
+        await session.execute(text(f"DELETE FROM {table}"))
+    else:
+        await session.execute(
+            text(f"DELETE FROM {table} WHERE fragrance_id = ANY(:fragrance_ids)")
+            .bindparams(bindparam("fragrance_ids", type_=ARRAY(BigInteger))),
+            {"fragrance_ids": list(lists)}
+        )
+    records = [
+        (fragrance_id, rank, neighbor_id, score)
+        for fragrance_id, neighbors in lists.items()
+        for rank, (neighbor_id, score) in enumerate(neighbors, start=1)
+    ]
+    if not records:
+        return
+    connection = await session.connection()
+    raw = await connection.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        table,
+        records=records,
+        columns=["fragrance_id", "rank", "neighbor_id", "score"]
+    )
+
+
+async def rebuild_neighbors(session: AsyncSession, workers: int = 1) -> int:
+    """Recompute every fragrance's content neighbours from scratch. Returns the number of fragrances with notes."""
+    await session.execute(select(func.pg_advisory_xact_lock(_NEIGHBORS_LOCK_ID)))
+    vectors = build_vectors(await _load_notes(session), settings.similarity_group_weight)
+    loop = asyncio.get_running_loop()
+    lists = await loop.run_in_executor(
+        None, neighbor_lists, vectors, vectors.fragrance_ids.tolist(),
+        settings.similarity_top_k, settings.similarity_batch_size, workers
+    )
+    await write_neighbor_lists(session, FragranceContentNeighbor, lists, replace_all=True)
+    return len(lists)
+
+
+def merge_neighbors(
+    before: Dict[int, float],
+    changed_ids: Set[int],
+    scores: Dict[int, float],
+    k: int
+) -> Tuple[List[Tuple[int, float]] | None, bool]:
+    """
+    One fragrance's ranked list after the scores against `changed_ids` moved:
+    stale entries for them are dropped and their new `scores` above zero
+    merged in. Returns the list, or None when it is unchanged, and whether it
+    is still exact. A full `before` says nothing about the fragrances below
+    its last entry, so once fewer than `k` entries score at least that much,
+    one of them may belong in the list and it needs recomputing.
+    """
+    merged = {neighbor: score for neighbor, score in before.items() if neighbor not in changed_ids}
+    merged.update({neighbor: float(score) for neighbor, score in scores.items() if score > 0})
+    ranked = sorted(merged.items(), key=lambda item: (-item[1], item[0]))
+    exact = True
+    if len(before) >= k:
+        floor = min(before.values()) - _SCORE_TOLERANCE
+        exact = sum(1 for _, score in ranked if score >= floor) >= k
+    ranked = ranked[:k]
+    return (None if dict(ranked) == before else ranked), exact
+
+
+def merge_candidates(
+    lists: Dict[int, List[Tuple[int, float]]],
+    current: Dict[int, Dict[int, float]],
+    changed_ids: Set[int],
+    candidates: Set[int],
+    rescored: Dict[int, Dict[int, float]],
+    k: int
+) -> Set[int]:
+    """
+    Add to `lists` every candidate whose list moves once its scores against
+    `changed_ids` are replaced by `rescored`. Returns the candidates whose
+    merged lists may be missing a neighbour, to be recomputed in full.
+    """
+    stale = set()
+    for candidate_id in candidates:
+        ranked, exact = merge_neighbors(current.get(candidate_id, {}), changed_ids, rescored.get(candidate_id, {}), k)
+        if ranked is not None:
+            lists[candidate_id] = ranked
+        if not exact:
+            stale.add(candidate_id)
+    return stale
+
+
+def _refresh_lists(
+    notes: List[Tuple],
+    fragrance_ids: Set[int],
+    candidates: Set[int],
+    current: Dict[int, Dict[int, float]],
+    k: int,
+    batch_size: int,
+    group_weight: float
+) -> Tuple[Dict[int, List[Tuple[int, float]]], Set[int]]:
+    """The CPU side of `refresh_neighbors`, run in the refresh pool. Returns the new lists and the stale candidates."""
+    vectors = build_vectors(notes, group_weight)
+    lists = neighbor_lists(vectors, fragrance_ids, k, batch_size)
+    for fragrance_id in fragrance_ids:
+        lists.setdefault(fragrance_id, [])
+    stale = set()
+    if candidates:
+        changed_rows = vectors.rows(fragrance_ids)
+        candidate_rows = vectors.rows(candidates)
+        # Kept sparse: only pairs that share a feature have a score to merge.
+        scores = (vectors.matrix[candidate_rows] @ vectors.matrix[changed_rows].T).tocoo()
+        rescored: Dict[int, Dict[int, float]] = {}
+        for candidate_row, changed_row, score in zip(scores.row.tolist(), scores.col.tolist(), scores.data.tolist()):
+            candidate_id = int(vectors.fragrance_ids[candidate_rows[candidate_row]])
+            rescored.setdefault(candidate_id, {})[int(vectors.fragrance_ids[changed_rows[changed_row]])] = score
+        # Candidates without notes any more only need the changed ids dropped.
+        stale = merge_candidates(lists, current, fragrance_ids, candidates, rescored, k)
+    return lists, stale
+
+
+async def refresh_neighbors(session: AsyncSession, fragrance_ids: Iterable[int]) -> Set[int]:
+    """
+    Bring the neighbour lists up to date after the notes of `fragrance_ids`
+    changed: their own lists are recomputed, and every fragrance that shares
+    a note with them (found through the GIN indexed `note_keys`) or currently
+    lists one of them gets them merged in or dropped from its list. A list
+    that may have lost a neighbour that way is queued for a full recompute.
+
+    Fragrances related only through note groups are picked up by the next
+    full rebuild. Returns the ids whose lists were rewritten.
+    """
+    fragrance_ids = set(fragrance_ids)
+    if not fragrance_ids:
+        return set()
+    await session.execute(select(func.pg_advisory_xact_lock(_NEIGHBORS_LOCK_ID)))
+    k = settings.similarity_top_k
+
+    keys = {
+        note_key(note_id)
+        for _, note_id, _, _ in await _load_notes(session, fragrance_ids)
+    }
+    candidates = set()
+    if keys:
+        candidates |= set((await session.scalars(
+            select(Fragrance.id).where(Fragrance.note_keys.overlap(list(keys)))
+        )).all())
+    candidates |= set((await session.scalars(
+        select(FragranceContentNeighbor.fragrance_id).where(FragranceContentNeighbor.neighbor_id.in_(fragrance_ids))
+    )).all())
+    candidates -= fragrance_ids
+
+    notes = await _load_notes(session, fragrance_ids | candidates)
+    current: Dict[int, Dict[int, float]] = {}
+    if candidates:
+        for row in (await session.execute(
+            select(FragranceContentNeighbor.fragrance_id, FragranceContentNeighbor.neighbor_id, FragranceContentNeighbor.score)
+            .where(FragranceContentNeighbor.fragrance_id.in_(candidates))
+        )).all():
+            current.setdefault(row.fragrance_id, {})[row.neighbor_id] = row.score
+
+    lists, stale = await asyncio.get_running_loop().run_in_executor(
+        refresh_pool(), _refresh_lists, notes, fragrance_ids, candidates, current,
+        k, settings.similarity_batch_size, settings.similarity_group_weight
+    )
+    await write_neighbor_lists(session, FragranceContentNeighbor, lists)
+    await versions.touch(session, *(f"fragrance:{fragrance_id}" for fragrance_id in lists))
+    if stale:
+        schedule_refresh(stale)
+    return set(lists)
+
+
+class RefreshScheduler:
+    """
+    Runs `refresh(session, ids)` in the background, one transaction at a time;
+    ids queued while a refresh runs are batched into the next one.
+    """
+
+    def __init__(self, refresh, name: str):
+        self.refresh = refresh
+        self.name = name
+        self._pending: Set[int] = set()
+        self._task: asyncio.Task | None = None
+
+    async def _drain(self):
+        try:
+            while self._pending:
+                fragrance_ids = set(self._pending)
+                self._pending.clear()
+                try:
+                    async with AsyncSessionLocal() as session:
+                        await self.refresh(session, fragrance_ids)
+                        await session.commit()
+                except Exception:
+                    logger.exception("Failed to refresh %s of %s", self.name, sorted(fragrance_ids))
+        finally:
+            self._task = None
+
+    def schedule(self, fragrance_ids: Iterable[int]):
+        self._pending.update(fragrance_ids)
+        if self._pending and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._drain())
+
+
+_content_refresh = RefreshScheduler(refresh_neighbors, "content neighbours")
+
+
+def schedule_refresh(fragrance_ids: Iterable[int]):
+    """Refresh the content neighbours of `fragrance_ids` in the background."""
+    _content_refresh.schedule(fragrance_ids)
@@ -0,0 +1,234 @@
+import asyncio
+import logging
+from collections import defaultdict
+from enum import Enum
+from typing import Dict, Iterator, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.core.cache.versions import versions
+from backend.core.configs.config import settings
+from backend.core.db.models.fragrance import Fragrance, Season
+from backend.core.db.session import AsyncSessionLocal
+from .votes import upsert_votes, toggle_season_votes, add_similar_votes
+
+logger = logging.getLogger(__name__)
+
+_SINGLE_CHOICE_DIMENSIONS = ("gender", "longevity", "sillage", "price_value")
+
+
+class _Batch:
+    """Coalesced votes: the last single-choice value wins and season toggles cancel out in pairs."""
+
+    def __init__(self):
+        self.choices: Dict[str, Dict[Tuple[int, int], Enum]] = {dimension: {} for dimension in _SINGLE_CHOICE_DIMENSIONS}
+        self.seasons: Set[Tuple[int, int, Season]] = set()
+        self.similar: Set[Tuple[int, int, int]] = set()
+
+    def __len__(self) -> int:
+        return sum(map(len, self.choices.values())) + len(self.seasons) + len(self.similar)
+
+    def fragrance_ids(self) -> Set[int]:
+        ids = {fragrance_id for votes in self.choices.values() for _, fragrance_id in votes}
+        ids.update(fragrance_id for _, fragrance_id, _ in self.seasons)
+        for _, fragrance_id, similar_fragrance_id in self.similar:
+            ids.update((fragrance_id, similar_fragrance_id))
+        return ids
+
+    def drop_fragrances(self, fragrance_ids: Set[int]):
+        for dimension, votes in self.choices.items():
+            self.choices[dimension] = {key: value for key, value in votes.items() if key[1] not in fragrance_ids}
+        self.seasons = {key for key in self.seasons if key[1] not in fragrance_ids}
+        self.similar = {key for key in self.similar if key[1] not in fragrance_ids and key[2] not in fragrance_ids}
+
+    def by_fragrance(self) -> Dict[int, "_Batch"]:
+        parts: Dict[int, _Batch] = defaultdict(_Batch)
+        for dimension, votes in self.choices.items():
+            for key, value in votes.items():
+                parts[key[1]].choices[dimension][key] = value
+        for key in self.seasons:
+            parts[key[1]].seasons.add(key)
+        for key in self.similar:
+            parts[key[1]].similar.add(key)
+        return parts
+
+    def split(self) -> Iterator["_Batch"]:
+        """One batch per vote."""
+        for dimension, votes in self.choices.items():
+            for key, value in votes.items():
+                part = _Batch()
+                part.choices[dimension][key] = value
+                yield part
+        for key in self.seasons:
+            part = _Batch()
+            part.seasons.add(key)
+            yield part
+        for key in self.similar:
+            part = _Batch()
+            part.similar.add(key)
+            yield part
+
+    def __repr__(self) -> str:
+        votes = [(dimension, *key, value.name) for dimension, choices in self.choices.items() for key, value in choices.items()]
+        votes += [("season", user_id, fragrance_id, season.name) for user_id, fragrance_id, season in self.seasons]
+        votes += [("similar", *key) for key in self.similar]
+        return f"_Batch({votes})"
+
+    def merge_older(self, older: "_Batch"):
+        """Put back a batch that failed to flush; votes queued since then take precedence."""
+        for dimension, votes in older.choices.items():
+            self.choices[dimension] = {**votes, **self.choices[dimension]}
+        self.seasons ^= older.seasons
+        self.similar |= older.similar
+
+
+class VoteBuffer:
+    """
+    Per-worker write-behind buffer for votes, used when `vote_write_mode` is
+    "buffered". Votes are coalesced in memory and written in bulk by a
+    background task every `vote_buffer_flush_ms` milliseconds, or as soon as
+    `vote_buffer_max_items` distinct votes are waiting. Submitting blocks once
+    `vote_buffer_max_pending` votes are queued until a flush makes room.
+
+    A flush writes each dimension with one set-based statement in a single
+    transaction. Votes for fragrances that no longer exist are dropped. If the
+    database still rejects the batch, say for a user deleted meanwhile, it is
+    written again one fragrance at a time under savepoints, and vote by vote
+    for a fragrance that fails, so only the rejected votes are dropped. If the
+    database is unavailable the batch is kept and retried on the next flush.
+    """
+
+    def __init__(self, flush_ms: int, max_items: int, max_pending: int):
+        self.flush_interval = flush_ms / 1000
+        self.max_items = max_items
+        self.max_pending = max_pending
+        self._batch = _Batch()
+        self._flush_lock = asyncio.Lock()
+        self._room = asyncio.Condition()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._closing = False
+
+    def __len__(self) -> int:
+        return len(self._batch)
+
+    async def _wait_for_room(self):
+        if len(self._batch) < self.max_pending:
+            return
+        self._wakeup.set()
+        async with self._room:
+            await self._room.wait_for(lambda: len(self._batch) < self.max_pending)
+
+    def _queued(self):
+        if len(self._batch) >= self.max_items:
+            self._wakeup.set()
+
+    async def set_vote(self, user_id: int, fragrance_id: int, dimension: str, value: Enum):
+        votes = self._batch.choices[dimension]
+        if (user_id, fragrance_id) not in votes:
+            await self._wait_for_room()
+            votes = self._batch.choices[dimension]
+        votes[(user_id, fragrance_id)] = value
+        self._queued()
+
+    async def toggle_season(self, user_id: int, fragrance_id: int, season: Season):
+        key = (user_id, fragrance_id, season)
+        if key not in self._batch.seasons:
+            await self._wait_for_room()
+        self._batch.seasons ^= {key}
+        self._queued()
+
+    async def add_similar(self, user_id: int, fragrance_id: int, similar_fragrance_id: int):
+        key = (user_id, fragrance_id, similar_fragrance_id)
+        if key not in self._batch.similar:
+            await self._wait_for_room()
+        self._batch.similar.add(key)
+        self._queued()
+
+    async def flush(self):
+        async with self._flush_lock:
+            batch, self._batch = self._batch, _Batch()
+            async with self._room:
+                self._room.notify_all()
+            if not len(batch):
+                return
+            try:
+                try:
+                    await self._write(batch)
+                except IntegrityError:
+                    logger.warning("Database rejected a batch of %d buffered votes, writing them one fragrance at a time", len(batch))
+                    await self._write(batch, isolated=True)
+            except Exception:
+                logger.exception("Failed to flush %d buffered votes, will retry", len(batch))
+                self._batch.merge_older(batch)
+
+    async def _write(self, batch: _Batch, isolated: bool = False):
+        async with AsyncSessionLocal() as session:
+            fragrance_ids = batch.fragrance_ids()
+            existing = set((await session.scalars(select(Fragrance.id).where(Fragrance.id.in_(fragrance_ids)))).all())
+            batch.drop_fragrances(fragrance_ids - existing)
+            if not isolated:
+                await _write_votes(session, batch)
+            else:
+                for part in batch.by_fragrance().values():
+                    if await _write_savepoint(session, part):
+                        continue
+                    for vote in part.split():
+                        if not await _write_savepoint(session, vote):
+                            logger.warning("Dropping a buffered vote rejected by the database: %r", vote)
+            # Touched after the savepoints: rolling one back fires after_rollback,
+            # which would discard the pending version bumps.
+            await versions.touch(session, *(f"fragrance:{fragrance_id}" for fragrance_id in existing))
+            await session.commit()
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task and write out whatever is still queued."""
+        if self._task is not None:
+            self._closing = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+
+async def _write_votes(session: AsyncSession, batch: _Batch):
+    for dimension, votes in batch.choices.items():
+        if votes:
+            await upsert_votes(session, dimension, [(user_id, fragrance_id, value) for (user_id, fragrance_id), value in votes.items()])
+    if batch.seasons:
+        await toggle_season_votes(session, batch.seasons)
+    if batch.similar:
+        await add_similar_votes(session, batch.similar)
+
+
+async def _write_savepoint(session: AsyncSession, batch: _Batch) -> bool:
+    """Write `batch` under a savepoint; False, with nothing written, if the database rejected it."""
+    try:
+        async with session.begin_nested():
+            await _write_votes(session, batch)
+    except IntegrityError:
+        return False
+    return True
+
+
+vote_buffer = VoteBuffer(
+    flush_ms=settings.vote_buffer_flush_ms,
+    max_items=settings.vote_buffer_max_items,
+    max_pending=settings.vote_buffer_max_pending,
+)
@@ -0,0 +1,412 @@
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, Iterable, List, Tuple, Type
+
+from sqlalchemy import text, bindparam, BigInteger, Boolean, String
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.core.db.models.fragrance import (
+    FragranceGender, FragranceSeasonVote, FragranceLongevity, FragranceSillage, FragrancePriceValue, FragranceVoteStats,
+    Gender, Season, Longevity, Sillage, PriceValue, SEASON_BITS
+)
+
+
+@dataclass(frozen=True)
+class VoteDimension:
+    name: str
+    model: type
+    column: str
+    enum: Type[Enum]
+    # Maps each value to its bit when one row holds all of a user's votes as a bitmask.
+    bits: Dict[Enum, int] | None = None
+
+    def stats_column(self, value: Enum) -> str:
+        return f"{self.name}_{value.name}"
+
+    def matches(self, value: Enum) -> str:
+        """SQL condition for a vote row counting towards `value`."""
+        if self.bits is not None:
+            return f"{self.column} & {self.bits[value]} <> 0"
+        return f"{self.column} = '{value.name}'"
+
+    @property
+    def stats_columns(self) -> Dict[Enum, str]:
+        return {value: self.stats_column(value) for value in self.enum}
+
+    @property
+    def table(self) -> str:
+        return self.model.__tablename__
+
+    @property
+    def enum_type(self) -> str:
+        return self.model.__table__.c[self.column].type.name
+
+
+VOTE_DIMENSIONS: Dict[str, VoteDimension] = {
+    dimension.name: dimension for dimension in (
+        VoteDimension("gender", FragranceGender, "gender", Gender),
+        VoteDimension("season", FragranceSeasonVote, "mask", Season, SEASON_BITS),
+        VoteDimension("longevity", FragranceLongevity, "longevity", Longevity),
+        VoteDimension("sillage", FragranceSillage, "sillage", Sillage),
+        VoteDimension("price_value", FragrancePriceValue, "price_value", PriceValue),
+    )
+}
+
+
+def is_foreign_key_violation(error: IntegrityError) -> bool:
+    return getattr(error.orig, "sqlstate", None) == "23503"
+
+
+#                       ==== UPSERTS ==== 
+# Vote writes are set-based: each statement takes parallel arrays of rows and
+# changes the vote rows and their `fragrance_vote_stats` counters together, so
+# a single vote and a flushed batch (see vote_buffer.py) cost the same fixed
+# number of statements per dimension. Rows must be unique per vote key. The foreign keys stand in
+# for an existence check on the fragrance; a missing fragrance surfaces as an
+# IntegrityError (see `is_foreign_key_violation`).
+
+_ID_ARRAY = ARRAY(BigInteger)
+_VALUE_ARRAY = ARRAY(String)
+
+
+def _lock_votes_sql(vote_dimension: VoteDimension) -> str:
+    # Locks and reads the users' current votes in a statement of its own: a
+    # data-modifying CTE gives no guarantee that a sibling SELECT ... FOR
+    # UPDATE runs before it, and one that runs after skips the rows the
+    # upsert already changed.
+    return f"""
+        SELECT v.user_id, v.fragrance_id, v.{vote_dimension.column}::text AS value
+        FROM {vote_dimension.table} AS v
+        JOIN unnest(:user_ids, :fragrance_ids) AS input(user_id, fragrance_id) USING (user_id, fragrance_id)
+        ORDER BY v.fragrance_id, v.user_id
+        FOR UPDATE OF v
+    """
+
+
+def _upsert_votes_sql(vote_dimension: VoteDimension) -> str:
+    # `previous_value` is the vote read under its row lock by `_lock_votes_sql`,
+    # NULL for a first vote; the stats rows get +1 for each new value and -1
+    # for each previous one. When a concurrent first vote wins the insert
+    # race, a row without a previous value is updated rather than inserted,
+    # so it adds nothing to the counters; its fragrance's stats row is still
+    # upserted, which locks it in the same ordered pass, and the caller
+    # recounts it.
+    column = vote_dimension.column
+    columns = list(vote_dimension.stats_columns.values())
+    deltas = [
+        f"coalesce(sum((changed.{column} = '{value.name}')::int - coalesce((changed.previous_value = '{value.name}')::int, 0))"
+        f" FILTER (WHERE inserted OR had_previous), 0)"
+        for value in vote_dimension.enum
+    ]
+    return f"""
+        WITH input AS (
+            SELECT * FROM unnest(:user_ids, :fragrance_ids, :values, :previous_values)
+                AS input(user_id, fragrance_id, value, previous_value)
+        ), vote AS (
+            INSERT INTO {vote_dimension.table} (user_id, fragrance_id, {column})
+            SELECT user_id, fragrance_id, CAST(value AS {vote_dimension.enum_type})
+            FROM input
+            ORDER BY fragrance_id, user_id
+            ON CONFLICT (user_id, fragrance_id) DO UPDATE SET {column} = excluded.{column}
+            RETURNING id, user_id, fragrance_id, {column}, xmax = 0 AS inserted
+        ), changed AS (
+            SELECT vote.*, input.previous_value, input.previous_value IS NOT NULL AS had_previous
+            FROM vote
+            JOIN input USING (user_id, fragrance_id)
+        ), stats AS (
+            INSERT INTO fragrance_vote_stats AS stats (fragrance_id, {", ".join(columns)})
+            SELECT fragrance_id, {", ".join(deltas)}
+            FROM changed
+            GROUP BY fragrance_id
+            ORDER BY fragrance_id
+            ON CONFLICT (fragrance_id) DO UPDATE SET {", ".join(f"{c} = stats.{c} + excluded.{c}" for c in columns)}
+        )
+        SELECT id, user_id, fragrance_id, {column} AS value, inserted, had_previous FROM changed
+    """
+
+
+def _toggle_season_votes_sql() -> str:
+    # Input rows are folded into one bitmask of toggled seasons per user and
+    # fragrance, which a single upsert XORs into the stored mask. The returned
+    # mask is read under the row lock, so each toggled season's delta (+1 if
+    # its bit is now set, -1 if cleared) is exact even under concurrent toggles.
+    season_bits = VOTE_DIMENSIONS["season"].bits
+    season_columns = VOTE_DIMENSIONS["season"].stats_columns
+    bit_cases = " ".join(f"WHEN '{season.name}' THEN {bit}" for season, bit in season_bits.items())
+    bit_values = ", ".join(f"('{season.name}', {bit})" for season, bit in season_bits.items())
+    deltas = [f"coalesce(sum(delta) FILTER (WHERE season = '{season.name}'), 0)" for season in season_columns]
+    return f"""
+        WITH input AS (
+            SELECT user_id, fragrance_id, bit_or(CASE season {bit_cases} END)::smallint AS toggled
+            FROM unnest(:user_ids, :fragrance_ids, :seasons) AS input(user_id, fragrance_id, season)
+            GROUP BY user_id, fragrance_id
+        ), vote AS (
+            INSERT INTO fragrance_season_vote AS v (user_id, fragrance_id, mask)
+            SELECT user_id, fragrance_id, toggled
+            FROM input
+            ORDER BY fragrance_id, user_id
+            ON CONFLICT (user_id, fragrance_id) DO UPDATE SET mask = v.mask # excluded.mask
+            RETURNING v.user_id, v.fragrance_id, v.mask
+        ), changed AS (
+            SELECT vote.user_id, vote.fragrance_id, seasons.season, CASE WHEN vote.mask & seasons.bit <> 0 THEN 1 ELSE -1 END AS delta
+            FROM vote
+            JOIN input USING (user_id, fragrance_id)
+            JOIN (VALUES {bit_values}) AS seasons(season, bit) ON input.toggled & seasons.bit <> 0
+        ), stats AS (
+            INSERT INTO fragrance_vote_stats AS stats (fragrance_id, {", ".join(season_columns.values())})
+            SELECT fragrance_id, {", ".join(deltas)}
+            FROM changed
+            GROUP BY fragrance_id
+            ORDER BY fragrance_id
+            ON CONFLICT (fragrance_id) DO UPDATE SET {", ".join(f"{c} = stats.{c} + excluded.{c}" for c in season_columns.values())}
+        )
+        SELECT user_id, fragrance_id, season, delta FROM changed
+    """
+
+
+_SINGLE_CHOICE_DIMENSIONS = {name: vote_dimension for name, vote_dimension in VOTE_DIMENSIONS.items() if name != "season"}
+
+_LOCK_VOTES_SQL = {
+    name: text(_lock_votes_sql(vote_dimension)).bindparams(
+        bindparam("user_ids", type_=_ID_ARRAY),
+        bindparam("fragrance_ids", type_=_ID_ARRAY),
+    )
+    for name, vote_dimension in _SINGLE_CHOICE_DIMENSIONS.items()
+}
+
+_UPSERT_VOTES_SQL = {
+    name: text(_upsert_votes_sql(vote_dimension)).bindparams(
+        bindparam("user_ids", type_=_ID_ARRAY),
+        bindparam("fragrance_ids", type_=_ID_ARRAY),
+        bindparam("values", type_=_VALUE_ARRAY),
+        bindparam("previous_values", type_=_VALUE_ARRAY),
+    )
+    for name, vote_dimension in _SINGLE_CHOICE_DIMENSIONS.items()
+}
+
+_TOGGLE_SEASON_VOTES_SQL = text(_toggle_season_votes_sql()).bindparams(
+    bindparam("user_ids", type_=_ID_ARRAY),
+    bindparam("fragrance_ids", type_=_ID_ARRAY),
+    bindparam("seasons", type_=_VALUE_ARRAY),
+)
+
+_ADD_SIMILAR_VOTES_SQL = text("""
+    WITH added AS (
+        INSERT INTO similar_fragrance (user_id, fragrance_id, fragrance_that_similar_id)
+        SELECT * FROM unnest(:user_ids, :fragrance_ids, :similar_fragrance_ids)
+        ON CONFLICT DO NOTHING
+        RETURNING id, user_id, fragrance_id, fragrance_that_similar_id
+    ), graph AS (
+        INSERT INTO fragrance_similarity_votes AS graph (fragrance_id, similar_fragrance_id, votes)
+        SELECT fragrance_id, fragrance_that_similar_id, count(*)
+        FROM added
+        GROUP BY fragrance_id, fragrance_that_similar_id
+        ORDER BY fragrance_id, fragrance_that_similar_id
+        ON CONFLICT (fragrance_id, similar_fragrance_id) DO UPDATE SET votes = graph.votes + excluded.votes
+    )
+    SELECT * FROM added
+""").bindparams(
+    bindparam("user_ids", type_=_ID_ARRAY),
+    bindparam("fragrance_ids", type_=_ID_ARRAY),
+    bindparam("similar_fragrance_ids", type_=_ID_ARRAY),
+)
+
+
+async def upsert_votes(session: AsyncSession, dimension: str, votes: Iterable[Tuple[int, int, Enum]]) -> List:
+    """
+    Create or replace single-choice votes in `dimension` from (user_id,
+    fragrance_id, value) rows, updating the counters with them. Returns the
+    written rows.
+    """
+    votes = list(votes)
+    user_ids = [user_id for user_id, _, _ in votes]
+    fragrance_ids = [fragrance_id for _, fragrance_id, _ in votes]
+    locked = await session.execute(_LOCK_VOTES_SQL[dimension], {"user_ids": user_ids, "fragrance_ids": fragrance_ids})
+    previous = {(row.user_id, row.fragrance_id): row.value for row in locked}
+    result = await session.execute(_UPSERT_VOTES_SQL[dimension], {
+        "user_ids": user_ids,
+        "fragrance_ids": fragrance_ids,
+        "values": [value.name for _, _, value in votes],
+        "previous_values": [previous.get((user_id, fragrance_id)) for user_id, fragrance_id, _ in votes],
+    })
+    rows = result.all()
+    # Only a first vote that lost the insert race to a concurrent one.
+    raced = {row.fragrance_id for row in rows if not row.inserted and not row.had_previous}
+    if raced:
+        await recount_vote_stats(session, raced)
+    return rows
+
+
+async def toggle_season_votes(session: AsyncSession, votes: Iterable[Tuple[int, int, Season]]) -> List:
+    """
+    Toggle (user_id, fragrance_id, season) votes, unique per row. Returns the
+    added (delta 1) and removed (delta -1) (user_id, fragrance_id, season) rows.
+    """
+    votes = list(votes)
+    result = await session.execute(_TOGGLE_SEASON_VOTES_SQL, {
+        "user_ids": [user_id for user_id, _, _ in votes],
+        "fragrance_ids": [fragrance_id for _, fragrance_id, _ in votes],
+        "seasons": [season.name for _, _, season in votes],
+    })
+    return result.all()
+
+
+async def add_similar_votes(session: AsyncSession, votes: Iterable[Tuple[int, int, int]]) -> List:
+    """
+    Record (user_id, fragrance_id, similar_fragrance_id) votes and add them to
+    the `fragrance_similarity_votes` graph; repeated votes are skipped.
+    """
+    votes = list(votes)
+    result = await session.execute(_ADD_SIMILAR_VOTES_SQL, {
+        "user_ids": [user_id for user_id, _, _ in votes],
+        "fragrance_ids": [fragrance_id for _, fragrance_id, _ in votes],
+        "similar_fragrance_ids": [similar_fragrance_id for _, _, similar_fragrance_id in votes],
+    })
+    return result.all()
+
+
+async def upsert_vote(session: AsyncSession, user_id: int, fragrance_id: int, dimension: str, value: Enum) -> Dict:
+    """Create or replace the user's single-choice vote in `dimension`."""
+    vote_dimension = VOTE_DIMENSIONS[dimension]
+    row, = await upsert_votes(session, dimension, [(user_id, fragrance_id, value)])
+    return {
+        "id": row.id,
+        "user_id": row.user_id,
+        "fragrance_id": row.fragrance_id,
+        vote_dimension.column: vote_dimension.enum[row.value],
+    }
+
+
+async def toggle_season_vote(session: AsyncSession, user_id: int, fragrance_id: int, season: Season) -> Dict | None:
+    """Add the season vote, or remove it if the user already cast it. Returns the added vote or None."""
+    rows = await toggle_season_votes(session, [(user_id, fragrance_id, season)])
+    for row in rows:
+        if row.delta > 0:
+            return {"user_id": user_id, "fragrance_id": fragrance_id, "season": season}
+    return None
+
+
+async def add_similar_vote(session: AsyncSession, user_id: int, fragrance_id: int, similar_fragrance_id: int) -> Dict:
+    """Record a similar-fragrance vote; voting for the same pair again is a no-op."""
+    rows = await add_similar_votes(session, [(user_id, fragrance_id, similar_fragrance_id)])
+    return {
+        "id": rows[0].id if rows else None,
+        "user_id": user_id,
+        "fragrance_id": fragrance_id,
+        "fragrance_that_similar_id": similar_fragrance_id,
+    }
+
+
+async def get_vote_stats(session: AsyncSession, fragrance_id: int) -> FragranceVoteStats | None:
+    return await session.get(FragranceVoteStats, fragrance_id)
+
+
+def vote_distribution(stats: FragranceVoteStats | None, dimension: str) -> Dict:
+    """Counts and percentages for one dimension, in the shape of the detail endpoint's `gender_votes`."""
+    vote_dimension = VOTE_DIMENSIONS[dimension]
+    counts = {
+        value.name: getattr(stats, column) if stats is not None else 0
+        for value, column in vote_dimension.stats_columns.items()
+    }
+    total_votes = sum(counts.values())
+    return {
+        "total_votes": total_votes,
+        "counts": counts,
+        "percentages": (
+            {name: round(count / total_votes * 100, 2) for name, count in counts.items()}
+            if total_votes > 0
+            else None
+        ),
+    }
+
+
+def _rebuild_vote_stats_sql() -> str:
+    joins, columns, values = [], [], []
+    for vote_dimension in VOTE_DIMENSIONS.values():
+        alias = vote_dimension.name
+        counters = ",\n".join(
+            f"count(*) FILTER (WHERE {vote_dimension.matches(value)}) AS {column}"
+            for value, column in vote_dimension.stats_columns.items()
+        )
+        joins.append(
+            f"LEFT JOIN (SELECT fragrance_id, {counters} FROM {vote_dimension.model.__tablename__} GROUP BY fragrance_id) AS {alias} "
+            f"ON {alias}.fragrance_id = f.id"
+        )
+        for column in vote_dimension.stats_columns.values():
+            columns.append(column)
+            values.append(f"coalesce({alias}.{column}, 0)")
+    return f"""
+        INSERT INTO fragrance_vote_stats (fragrance_id, {", ".join(columns)})
+        SELECT f.id, {", ".join(values)}
+        FROM fragrance AS f
+        {" ".join(joins)}
+        WHERE :all_fragrances OR f.id = ANY(:fragrance_ids)
+        ON CONFLICT (fragrance_id) DO UPDATE SET {", ".join(f"{column} = excluded.{column}" for column in columns)}
+    """
+
+
+_REBUILD_VOTE_STATS_SQL = text(_rebuild_vote_stats_sql()).bindparams(
+    bindparam("all_fragrances", type_=Boolean),
+    bindparam("fragrance_ids", type_=ARRAY(BigInteger))
+)
+
+
+async def recount_vote_stats(session: AsyncSession, fragrance_ids: Iterable[int]) -> int:
+    """
+    Recount the `fragrance_vote_stats` rows of `fragrance_ids` whose row locks
+    the caller's transaction already holds. Writers that committed before the
+    locks were granted are counted; the ones waiting on them add their deltas
+    on top afterwards, so no vote is lost or counted twice.
+    """
+    result = await session.execute(_REBUILD_VOTE_STATS_SQL, {"all_fragrances": False, "fragrance_ids": list(fragrance_ids)})
+    return result.rowcount
+
+
+async def rebuild_vote_stats(session: AsyncSession, fragrance_ids: Iterable[int] | None = None) -> int:
+    """
+    Recount `fragrance_vote_stats` from the raw vote rows, for every fragrance or
+    only the given ones. The stats table is locked against concurrent vote
+    writes for the rest of the caller's transaction so no delta is lost; call
+    it at the start of a transaction, as the rebuild command does.
+    """
+    await session.execute(text("LOCK TABLE fragrance_vote_stats IN SHARE ROW EXCLUSIVE MODE"))
+    result = await session.execute(_REBUILD_VOTE_STATS_SQL, {
+        "all_fragrances": fragrance_ids is None,
+        "fragrance_ids": list(fragrance_ids or []),
+    })
+    return result.rowcount
+
+
+_REBUILD_SIMILARITY_VOTES_SQL = text("""
+    WITH counted AS (
+        SELECT fragrance_id, fragrance_that_similar_id AS similar_fragrance_id, count(*) AS votes
+        FROM similar_fragrance
+        WHERE :all_fragrances OR fragrance_id = ANY(:fragrance_ids)
+        GROUP BY fragrance_id, fragrance_that_similar_id
+    ), stale AS (
+        DELETE FROM fragrance_similarity_votes AS graph
+        WHERE (:all_fragrances OR graph.fragrance_id = ANY(:fragrance_ids))
+          AND NOT EXISTS (
+              SELECT 1 FROM counted
+              WHERE counted.fragrance_id = graph.fragrance_id AND counted.similar_fragrance_id = graph.similar_fragrance_id
+          )
+    )
+    INSERT INTO fragrance_similarity_votes (fragrance_id, similar_fragrance_id, votes)
+    SELECT fragrance_id, similar_fragrance_id, votes FROM counted
+    ON CONFLICT (fragrance_id, similar_fragrance_id) DO UPDATE SET votes = excluded.votes
+""").bindparams(
+    bindparam("all_fragrances", type_=Boolean),
+    bindparam("fragrance_ids", type_=_ID_ARRAY),
+)
+
+
+async def rebuild_similarity_votes(session: AsyncSession, fragrance_ids: Iterable[int] | None = None) -> int:
+    """Recount the `fragrance_similarity_votes` graph from `similar_fragrance`, for every fragrance or only the given ones."""
+    await session.execute(text("LOCK TABLE fragrance_similarity_votes IN SHARE ROW EXCLUSIVE MODE"))
+    result = await session.execute(_REBUILD_SIMILARITY_VOTES_SQL, {
+        "all_fragrances": fragrance_ids is None,
+        "fragrance_ids": list(fragrance_ids or []),
+    })
+    return result.rowcount
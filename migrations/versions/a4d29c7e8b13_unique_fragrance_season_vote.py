@@ -0,0 +1,56 @@
+"""unique fragrance season vote
+
+Revision ID: a4d29c7e8b13
+Revises: f3b8d05a6c97
+Create Date: 2025-06-25 18:02:11.408316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d29c7e8b13'
+down_revision: Union[str, None] = 'f3b8d05a6c97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Season votes are toggled with ON CONFLICT, which needs the constraint;
+    # drop duplicate rows left by earlier concurrent toggles first and recount.
+    op.execute("""
+        DELETE FROM fragrance_season AS a
+        USING fragrance_season AS b
+        WHERE a.user_id = b.user_id
+          AND a.fragrance_id = b.fragrance_id
+          AND a.season = b.season
+          AND a.id > b.id
+    """)
+    op.execute("""
+        UPDATE fragrance_vote_stats AS stats
+        SET season_winter = coalesce(c.winter, 0),
+            season_spring = coalesce(c.spring, 0),
+            season_summer = coalesce(c.summer, 0),
+            season_fall = coalesce(c.fall, 0)
+        FROM fragrance_vote_stats AS s
+        LEFT JOIN (
+            SELECT fragrance_id,
+                   count(*) FILTER (WHERE season = 'winter') AS winter,
+                   count(*) FILTER (WHERE season = 'spring') AS spring,
+                   count(*) FILTER (WHERE season = 'summer') AS summer,
+                   count(*) FILTER (WHERE season = 'fall') AS fall
+            FROM fragrance_season
+            GROUP BY fragrance_id
+        ) AS c ON c.fragrance_id = s.fragrance_id
+        WHERE stats.fragrance_id = s.fragrance_id
+    """)
+    op.create_unique_constraint('unique_user_fragrance_season', 'fragrance_season', ['user_id', 'fragrance_id', 'season'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('unique_user_fragrance_season', 'fragrance_season', type_='unique')
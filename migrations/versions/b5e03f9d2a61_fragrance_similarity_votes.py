@@ -0,0 +1,48 @@
+"""fragrance similarity votes
+
+Revision ID: b5e03f9d2a61
+Revises: a4d29c7e8b13
+Create Date: 2025-06-28 12:40:27.115940
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e03f9d2a61'
+down_revision: Union[str, None] = 'a4d29c7e8b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # One vote per user and pair; the old constraint allowed a single vote per pair in total.
+    op.drop_constraint('fragrance_similar_fragrance_constraint', 'similar_fragrance', type_='unique')
+    op.create_unique_constraint('fragrance_similar_fragrance_user_constraint', 'similar_fragrance', ['user_id', 'fragrance_id', 'fragrance_that_similar_id'])
+    op.create_table('fragrance_similarity_votes',
+    sa.Column('fragrance_id', sa.BigInteger(), nullable=False),
+    sa.Column('similar_fragrance_id', sa.BigInteger(), nullable=False),
+    sa.Column('votes', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['fragrance_id'], ['fragrance.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['similar_fragrance_id'], ['fragrance.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('fragrance_id', 'similar_fragrance_id')
+    )
+    op.create_index('ix_fragrance_similarity_votes_rank', 'fragrance_similarity_votes', ['fragrance_id', sa.text('votes DESC'), 'similar_fragrance_id'], unique=False)
+    op.execute("""
+        INSERT INTO fragrance_similarity_votes (fragrance_id, similar_fragrance_id, votes)
+        SELECT fragrance_id, fragrance_that_similar_id, count(*)
+        FROM similar_fragrance
+        GROUP BY fragrance_id, fragrance_that_similar_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_fragrance_similarity_votes_rank', table_name='fragrance_similarity_votes')
+    op.drop_table('fragrance_similarity_votes')
+    op.drop_constraint('fragrance_similar_fragrance_user_constraint', 'similar_fragrance', type_='unique')
+    op.create_unique_constraint('fragrance_similar_fragrance_constraint', 'similar_fragrance', ['fragrance_id', 'fragrance_that_similar_id'])
@@ -0,0 +1,28 @@
+"""fragrance price id index
+
+Revision ID: b7c41e2f9a10
+Revises: 3869256d5e83
+Create Date: 2025-06-14 18:22:07.415230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7c41e2f9a10'
+down_revision: Union[str, None] = '3869256d5e83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_fragrance_price_id', 'fragrance', ['price', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_fragrance_price_id', table_name='fragrance')
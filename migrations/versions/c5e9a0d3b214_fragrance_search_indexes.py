@@ -0,0 +1,64 @@
+"""fragrance search indexes
+
+Revision ID: c5e9a0d3b214
+Revises: b7c41e2f9a10
+Create Date: 2025-06-16 20:41:53.102987
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e9a0d3b214'
+down_revision: Union[str, None] = 'b7c41e2f9a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column('fragrance', sa.Column('search_document', sa.Text(), nullable=True))
+    op.add_column('fragrance', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+    op.execute("""
+        UPDATE fragrance AS f
+        SET search_document = d.document,
+            search_vector = d.vector
+        FROM (
+            SELECT
+                fr.id,
+                concat_ws(' ', fr.name, c.name, p.name, n.names, fr.description) AS document,
+                setweight(to_tsvector('simple', coalesce(fr.name, '')), 'A')
+                || setweight(to_tsvector('simple', coalesce(c.name, '')), 'B')
+                || setweight(to_tsvector('simple', coalesce(p.name, '')), 'B')
+                || setweight(to_tsvector('simple', coalesce(n.names, '')), 'C')
+                || setweight(to_tsvector('simple', coalesce(fr.description, '')), 'D') AS vector
+            FROM fragrance AS fr
+            JOIN company AS c ON c.id = fr.company_id
+            LEFT JOIN perfumer AS p ON p.id = fr.perfumer_id
+            LEFT JOIN LATERAL (
+                SELECT string_agg(note.name, ' ') AS names
+                FROM fragrance_note
+                JOIN note ON note.id = fragrance_note.note_id
+                WHERE fragrance_note.fragrance_id = fr.id
+            ) AS n ON true
+        ) AS d
+        WHERE f.id = d.id
+    """)
+    op.create_index('ix_fragrance_search_vector', 'fragrance', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index(
+        'ix_fragrance_search_document_trgm', 'fragrance', ['search_document'], unique=False,
+        postgresql_using='gin', postgresql_ops={'search_document': 'gin_trgm_ops'}
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_fragrance_search_document_trgm', table_name='fragrance')
+    op.drop_index('ix_fragrance_search_vector', table_name='fragrance')
+    op.drop_column('fragrance', 'search_vector')
+    op.drop_column('fragrance', 'search_document')
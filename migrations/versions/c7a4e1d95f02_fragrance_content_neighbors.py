@@ -0,0 +1,39 @@
+"""fragrance content neighbors
+
+Revision ID: c7a4e1d95f02
+Revises: b5e03f9d2a61
+Create Date: 2025-07-01 10:26:53.582204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7a4e1d95f02'
+down_revision: Union[str, None] = 'b5e03f9d2a61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Filled by `python -m backend.commands.rebuild_similarity`.
+    op.create_table('fragrance_content_neighbors',
+    sa.Column('fragrance_id', sa.BigInteger(), nullable=False),
+    sa.Column('rank', sa.SmallInteger(), nullable=False),
+    sa.Column('neighbor_id', sa.BigInteger(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['fragrance_id'], ['fragrance.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['neighbor_id'], ['fragrance.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('fragrance_id', 'rank')
+    )
+    op.create_index(op.f('ix_fragrance_content_neighbors_neighbor_id'), 'fragrance_content_neighbors', ['neighbor_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_fragrance_content_neighbors_neighbor_id'), table_name='fragrance_content_neighbors')
+    op.drop_table('fragrance_content_neighbors')
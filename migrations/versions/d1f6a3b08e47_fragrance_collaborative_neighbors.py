@@ -0,0 +1,44 @@
+"""fragrance collaborative neighbors
+
+Revision ID: d1f6a3b08e47
+Revises: c7a4e1d95f02
+Create Date: 2025-07-03 18:41:09.217530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1f6a3b08e47'
+down_revision: Union[str, None] = 'c7a4e1d95f02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Filled by `python -m backend.commands.rebuild_recommendations`.
+    op.create_table('fragrance_collaborative_neighbors',
+    sa.Column('fragrance_id', sa.BigInteger(), nullable=False),
+    sa.Column('rank', sa.SmallInteger(), nullable=False),
+    sa.Column('neighbor_id', sa.BigInteger(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['fragrance_id'], ['fragrance.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['neighbor_id'], ['fragrance.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('fragrance_id', 'rank')
+    )
+    op.create_index(op.f('ix_fragrance_collaborative_neighbors_neighbor_id'), 'fragrance_collaborative_neighbors', ['neighbor_id'], unique=False)
+    # Serving and refreshes look up every interaction of one user.
+    op.create_index('ix_user_fragrance_user_id_fragrance_id', 'user_fragrance', ['user_id', 'fragrance_id'], unique=False)
+    op.create_index('ix_reviews_user_id_fragrance_id', 'reviews', ['user_id', 'fragrance_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reviews_user_id_fragrance_id', table_name='reviews')
+    op.drop_index('ix_user_fragrance_user_id_fragrance_id', table_name='user_fragrance')
+    op.drop_index(op.f('ix_fragrance_collaborative_neighbors_neighbor_id'), table_name='fragrance_collaborative_neighbors')
+    op.drop_table('fragrance_collaborative_neighbors')
@@ -0,0 +1,45 @@
+"""fragrance note keys
+
+Revision ID: d81f6b2c7e45
+Revises: c5e9a0d3b214
+Create Date: 2025-06-18 19:07:12.664081
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81f6b2c7e45'
+down_revision: Union[str, None] = 'c5e9a0d3b214'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('fragrance', sa.Column('note_keys', postgresql.ARRAY(sa.BigInteger()), server_default='{}', nullable=False))
+    # note_id * 4 marks the note anywhere in the pyramid, + 1/2/3 marks it as a top/middle/base note.
+    op.execute("""
+        UPDATE fragrance AS f
+        SET note_keys = k.note_keys
+        FROM (
+            SELECT
+                fragrance_id,
+                array_agg(note_id * 4)
+                || array_agg(note_id * 4 + CASE note_type WHEN 'TOP' THEN 1 WHEN 'MIDDLE' THEN 2 ELSE 3 END) AS note_keys
+            FROM fragrance_note
+            GROUP BY fragrance_id
+        ) AS k
+        WHERE f.id = k.fragrance_id
+    """)
+    op.create_index('ix_fragrance_note_keys', 'fragrance', ['note_keys'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_fragrance_note_keys', table_name='fragrance')
+    op.drop_column('fragrance', 'note_keys')
@@ -0,0 +1,103 @@
+"""fragrance vote stats
+
+Revision ID: e2a7c94f1b38
+Revises: d81f6b2c7e45
+Create Date: 2025-06-21 16:48:30.281544
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a7c94f1b38'
+down_revision: Union[str, None] = 'd81f6b2c7e45'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('fragrance_vote_stats',
+    sa.Column('fragrance_id', sa.BigInteger(), nullable=False),
+    sa.Column('gender_male', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('gender_mostly_male', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('gender_female', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('gender_mostly_female', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('gender_unisex', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('season_winter', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('season_spring', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('season_summer', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('season_fall', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('longevity_very_weak', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('longevity_weak', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('longevity_moderate', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('longevity_long_lasting', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('longevity_eternal', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('sillage_intimate', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('sillage_moderate', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('sillage_strong', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('sillage_enormous', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('price_value_way_overpriced', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('price_value_overpriced', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('price_value_ok', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('price_value_good_value', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('price_value_great_value', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['fragrance_id'], ['fragrance.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('fragrance_id')
+    )
+    op.execute("""
+        INSERT INTO fragrance_vote_stats (fragrance_id, gender_male, gender_mostly_male, gender_female, gender_mostly_female, gender_unisex, season_winter, season_spring, season_summer, season_fall, longevity_very_weak, longevity_weak, longevity_moderate, longevity_long_lasting, longevity_eternal, sillage_intimate, sillage_moderate, sillage_strong, sillage_enormous, price_value_way_overpriced, price_value_overpriced, price_value_ok, price_value_good_value, price_value_great_value)
+        SELECT f.id, coalesce(gender.gender_male, 0), coalesce(gender.gender_mostly_male, 0), coalesce(gender.gender_female, 0), coalesce(gender.gender_mostly_female, 0), coalesce(gender.gender_unisex, 0), coalesce(season.season_winter, 0), coalesce(season.season_spring, 0), coalesce(season.season_summer, 0), coalesce(season.season_fall, 0), coalesce(longevity.longevity_very_weak, 0), coalesce(longevity.longevity_weak, 0), coalesce(longevity.longevity_moderate, 0), coalesce(longevity.longevity_long_lasting, 0), coalesce(longevity.longevity_eternal, 0), coalesce(sillage.sillage_intimate, 0), coalesce(sillage.sillage_moderate, 0), coalesce(sillage.sillage_strong, 0), coalesce(sillage.sillage_enormous, 0), coalesce(price_value.price_value_way_overpriced, 0), coalesce(price_value.price_value_overpriced, 0), coalesce(price_value.price_value_ok, 0), coalesce(price_value.price_value_good_value, 0), coalesce(price_value.price_value_great_value, 0)
+        FROM fragrance AS f
+        LEFT JOIN (
+            SELECT fragrance_id,
+                    count(*) FILTER (WHERE gender = 'male') AS gender_male,
+                    count(*) FILTER (WHERE gender = 'mostly_male') AS gender_mostly_male,
+                    count(*) FILTER (WHERE gender = 'female') AS gender_female,
+                    count(*) FILTER (WHERE gender = 'mostly_female') AS gender_mostly_female,
+                    count(*) FILTER (WHERE gender = 'unisex') AS gender_unisex
+            FROM fragrance_gender GROUP BY fragrance_id
+        ) AS gender ON gender.fragrance_id = f.id
+        LEFT JOIN (
+            SELECT fragrance_id,
+                    count(*) FILTER (WHERE season = 'winter') AS season_winter,
+                    count(*) FILTER (WHERE season = 'spring') AS season_spring,
+                    count(*) FILTER (WHERE season = 'summer') AS season_summer,
+                    count(*) FILTER (WHERE season = 'fall') AS season_fall
+            FROM fragrance_season GROUP BY fragrance_id
+        ) AS season ON season.fragrance_id = f.id
+        LEFT JOIN (
+            SELECT fragrance_id,
+                    count(*) FILTER (WHERE longevity = 'very_weak') AS longevity_very_weak,
+                    count(*) FILTER (WHERE longevity = 'weak') AS longevity_weak,
+                    count(*) FILTER (WHERE longevity = 'moderate') AS longevity_moderate,
+                    count(*) FILTER (WHERE longevity = 'long_lasting') AS longevity_long_lasting,
+                    count(*) FILTER (WHERE longevity = 'eternal') AS longevity_eternal
+            FROM fragrance_longevity GROUP BY fragrance_id
+        ) AS longevity ON longevity.fragrance_id = f.id
+        LEFT JOIN (
+            SELECT fragrance_id,
+                    count(*) FILTER (WHERE sillage = 'intimate') AS sillage_intimate,
+                    count(*) FILTER (WHERE sillage = 'moderate') AS sillage_moderate,
+                    count(*) FILTER (WHERE sillage = 'strong') AS sillage_strong,
+                    count(*) FILTER (WHERE sillage = 'enormous') AS sillage_enormous
+            FROM fragrance_sillage GROUP BY fragrance_id
+        ) AS sillage ON sillage.fragrance_id = f.id
+        LEFT JOIN (
+            SELECT fragrance_id,
+                    count(*) FILTER (WHERE price_value = 'way_overpriced') AS price_value_way_overpriced,
+                    count(*) FILTER (WHERE price_value = 'overpriced') AS price_value_overpriced,
+                    count(*) FILTER (WHERE price_value = 'ok') AS price_value_ok,
+                    count(*) FILTER (WHERE price_value = 'good_value') AS price_value_good_value,
+                    count(*) FILTER (WHERE price_value = 'great_value') AS price_value_great_value
+            FROM fragrance_prive_value GROUP BY fragrance_id
+        ) AS price_value ON price_value.fragrance_id = f.id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('fragrance_vote_stats')
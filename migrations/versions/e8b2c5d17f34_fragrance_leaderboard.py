@@ -0,0 +1,41 @@
+"""fragrance leaderboard
+
+Revision ID: e8b2c5d17f34
+Revises: d1f6a3b08e47
+Create Date: 2025-07-05 09:12:47.630158
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b2c5d17f34'
+down_revision: Union[str, None] = 'd1f6a3b08e47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Filled by the periodic refresh on startup or `python -m backend.commands.refresh_leaderboards`.
+    op.create_table('fragrance_leaderboard',
+    sa.Column('scope', sa.String(length=16), nullable=False),
+    sa.Column('scope_key', sa.String(length=32), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.Column('fragrance_id', sa.BigInteger(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('rating_count', sa.Integer(), nullable=False),
+    sa.Column('refreshed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['fragrance_id'], ['fragrance.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('scope', 'scope_key', 'rank')
+    )
+    op.create_index(op.f('ix_fragrance_leaderboard_fragrance_id'), 'fragrance_leaderboard', ['fragrance_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_fragrance_leaderboard_fragrance_id'), table_name='fragrance_leaderboard')
+    op.drop_table('fragrance_leaderboard')
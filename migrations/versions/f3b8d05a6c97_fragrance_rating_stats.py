@@ -0,0 +1,56 @@
+"""fragrance rating stats
+
+Revision ID: f3b8d05a6c97
+Revises: e2a7c94f1b38
+Create Date: 2025-06-23 21:15:44.930172
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b8d05a6c97'
+down_revision: Union[str, None] = 'e2a7c94f1b38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('fragrance_rating_stats',
+    sa.Column('fragrance_id', sa.BigInteger(), nullable=False),
+    sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('rating_sum', sa.Float(), server_default='0', nullable=False),
+    sa.Column('rating_histogram', postgresql.ARRAY(sa.Integer()), server_default='{0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0}', nullable=False),
+    sa.ForeignKeyConstraint(['fragrance_id'], ['fragrance.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('fragrance_id')
+    )
+    # Histogram slot i counts ratings of i / 2 + 0.5 (1.0 .. 10.0).
+    op.execute("""
+        INSERT INTO fragrance_rating_stats (fragrance_id, rating_count, rating_sum, rating_histogram)
+        SELECT
+            f.id,
+            (SELECT count(*) FROM reviews AS r WHERE r.fragrance_id = f.id),
+            (SELECT coalesce(sum(r.rating), 0) FROM reviews AS r WHERE r.fragrance_id = f.id),
+            ARRAY(
+                SELECT count(r.id)
+                FROM generate_series(1, 19) AS slot
+                LEFT JOIN reviews AS r ON r.fragrance_id = f.id AND (r.rating * 2)::int - 1 = slot
+                GROUP BY slot
+                ORDER BY slot
+            )
+        FROM fragrance AS f
+    """)
+    op.create_index('ix_reviews_fragrance_id_id', 'reviews', ['fragrance_id', 'id'], unique=False)
+    op.create_index('ix_reviews_fragrance_id_rating_id', 'reviews', ['fragrance_id', 'rating', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reviews_fragrance_id_rating_id', table_name='reviews')
+    op.drop_index('ix_reviews_fragrance_id_id', table_name='reviews')
+    op.drop_table('fragrance_rating_stats')
@@ -0,0 +1,74 @@
+"""fragrance season vote bitmask
+
+Revision ID: f4c9d2e6a815
+Revises: e8b2c5d17f34
+Create Date: 2025-07-07 16:35:22.904716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4c9d2e6a815'
+down_revision: Union[str, None] = 'e8b2c5d17f34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Same bits as models.fragrance.SEASON_BITS.
+SEASON_BITS = {'winter': 1, 'spring': 2, 'summer': 4, 'fall': 8}
+_BIT_CASES = " ".join(f"WHEN '{season}' THEN {bit}" for season, bit in SEASON_BITS.items())
+_BIT_VALUES = ", ".join(f"('{season}', {bit})" for season, bit in SEASON_BITS.items())
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('fragrance_season_vote',
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('fragrance_id', sa.BigInteger(), nullable=False),
+    sa.Column('mask', sa.SmallInteger(), server_default='0', nullable=False),
+    sa.CheckConstraint('mask BETWEEN 0 AND 15', name='fragrance_season_vote_mask_check'),
+    sa.ForeignKeyConstraint(['fragrance_id'], ['fragrance.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'fragrance_id')
+    )
+    op.create_index(op.f('ix_fragrance_season_vote_fragrance_id'), 'fragrance_season_vote', ['fragrance_id'], unique=False)
+    # One row per (user, fragrance) with one bit per season row; the counters
+    # in fragrance_vote_stats count the same votes and stay as they are.
+    op.execute(f"""
+        INSERT INTO fragrance_season_vote (user_id, fragrance_id, mask)
+        SELECT user_id, fragrance_id, bit_or(CASE season::text {_BIT_CASES} END)::smallint
+        FROM fragrance_season
+        GROUP BY user_id, fragrance_id
+    """)
+    op.drop_index(op.f('ix_fragrance_season_user_id'), table_name='fragrance_season')
+    op.drop_index(op.f('ix_fragrance_season_fragrance_id'), table_name='fragrance_season')
+    op.drop_table('fragrance_season')
+    op.execute("DROP TYPE season")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_table('fragrance_season',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('fragrance_id', sa.BigInteger(), nullable=False),
+    sa.Column('season', sa.Enum('winter', 'spring', 'summer', 'fall', name='season'), nullable=False),
+    sa.ForeignKeyConstraint(['fragrance_id'], ['fragrance.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'fragrance_id', 'season', name='unique_user_fragrance_season')
+    )
+    op.create_index(op.f('ix_fragrance_season_fragrance_id'), 'fragrance_season', ['fragrance_id'], unique=False)
+    op.create_index(op.f('ix_fragrance_season_user_id'), 'fragrance_season', ['user_id'], unique=False)
+    op.execute(f"""
+        INSERT INTO fragrance_season (user_id, fragrance_id, season)
+        SELECT v.user_id, v.fragrance_id, CAST(seasons.season AS season)
+        FROM fragrance_season_vote AS v
+        JOIN (VALUES {_BIT_VALUES}) AS seasons(season, bit) ON v.mask & seasons.bit <> 0
+        ORDER BY v.fragrance_id, v.user_id, seasons.bit
+    """)
+    op.drop_index(op.f('ix_fragrance_season_vote_fragrance_id'), table_name='fragrance_season_vote')
+    op.drop_table('fragrance_season_vote')